@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import argparse
 import csv
+import html
 import json
+import time
+from datetime import datetime
 from pathlib import Path
 
 
@@ -14,18 +17,71 @@ def get_metric(entry: dict, key: str):
         return entry.get("plan", {}).get(key)
     if key in ("wall_seconds", "timed_out", "return_code"):
         return entry.get(key)
+    if key in ("peak_rss_mb", "user_cpu_seconds", "system_cpu_seconds"):
+        return (entry.get("resources") or {}).get(key)
+    if key in ("trials", "wall_min", "wall_iqr"):
+        trials = entry.get("trials") or {}
+        if key == "trials":
+            return trials.get("count", 1)
+        return ((trials.get("summary") or {}).get("wall_seconds") or {}).get(key[len("wall_") :])
     stats = entry.get("stats", {})
     return stats.get(key)
 
 
+def write_html(rows, headers, path: Path, title: str):
+    """A self-contained HTML table (no external assets)."""
+    cells = []
+    for row in rows:
+        values = []
+        for h in headers:
+            val = row.get(h)
+            text = f"{val:.3f}" if isinstance(val, float) else ("" if val is None else str(val))
+            values.append(f"<td>{html.escape(text)}</td>")
+        cells.append("<tr>" + "".join(values) + "</tr>")
+    path.write_text(
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{0}</title>\n"
+        "<style>body{{font-family:sans-serif}}table{{border-collapse:collapse}}"
+        "td,th{{border:1px solid #ccc;padding:2px 8px;text-align:right}}"
+        "td:first-child{{text-align:left}}</style></head>\n<body><h1>{0}</h1>\n<table>\n"
+        "<tr>{1}</tr>\n{2}\n</table></body></html>\n".format(
+            html.escape(title), "".join(f"<th>{html.escape(h)}</th>" for h in headers), "\n".join(cells)
+        ),
+        encoding="utf-8",
+    )
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Aggregate OPTIC stats into CSV/Markdown.")
+    parser = argparse.ArgumentParser(description="Aggregate OPTIC stats into CSV/Markdown/HTML.")
     parser.add_argument(
         "--stats-dir",
         type=Path,
         default=Path("stats"),
         help="Directory with stats JSON files.",
     )
+    parser.add_argument(
+        "--store",
+        type=Path,
+        default=None,
+        help="SQLite run store the stats are ingested into (default: <stats-dir>/runs.sqlite).",
+    )
+    parser.add_argument(
+        "--ingest-tag",
+        default=None,
+        help="Label the runs ingested by this call (e.g. a planner build), for --tag and compare_runs.py.",
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="One row per stored run from --stats-dir, including runs whose file was since overwritten.",
+    )
+    parser.add_argument("--tag", default=None, help="Only runs ingested with this --ingest-tag.")
+    parser.add_argument("--machine", default=None, help="Only runs from this host name.")
+    parser.add_argument(
+        "--since",
+        type=lambda text: datetime.fromisoformat(text).timestamp(),
+        default=None,
+        help="Only runs finished at or after this ISO date/time (e.g. 2024-05-01).",
+    )
     parser.add_argument(
         "--out-csv",
         type=Path,
@@ -38,6 +94,12 @@ def main():
         default=Path("stats/summary.md"),
         help="Markdown table output path.",
     )
+    parser.add_argument(
+        "--out-html",
+        type=Path,
+        default=None,
+        help="Optional HTML table output path.",
+    )
     parser.add_argument(
         "--sort-by",
         default="metric",
@@ -45,28 +107,34 @@ def main():
     )
     args = parser.parse_args()
 
-    stats_files = sorted(args.stats_dir.glob("*.json"))
-    if not stats_files:
-        raise SystemExit(f"No stats JSON files found in {args.stats_dir}")
-
-    rows = []
-    for path in stats_files:
-        entry = load_stats(path)
-        name = path.stem
-        row = {
-            "problem": name,
-            "found": entry.get("plan", {}).get("found"),
-            "actions": entry.get("plan", {}).get("actions"),
-            "makespan": entry.get("plan", {}).get("makespan"),
-            "metric": get_metric(entry, "metric"),
-            "cost": get_metric(entry, "cost"),
-            "states_evaluated": get_metric(entry, "states_evaluated"),
-            "planner_time": get_metric(entry, "time"),
-            "wall_seconds": entry.get("wall_seconds"),
-            "timed_out": entry.get("timed_out"),
-            "return_code": entry.get("return_code"),
-        }
-        rows.append(row)
+    from run_store import SUMMARY_COLUMNS, RunStore, default_store_path
+
+    start = time.perf_counter()
+    with RunStore(args.store or default_store_path(args.stats_dir)) as store:
+        counts = store.ingest(args.stats_dir, tag=args.ingest_tag)
+        ingest_seconds = time.perf_counter() - start
+        columns = SUMMARY_COLUMNS + (["machine", "timestamp"] if args.history else [])
+        rows = store.query(
+            stats_dir=args.stats_dir,
+            # Tag/machine/date filters look at every run ingested from here, not only the current files.
+            current=not (args.history or args.tag or args.since),
+            tag=args.tag,
+            machine=args.machine,
+            since=args.since,
+            latest=not args.history,
+            columns=columns,
+        )
+    query_seconds = time.perf_counter() - start - ingest_seconds
+    print(
+        f"[store] {counts['files']} files: {counts['added']} new, {counts['changed']} changed, "
+        f"{counts['unchanged']} unchanged, {counts['removed']} gone, {counts['invalid']} not stats "
+        f"(ingest {ingest_seconds * 1000:.1f} ms, query {query_seconds * 1000:.1f} ms)"
+    )
+    if not rows:
+        raise SystemExit(f"No runs found for {args.stats_dir}")
+    for row in rows:
+        if row.get("timestamp") is not None:
+            row["timestamp"] = datetime.fromtimestamp(row["timestamp"]).isoformat(timespec="seconds")
 
     def sort_key(r):
         val = r.get(args.sort_by)
@@ -90,8 +158,17 @@ def main():
         "actions",
         "states_evaluated",
         "wall_seconds",
+        "peak_rss_mb",
+        "user_cpu_seconds",
+        "system_cpu_seconds",
         "timed_out",
     ]
+    if any((row.get("trials") or 1) > 1 for row in rows):
+        # wall_seconds is then the median over the trials.
+        at = headers.index("wall_seconds") + 1
+        headers[at:at] = ["wall_iqr", "wall_min", "trials"]
+    if args.history:
+        headers += ["machine", "timestamp"]
     md_lines.append("| " + " | ".join(headers) + " |")
     md_lines.append("| " + " | ".join("---" for _ in headers) + " |")
     for row in rows:
@@ -107,6 +184,10 @@ def main():
 
     print(f"[ok] CSV: {args.out_csv}")
     print(f"[ok] MD:  {args.out_md}")
+    if args.out_html:
+        args.out_html.parent.mkdir(parents=True, exist_ok=True)
+        write_html(rows, headers, args.out_html, f"Runs in {args.stats_dir}")
+        print(f"[ok] HTML: {args.out_html}")
 
 
 if __name__ == "__main__":
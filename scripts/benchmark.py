@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Scaling benchmark: generated problem families through the planner and the tooling.
+
+Each family varies one axis of a `gen_maze_nd.py` maze and keeps the rest
+fixed:
+
+- size:   2D square mazes of growing side (x = cells)
+- dims:   about `--dims-cells` cells spread over 2, 3, 4, 5 dimensions
+- agents: one maze, growing agent count
+- doors:  one maze, growing number of button doors
+
+Every problem goes through `run_optic.py` (the same child command as
+`run_batch.py`, once per mode and repeat) and through the Python tooling:
+parsing, `render_3d.py` and `pddl_to_dot.py`. The problem cache is disabled
+for the children so every repeat pays the full parse. Results go to
+`benchmarks/<timestamp>/index.csv` (one row per run) and `summary.md` (median
+per family, value and task); plot them with `plot_stats.py <index.csv>`.
+"""
+import argparse
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from aggregate_stats import get_metric, load_stats
+
+SCRIPTS = Path(__file__).resolve().parent
+FAMILIES = ("size", "dims", "agents", "doors")
+TASKS = ("parse", "render", "dot")
+INDEX_FIELDS = [
+    "family",
+    "axis",
+    "value",
+    "problem",
+    "cells",
+    "task",
+    "repeat",
+    "wall_seconds",
+    "solve_seconds",
+    "found",
+    "timed_out",
+    "return_code",
+    "metric",
+    "makespan",
+    "actions",
+    "states_evaluated",
+    "peak_rss_mb",
+    "user_cpu_seconds",
+    "system_cpu_seconds",
+    "stats_json",
+    "plan",
+]
+
+
+def int_list(text: str):
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def family_specs(args):
+    """`(family, axis, value, gen_maze_nd options)` for every problem of the selected families."""
+    specs = []
+    for family in args.families:
+        if family == "size":
+            for side in args.size_sides:
+                specs.append((family, "cells", side * side, ["--dims", f"{side},{side}"]))
+        elif family == "dims":
+            for d in args.dim_counts:
+                side = max(2, round(args.dims_cells ** (1.0 / d)))
+                specs.append((family, "dimensions", d, ["--dims", ",".join([str(side)] * d)]))
+        elif family == "agents":
+            for count in args.agent_counts:
+                specs.append((family, "agents", count, ["--dims", args.base_dims, "--agents", str(count)]))
+        elif family == "doors":
+            for count in args.door_counts:
+                specs.append((family, "doors", count, ["--dims", args.base_dims, "--doors", str(count)]))
+    return specs
+
+
+def generate(spec, problems_dir: Path, seed: int) -> Path:
+    family, _, value, options = spec
+    path = problems_dir / f"{family}-{value}.pddl"
+    cmd = [sys.executable, str(SCRIPTS / "gen_maze_nd.py"), str(path), "--seed", str(seed)] + options
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+    return path
+
+
+def child_env():
+    env = dict(os.environ)
+    env["MAZE_PROBLEM_CACHE"] = "off"
+    return env
+
+
+def planner_cmd(args, problem: Path, stats_path: Path, plan_path: Path, fast: bool):
+    """Same run_optic.py invocation as `run_batch.batch_cmd`."""
+    cmd = [
+        sys.executable,
+        str(SCRIPTS / "run_optic.py"),
+        str(args.domain),
+        str(problem),
+        "--time-limit",
+        str(args.time_limit),
+        "--stats-out",
+        str(stats_path),
+        "--plan-out",
+        str(plan_path),
+    ]
+    if fast:
+        cmd.append("--fast")
+    if args.no_native:
+        cmd.append("--no-native")
+    if args.docker:
+        cmd.append("--docker")
+    if args.docker_image:
+        cmd.extend(["--docker-image", args.docker_image])
+    return cmd
+
+
+def run_planner(args, problem: Path, run_dir: Path, tag: str, fast: bool) -> dict:
+    stats_path = run_dir / "runs" / f"{tag}.json"
+    plan_path = run_dir / "plans" / f"{tag}.out"
+    start = time.perf_counter()
+    proc = subprocess.run(
+        planner_cmd(args, problem, stats_path, plan_path, fast),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=child_env(),
+        check=False,
+    )
+    elapsed = time.perf_counter() - start
+    row = {"wall_seconds": elapsed, "return_code": proc.returncode}
+    stats = load_stats(stats_path) if stats_path.exists() else None
+    if stats is None:
+        errors = (proc.stderr or b"").decode("utf-8", errors="replace").strip()
+        if errors:
+            print(f"[warn] {tag} exited {proc.returncode}: {errors.splitlines()[-1]}", flush=True)
+        return row
+    row.update(
+        {
+            # wall_seconds is end to end like the tooling rows; this is the planner's own clock.
+            "solve_seconds": stats.get("wall_seconds"),
+            "found": get_metric(stats, "found"),
+            "timed_out": stats.get("timed_out"),
+            "return_code": stats.get("return_code"),
+            "metric": get_metric(stats, "metric"),
+            "makespan": get_metric(stats, "makespan"),
+            "actions": get_metric(stats, "actions"),
+            "states_evaluated": get_metric(stats, "states_evaluated"),
+            "peak_rss_mb": get_metric(stats, "peak_rss_mb"),
+            "user_cpu_seconds": get_metric(stats, "user_cpu_seconds"),
+            "system_cpu_seconds": get_metric(stats, "system_cpu_seconds"),
+            "stats_json": str(stats_path.relative_to(run_dir)),
+            "plan": str(plan_path.relative_to(run_dir)) if plan_path.exists() else None,
+        }
+    )
+    return row
+
+
+def run_tool(task: str, problem: Path, out_dir: Path) -> dict:
+    if task == "parse":
+        from maze_problem import parse_problem_file
+
+        start = time.perf_counter()
+        parse_problem_file(problem)
+        return {"wall_seconds": time.perf_counter() - start, "return_code": 0}
+    script, suffix = {"render": ("render_3d.py", ".html"), "dot": ("pddl_to_dot.py", ".dot")}[task]
+    cmd = [sys.executable, str(SCRIPTS / script), str(problem), str(out_dir / (problem.stem + suffix))]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=child_env(), check=False)
+    return {"wall_seconds": time.perf_counter() - start, "return_code": proc.returncode}
+
+
+def problem_cells(problem: Path) -> int:
+    from maze_problem import parse_problem_file
+
+    return len(parse_problem_file(problem).cells)
+
+
+def write_summary(rows, path: Path, sla_seconds=None):
+    """Median wall time per family, value and task as a Markdown table."""
+    groups = {}
+    for row in rows:
+        key = (row["family"], row["value"], row["task"])
+        groups.setdefault(key, []).append(row)
+    headers = ["family", "axis", "value", "cells", "task", "runs", "median_s", "max_s", "found", "timed_out"]
+    if sla_seconds is not None:
+        headers.append("within_sla")
+    lines = ["| " + " | ".join(headers) + " |", "| " + " | ".join("---" for _ in headers) + " |"]
+    for (family, value, task), group in sorted(groups.items()):
+        walls = [r["wall_seconds"] for r in group]
+        median = statistics.median(walls)
+        values = [
+            family,
+            group[0]["axis"],
+            str(value),
+            str(group[0]["cells"]),
+            task,
+            str(len(group)),
+            f"{median:.3f}",
+            f"{max(walls):.3f}",
+            str(sum(1 for r in group if r.get("found"))) if task.startswith("planner") else "",
+            str(sum(1 for r in group if r.get("timed_out"))) if task.startswith("planner") else "",
+        ]
+        if sla_seconds is not None:
+            values.append("yes" if median <= sla_seconds else "no")
+        lines.append("| " + " | ".join(values) + " |")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark planner and tooling runtime on generated maze families."
+    )
+    parser.add_argument(
+        "--domain",
+        type=Path,
+        default=Path("domains/domain.pddl"),
+        help="Domain PDDL path.",
+    )
+    parser.add_argument(
+        "--out-dir",
+        type=Path,
+        default=Path("benchmarks"),
+        help="Parent directory of the timestamped result directory.",
+    )
+    parser.add_argument(
+        "--families",
+        type=lambda value: [name for name in value.split(",") if name],
+        default=list(FAMILIES),
+        help=f"Comma-separated families to run (default: {','.join(FAMILIES)}).",
+    )
+    parser.add_argument("--size-sides", type=int_list, default=[4, 8, 16, 32, 64], help="size: 2D side lengths")
+    parser.add_argument("--dim-counts", type=int_list, default=[2, 3, 4, 5], help="dims: dimension counts")
+    parser.add_argument("--dims-cells", type=int, default=1024, help="dims: target cells per problem (default: 1024)")
+    parser.add_argument("--agent-counts", type=int_list, default=[1, 2, 3, 4], help="agents: agent counts")
+    parser.add_argument("--door-counts", type=int_list, default=[0, 2, 4, 8, 16], help="doors: door counts")
+    parser.add_argument("--base-dims", default="12,12", help="Maze of the agents/doors families (default: 12,12)")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0)")
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=60.0,
+        help="Per-run planner time limit in seconds.",
+    )
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per problem and task (default: 1).")
+    parser.add_argument(
+        "--modes",
+        type=lambda value: [name for name in value.split(",") if name],
+        default=["fast", "normal"],
+        help="Planner modes: fast (-N), normal, or both (default: fast,normal).",
+    )
+    parser.add_argument("--no-planner", action="store_true", help="Only benchmark the tooling.")
+    parser.add_argument("--no-tooling", action="store_true", help="Only benchmark the planner.")
+    parser.add_argument(
+        "--no-native",
+        action="store_true",
+        help="Pass --no-native so OPTIC runs even where the native solver would answer.",
+    )
+    parser.add_argument("--docker", action="store_true", help="Run OPTIC inside Docker.")
+    parser.add_argument("--docker-image", default=None, help="Docker image tag.")
+    parser.add_argument(
+        "--sla-seconds",
+        type=float,
+        default=None,
+        help="Mark which medians in summary.md stay within this many seconds.",
+    )
+    args = parser.parse_args()
+
+    unknown = sorted(set(args.families) - set(FAMILIES))
+    if unknown:
+        raise SystemExit(f"Unknown families: {', '.join(unknown)} (choose from {', '.join(FAMILIES)})")
+    bad_modes = sorted(set(args.modes) - {"fast", "normal"})
+    if bad_modes:
+        raise SystemExit(f"Unknown modes: {', '.join(bad_modes)} (choose from fast, normal)")
+
+    run_dir = args.out_dir / time.strftime("%Y%m%d-%H%M%S")
+    for sub in ("problems", "runs", "plans", "tooling"):
+        (run_dir / sub).mkdir(parents=True, exist_ok=True)
+
+    tasks = []
+    if not args.no_planner:
+        tasks.extend(f"planner-{mode}" for mode in args.modes)
+    if not args.no_tooling:
+        tasks.extend(TASKS)
+
+    rows = []
+    index_path = run_dir / "index.csv"
+    with index_path.open("w", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=INDEX_FIELDS)
+        writer.writeheader()
+        for spec in family_specs(args):
+            family, axis, value, _ = spec
+            problem = generate(spec, run_dir / "problems", args.seed)
+            cells = problem_cells(problem)
+            print(f"[problem] {problem.name} cells={cells}", flush=True)
+            for task in tasks:
+                for repeat in range(1, args.repeats + 1):
+                    if task.startswith("planner-"):
+                        tag = f"{problem.stem}-{task[len('planner-'):]}-r{repeat}"
+                        result = run_planner(args, problem, run_dir, tag, task == "planner-fast")
+                    else:
+                        result = run_tool(task, problem, run_dir / "tooling")
+                    row = {
+                        "family": family,
+                        "axis": axis,
+                        "value": value,
+                        "problem": str(problem.relative_to(run_dir)),
+                        "cells": cells,
+                        "task": task,
+                        "repeat": repeat,
+                    }
+                    row.update(result)
+                    rows.append(row)
+                    writer.writerow(row)
+                    fh.flush()
+                    print(
+                        f"[run] {problem.stem} {task} #{repeat} wall={row['wall_seconds']:.3f}s"
+                        + (f" found={row.get('found')} timed_out={row.get('timed_out')}" if task.startswith("planner") else ""),
+                        flush=True,
+                    )
+
+    summary_path = run_dir / "summary.md"
+    write_summary(rows, summary_path, args.sla_seconds)
+    print(f"[ok] Index:   {index_path}")
+    print(f"[ok] Summary: {summary_path}")
+    print(f"[next] python3 scripts/plot_stats.py {index_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Compare two sets of planner runs and fail on performance regressions.
+
+A set is a stats directory (its current files, or with `--history` every run
+ever ingested from it) or a tag in the run store (`aggregate_stats.py
+--ingest-tag`). Problems are matched by stats file stem; problems whose file
+changed between the sets (different `problem_sha256`) are skipped.
+
+For each metric (all lower-is-better) and problem the report gives both
+medians, the ratio new/base and, when both sides have at least two samples,
+a two-sided Mann-Whitney U p-value; a repeated-trial run (`run_batch.py
+--trials`) counts with every trial. Across problems it gives the geometric
+mean ratio. The exit code is 1 when a geometric mean ratio exceeds
+`1 + --threshold`, when a problem is significantly (p < `--alpha`) slower by
+more than the threshold, or when a problem solved in the base set is no
+longer solved.
+"""
+import argparse
+import csv
+import math
+import statistics
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from run_store import RunStore, default_store_path
+
+METRICS = ("wall_seconds", "states_evaluated", "metric")
+# Exact U distribution below this many samples (without ties); normal approximation above.
+EXACT_MAX_SAMPLES = 40
+
+
+@lru_cache(maxsize=None)
+def u_counts(n1: int, n2: int):
+    """Number of orderings giving each U statistic, for samples of size n1 and n2."""
+    if n1 == 0 or n2 == 0:
+        return (1,)
+    # The largest value comes from sample 1 (adds n2 to U) or from sample 2.
+    with_first = u_counts(n1 - 1, n2)
+    with_second = u_counts(n1, n2 - 1)
+    out = [0] * (n1 * n2 + 1)
+    for u, count in enumerate(with_first):
+        out[u + n2] += count
+    for u, count in enumerate(with_second):
+        out[u] += count
+    return tuple(out)
+
+
+def mann_whitney_p(a, b):
+    """Two-sided Mann-Whitney U p-value, or None with fewer than two samples on a side."""
+    n1, n2 = len(a), len(b)
+    if n1 < 2 or n2 < 2:
+        return None
+    ranked = sorted([(x, 0) for x in a] + [(x, 1) for x in b])
+    ranks = [0.0] * len(ranked)
+    ties = []
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        if j > i:
+            ties.append(j - i + 1)
+        i = j + 1
+    rank_sum = sum(r for r, (_, side) in zip(ranks, ranked) if side == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    u = min(u, n1 * n2 - u)
+    if not ties and n1 + n2 <= EXACT_MAX_SAMPLES:
+        counts = u_counts(n1, n2)
+        tail = sum(counts[: int(math.floor(u)) + 1]) / sum(counts)
+        return min(1.0, 2 * tail)
+    n = n1 + n2
+    tie_term = sum(t**3 - t for t in ties) / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / sigma
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+def load_set(store: RunStore, stats_dir=None, tag=None, history=False):
+    """`{problem: {"sha": set, "found": [...], metric: [samples]}}` for one run set."""
+    rows = store.query(
+        stats_dir=stats_dir,
+        current=not history,
+        tag=tag,
+        latest=False,
+        columns=["id", "problem", "problem_sha256", "found"] + list(METRICS),
+    )
+    trials = store.samples(row["id"] for row in rows)
+    out = {}
+    for row in rows:
+        entry = out.setdefault(row["problem"], {"sha": set(), "found": []})
+        entry["sha"].add(row["problem_sha256"])
+        entry["found"].append(bool(row["found"]))
+        for sample in trials.get(row["id"], [row]):
+            for metric in METRICS:
+                if sample[metric] is not None:
+                    entry.setdefault(metric, []).append(float(sample[metric]))
+    return out
+
+
+def compare(base: dict, new: dict, metrics, threshold: float, alpha: float):
+    """Per-problem rows, geometric means and the list of failures."""
+    rows = []
+    failures = []
+    ratios = {m: [] for m in metrics}
+    skipped = []
+    for problem in sorted(set(base) & set(new)):
+        b, n = base[problem], new[problem]
+        shas = (b["sha"] | n["sha"]) - {None}
+        if len(shas) > 1:
+            skipped.append(problem)
+            continue
+        if any(b["found"]) and not any(n["found"]):
+            failures.append(f"{problem}: solved in base, not in new")
+        for metric in metrics:
+            bs, ns = b.get(metric, []), n.get(metric, [])
+            if not bs or not ns:
+                continue
+            b_med, n_med = statistics.median(bs), statistics.median(ns)
+            ratio = n_med / b_med if b_med > 0 else None
+            p = mann_whitney_p(bs, ns)
+            if ratio is not None and n_med > 0:
+                ratios[metric].append(ratio)
+            regressed = ratio is not None and ratio > 1 + threshold
+            if regressed and p is not None and p < alpha:
+                failures.append(f"{problem}: {metric} {ratio:.2f}x base (p={p:.3g})")
+            rows.append(
+                {
+                    "problem": problem,
+                    "metric": metric,
+                    "base_n": len(bs),
+                    "new_n": len(ns),
+                    "base_median": b_med,
+                    "new_median": n_med,
+                    "ratio": ratio,
+                    "p_value": p,
+                    "verdict": verdict(ratio, p, threshold, alpha),
+                }
+            )
+    geomeans = {}
+    for metric, values in ratios.items():
+        if values:
+            geomeans[metric] = math.exp(sum(math.log(v) for v in values) / len(values))
+            if geomeans[metric] > 1 + threshold:
+                failures.append(f"geometric mean {metric} {geomeans[metric]:.3f}x base over {len(values)} problems")
+    return rows, geomeans, failures, skipped
+
+
+def verdict(ratio, p, threshold: float, alpha: float) -> str:
+    if ratio is None:
+        return ""
+    if abs(ratio - 1) <= threshold:
+        return "same"
+    word = "slower" if ratio > 1 else "faster"
+    if p is None:
+        return f"{word} (untested)"
+    return word if p < alpha else f"{word} (not significant)"
+
+
+def fmt(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.3f}" if abs(value) >= 0.001 or value == 0 else f"{value:.2e}"
+    return str(value)
+
+
+def markdown(rows, geomeans, base_label, new_label) -> str:
+    headers = ["problem", "metric", "base_n", "new_n", "base_median", "new_median", "ratio", "p_value", "verdict"]
+    lines = [f"Base: {base_label}  New: {new_label}  (ratio = new / base, lower is better)", ""]
+    lines.append("| " + " | ".join(headers) + " |")
+    lines.append("| " + " | ".join("---" for _ in headers) + " |")
+    for row in rows:
+        lines.append("| " + " | ".join(fmt(row[h]) for h in headers) + " |")
+    lines.append("")
+    for metric, value in geomeans.items():
+        lines.append(f"Geometric mean ratio {metric}: {value:.3f} (speedup {1 / value:.3f}x)")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two sets of runs and detect performance regressions.")
+    parser.add_argument("base", type=Path, nargs="?", help="Base stats directory.")
+    parser.add_argument("new", type=Path, nargs="?", help="New stats directory.")
+    parser.add_argument("--store", type=Path, default=None, help="Run store (default: <stats-dir>/runs.sqlite).")
+    parser.add_argument("--base-tag", default=None, help="Compare runs ingested with this tag ...")
+    parser.add_argument("--new-tag", default=None, help="... against runs ingested with this tag.")
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="With directories: use every run ingested from them as trials, not only the current files.",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=",".join(METRICS),
+        help=f"Comma-separated metrics to compare (default: {','.join(METRICS)}).",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed slowdown as a fraction: 0.10 fails above 1.10x base (default: 0.10).",
+    )
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level (default: 0.05).")
+    parser.add_argument("--out-md", type=Path, default=None, help="Also write the report here.")
+    parser.add_argument("--out-csv", type=Path, default=None, help="Write the per-problem rows as CSV.")
+    args = parser.parse_args()
+
+    metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
+    unknown = sorted(set(metrics) - set(METRICS))
+    if unknown:
+        raise SystemExit(f"Unknown metrics: {', '.join(unknown)} (choose from {', '.join(METRICS)})")
+
+    if args.base_tag or args.new_tag:
+        if not (args.base_tag and args.new_tag):
+            raise SystemExit("--base-tag and --new-tag go together")
+        store_path = args.store or default_store_path(args.base or Path("stats"))
+        with RunStore(store_path) as store:
+            base = load_set(store, tag=args.base_tag)
+            new = load_set(store, tag=args.new_tag)
+        base_label, new_label = f"tag {args.base_tag}", f"tag {args.new_tag}"
+    else:
+        if not (args.base and args.new):
+            raise SystemExit("Give two stats directories, or --base-tag and --new-tag")
+        sets = []
+        for stats_dir in (args.base, args.new):
+            if not stats_dir.is_dir():
+                raise SystemExit(f"Not a directory: {stats_dir}")
+            with RunStore(args.store or default_store_path(stats_dir)) as store:
+                store.ingest(stats_dir)
+                sets.append(load_set(store, stats_dir=stats_dir, history=args.history))
+        base, new = sets
+        base_label, new_label = str(args.base), str(args.new)
+
+    rows, geomeans, failures, skipped = compare(base, new, metrics, args.threshold, args.alpha)
+    if not rows:
+        raise SystemExit("No problems in common between the two sets")
+    report = markdown(rows, geomeans, base_label, new_label)
+    print(report, end="")
+    only = sorted(set(base) ^ set(new))
+    if only:
+        print(f"[warn] {len(only)} problem(s) in only one set: {', '.join(only[:10])}")
+    if skipped:
+        print(f"[warn] skipped {len(skipped)} problem(s) whose file changed: {', '.join(skipped[:10])}")
+    if args.out_md:
+        args.out_md.parent.mkdir(parents=True, exist_ok=True)
+        args.out_md.write_text(report, encoding="utf-8")
+    if args.out_csv:
+        args.out_csv.parent.mkdir(parents=True, exist_ok=True)
+        with args.out_csv.open("w", encoding="utf-8", newline="") as fh:
+            writer = csv.DictWriter(fh, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    if failures:
+        print()
+        print(f"REGRESSION (threshold {args.threshold:.0%}, alpha {args.alpha}):")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print()
+    print(f"No regression beyond {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
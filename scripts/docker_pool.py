@@ -0,0 +1,159 @@
+"""Pool of long-lived OPTIC containers driven with `docker exec`.
+
+`docker run --rm` per problem pays container start-up on every job. The pool
+starts N containers once (idling on `sleep infinity`), runs each job inside one
+of them and recycles a container after a configurable number of jobs so
+leaked state (tmp files, zombie planners) cannot accumulate.
+
+If a replacement container cannot be started (after `SPAWN_ATTEMPTS` tries),
+the pool shrinks by one; once no container is left, `acquire` raises
+`RuntimeError` for every remaining job instead of blocking.
+"""
+import itertools
+import os
+import queue
+import subprocess
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from run_optic import repo_relative, repo_root
+
+# Where docker/optic/Dockerfile installs the planner (its ENTRYPOINT).
+OPTIC_IN_IMAGE = "/opt/optic/release/optic/optic-clp"
+# Extra seconds after SIGTERM before the in-container `timeout` sends SIGKILL.
+KILL_GRACE_SECONDS = 2
+SPAWN_ATTEMPTS = 3
+
+
+class DockerWorkerPool:
+    def __init__(self, image: str, size: int, recycle_after: Optional[int] = None):
+        if size < 1:
+            raise ValueError("Pool size must be >= 1")
+        self.image = image
+        self.size = size
+        self.recycle_after = recycle_after
+        self.root = repo_root().resolve()
+        self._idle = queue.Queue()
+        self._names = itertools.count()
+        self._lock = threading.Lock()
+        self._live: List[dict] = []
+        self.started = 0
+        # Containers in use or idle; `None` in `_idle` means none are left.
+        self._available = 0
+        self._spawn_error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+            self._available += 1
+
+    def _spawn(self) -> dict:
+        with self._lock:
+            name = f"n-maze-worker-{os.getpid()}-{next(self._names)}"
+        cmd = [
+            "docker",
+            "run",
+            "-d",
+            "--rm",
+            "--name",
+            name,
+            "-v",
+            f"{self.root}:/work",
+            "-w",
+            "/work",
+            "--entrypoint",
+            "sleep",
+            self.image,
+            "infinity",
+        ]
+        proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Failed to start worker container {name}: {proc.stderr.strip()}")
+        worker = {"name": name, "jobs": 0, "broken": False}
+        with self._lock:
+            self._live.append(worker)
+            self.started += 1
+        return worker
+
+    def _remove(self, worker: dict):
+        subprocess.run(
+            ["docker", "rm", "-f", worker["name"]],
+            capture_output=True,
+            check=False,
+        )
+        with self._lock:
+            if worker in self._live:
+                self._live.remove(worker)
+
+    def acquire(self) -> dict:
+        """Block until a container is free and return it; `RuntimeError` once none are left."""
+        worker = self._idle.get()
+        if worker is None:
+            # Leave the marker for the next waiter.
+            self._idle.put(None)
+            raise RuntimeError(f"No worker containers left: {self._spawn_error}")
+        return worker
+
+    def release(self, worker: dict):
+        """Hand a container back; replace it if it is due for recycling or broken."""
+        worker["jobs"] += 1
+        due = self.recycle_after is not None and worker["jobs"] >= self.recycle_after
+        if due or worker["broken"]:
+            self._remove(worker)
+            worker = self._respawn()
+            if worker is None:
+                return
+        self._idle.put(worker)
+
+    def _respawn(self) -> Optional[dict]:
+        """A replacement container, or None after shrinking the pool when none would start."""
+        for _ in range(SPAWN_ATTEMPTS):
+            try:
+                return self._spawn()
+            except RuntimeError as exc:
+                error = exc
+        with self._lock:
+            self._spawn_error = error
+            self._available -= 1
+            left = self._available
+        print(f"[pool] {error}; continuing with {left} container(s)", flush=True)
+        if not left:
+            self._idle.put(None)
+        return None
+
+    def exec_cmd(
+        self,
+        worker: dict,
+        domain: Path,
+        problem: Path,
+        fast: bool,
+        time_limit: Optional[float] = None,
+    ):
+        """Build the `docker exec` command that runs one planner job in `worker`.
+
+        The time limit is enforced inside the container: killing the `docker
+        exec` client would leave the planner running in the worker.
+        """
+        domain_rel, problem_rel = repo_relative(domain, problem)
+        cmd = ["docker", "exec", worker["name"]]
+        if time_limit is not None:
+            cmd.extend(["timeout", f"--kill-after={KILL_GRACE_SECONDS}", f"{time_limit:g}"])
+        cmd.append(OPTIC_IN_IMAGE)
+        if fast:
+            cmd.append("-N")
+        cmd.extend([domain_rel, problem_rel])
+        return cmd
+
+    def close(self):
+        with self._lock:
+            live = list(self._live)
+        for worker in live:
+            self._remove(worker)
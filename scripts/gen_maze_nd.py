@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""Seeded procedural maze generator for any number of dimensions (requires numpy).
+
+The maze is carved on the full `d`-dimensional lattice given by `--dims`:
+
+- `kruskal` (default): randomized Kruskal, i.e. the minimum spanning tree of
+  the lattice under random edge weights. It is computed Borůvka-style with
+  array operations (each round every component takes its cheapest outgoing
+  edge; components are merged by pointer jumping), so 10^6 cells take seconds.
+- `backtracker`: recursive backtracker (iterative depth-first search). Long,
+  winding corridors; plain Python, so slower on big lattices.
+
+`--loops` then reopens that fraction of the remaining walls. Doors, timed
+doors, elevators and buttons are placed so that the problem stays solvable
+in the relaxed sense of `maze_analysis.py`: every button sits in a part of the
+maze reachable before the lock it opens. Cells are named `c<i>_<j>_..._<k>`.
+Moves along `--stairs-axis` (the first axis for 3+ dimensions) are stairs.
+"""
+import argparse
+import random
+from pathlib import Path
+
+import numpy as np
+
+from grid_arrays import concat_rows, declaration_lines, string_table, DECLARE_CHUNK
+from pddl_writer import section, write_problem
+
+EDGE_BLOCK = 1 << 16
+
+
+def lattice_edges(dims):
+    """`(u, v, axis)` arrays of every lattice edge, `u < v` in flat (C-order) ids."""
+    n = int(np.prod(dims))
+    strides = np.cumprod((list(dims[1:]) + [1])[::-1])[::-1]
+    coords = np.unravel_index(np.arange(n), dims)
+    us, vs, axes = [], [], []
+    for axis, stride in enumerate(strides):
+        u = np.flatnonzero(coords[axis] < dims[axis] - 1)
+        us.append(u)
+        vs.append(u + stride)
+        axes.append(np.full(len(u), axis, dtype=np.int8))
+    return np.concatenate(us), np.concatenate(vs), np.concatenate(axes)
+
+
+def spanning_forest(n: int, u, v):
+    """Minimum spanning forest of edges weighted by their position; returns `(in_tree, labels)`.
+
+    `labels[i]` is the component id of node `i` (the same for all nodes of a component).
+    """
+    comp = np.arange(n)
+    in_tree = np.zeros(len(u), dtype=bool)
+    edge_ids = np.arange(len(u))
+    while len(edge_ids):
+        cu = comp[u[edge_ids]]
+        cv = comp[v[edge_ids]]
+        live = cu != cv
+        edge_ids, cu, cv = edge_ids[live], cu[live], cv[live]
+        m = len(edge_ids)
+        if not m:
+            break
+        # The cheapest live edge of every component (edge_ids stay in weight order).
+        best = np.full(n, m, dtype=np.int64)
+        pos = np.arange(m)
+        np.minimum.at(best, cu, pos)
+        np.minimum.at(best, cv, pos)
+        roots = np.flatnonzero(best < m)
+        picked = best[roots]
+        in_tree[edge_ids[picked]] = True
+        other = np.where(cu[picked] == roots, cv[picked], cu[picked])
+        succ = np.arange(n)
+        succ[roots] = other
+        # Two components that picked the same edge point at each other: keep one as the root.
+        mutual = (succ[other] == roots) & (roots < other)
+        succ[roots[mutual]] = roots[mutual]
+        while True:
+            nxt = succ[succ]
+            if np.array_equal(nxt, succ):
+                break
+            succ = nxt
+        comp = succ[comp]
+    return in_tree, comp
+
+
+def backtracker_tree(dims, rng: random.Random, u, v, axis):
+    """Tree edges of a recursive-backtracker maze as a mask over the lattice edges."""
+    n = int(np.prod(dims))
+    strides = [int(s) for s in np.cumprod((list(dims[1:]) + [1])[::-1])[::-1]]
+    visited = bytearray(n)
+    coords = [0] * len(dims)
+    start = rng.randrange(n)
+    visited[start] = 1
+    stack = [start]
+    carved_lo = []
+    carved_axis = []
+    while stack:
+        cell = stack[-1]
+        rest = cell
+        for a, stride in enumerate(strides):
+            coords[a], rest = divmod(rest, stride)
+        options = []
+        for a, stride in enumerate(strides):
+            if coords[a] > 0 and not visited[cell - stride]:
+                options.append((cell - stride, a, cell - stride))
+            if coords[a] < dims[a] - 1 and not visited[cell + stride]:
+                options.append((cell + stride, a, cell))
+        if not options:
+            stack.pop()
+            continue
+        nxt, a, lo = options[rng.randrange(len(options))]
+        visited[nxt] = 1
+        carved_lo.append(lo)
+        carved_axis.append(a)
+        stack.append(nxt)
+    # Locate the carved edges among the lattice edges (sorted by axis, then u).
+    key = axis.astype(np.int64) * n + u
+    order = np.argsort(key, kind="stable")
+    found = np.searchsorted(key[order], np.array(carved_axis, dtype=np.int64) * n + np.array(carved_lo))
+    in_tree = np.zeros(len(u), dtype=bool)
+    in_tree[order[found]] = True
+    return in_tree
+
+
+class NameFormatter:
+    """Cell names `c<i>_<j>_..._<k>` for flat lattice ids, as `concat_rows` parts."""
+
+    def __init__(self, dims):
+        self.dims = dims
+        self.tables = [string_table([str(i) for i in range(size)]) for size in dims]
+
+    def parts(self, ids):
+        parts = [b"c"]
+        for axis, coord in enumerate(np.unravel_index(ids, self.dims)):
+            if axis:
+                parts.append(b"_")
+            parts.append(self.tables[axis] + (coord,))
+        return parts
+
+    def name(self, idx: int) -> str:
+        return concat_rows(self.parts(np.array([idx])), 1)
+
+
+def pair_lines(fmt: NameFormatter, head: str, u, v):
+    """`(head u v)` and `(head v u)` fact lines for edge arrays, in blocks."""
+    for lo in range(0, len(u), EDGE_BLOCK):
+        hi = min(len(u), lo + EDGE_BLOCK)
+        a = fmt.parts(u[lo:hi])
+        b = fmt.parts(v[lo:hi])
+        yield concat_rows(
+            [f"    ({head} ".encode()] + a + [b" "] + b + [f")\n    ({head} ".encode()] + b + [b" "] + a + [b")"],
+            hi - lo,
+        )
+
+
+def place_locks(rng: random.Random, n, u, v, open_mask, locks, starts, button_count):
+    """Put one button per lock where it can be reached before the lock opens.
+
+    `locks` are `(name, a, b)` locked edges. Components of the open passages are
+    grown from the starts; each step opens a random lock on the frontier and
+    places its button in a random cell already reached. Extra buttons beyond
+    one per lock open a random lock again and go anywhere reachable by then.
+    Returns `[(button_cell, lock_name)]` in button order.
+    """
+    _, comp = spanning_forest(n, u[open_mask], v[open_mask])
+    order = np.argsort(comp, kind="stable")
+    bounds = np.flatnonzero(np.diff(comp[order])) + 1
+    groups = np.split(order, bounds)
+    group_of = {int(comp[g[0]]): g for g in groups}
+
+    reached = []
+    reached_set = set()
+    weights = []
+
+    def reach(c):
+        if c not in reached_set:
+            reached_set.add(c)
+            reached.append(c)
+            weights.append(len(group_of[c]))
+
+    for cell in starts:
+        reach(int(comp[cell]))
+
+    used_cells = set(starts)
+
+    def random_reached_cell():
+        for _ in range(20):
+            c = rng.choices(reached, weights=weights)[0]
+            cell = int(group_of[c][rng.randrange(len(group_of[c]))])
+            if cell not in used_cells:
+                break
+        used_cells.add(cell)
+        return cell
+
+    pending = list(locks)
+    placed = []
+    while pending:
+        frontier = [i for i, (_, a, b) in enumerate(pending) if int(comp[a]) in reached_set or int(comp[b]) in reached_set]
+        if not frontier:
+            # Locks between parts nobody can reach: their buttons go anywhere reached.
+            frontier = list(range(len(pending)))
+        name, a, b = pending.pop(frontier[rng.randrange(len(frontier))])
+        placed.append((random_reached_cell(), name))
+        reach(int(comp[a]))
+        reach(int(comp[b]))
+    lock_names = [name for name, _, _ in locks]
+    while lock_names and len(placed) < button_count:
+        placed.append((random_reached_cell(), lock_names[rng.randrange(len(lock_names))]))
+    return placed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded N-dimensional temporal-maze problem.")
+    parser.add_argument("output", type=Path, help="Output problem.pddl path (.gz to compress)")
+    parser.add_argument("--dims", default="10,10,10", help="Lattice size per axis, e.g. 4,8,8,8 (default: 10,10,10)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--algorithm", choices=["kruskal", "backtracker"], default="kruskal")
+    parser.add_argument(
+        "--loops",
+        type=float,
+        default=0.05,
+        help="Fraction of the remaining walls to reopen after carving (0 = perfect maze, default: 0.05)",
+    )
+    parser.add_argument("--doors", type=int, default=2, help="Button-controlled doors (default: 2)")
+    parser.add_argument("--timed-doors", type=int, default=0, help="Doors open only in a time window (default: 0)")
+    parser.add_argument(
+        "--timed-window",
+        type=float,
+        default=200.0,
+        help="How long a timed door stays open (default: 200)",
+    )
+    parser.add_argument("--elevators", type=int, default=0, help="Button-activated elevators (default: 0)")
+    parser.add_argument(
+        "--buttons",
+        type=int,
+        default=None,
+        help="Total buttons; at least one per door/elevator, extras are redundant (default: one per lock)",
+    )
+    parser.add_argument("--agents", type=int, default=1, help="Number of agents (default: 1)")
+    parser.add_argument(
+        "--stairs-axis",
+        type=int,
+        default=None,
+        help="Axis whose moves are stairs, -1 for none (default: 0 with 3+ dimensions, else none)",
+    )
+    parser.add_argument("--problem", default=None, help="Problem name (default: derived from the options)")
+    parser.add_argument("--domain", default="temporal-maze", help="Domain name")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    args = parser.parse_args()
+
+    dims = tuple(int(part) for part in args.dims.split(","))
+    if len(dims) < 2 or min(dims) < 1:
+        raise SystemExit("--dims needs at least two positive sizes (names like c3 would read as legacy 2D names)")
+    n = int(np.prod(dims))
+    if args.agents < 1 or 2 * args.agents > n:
+        raise SystemExit(f"--agents must be between 1 and {n // 2} for {n} cells")
+    stairs_axis = args.stairs_axis if args.stairs_axis is not None else (0 if len(dims) >= 3 else -1)
+    rng = random.Random(args.seed)
+    nprng = np.random.default_rng(args.seed)
+
+    u, v, axis = lattice_edges(dims)
+    if args.algorithm == "kruskal":
+        order = nprng.permutation(len(u))
+        u, v, axis = u[order], v[order], axis[order]
+        in_tree, _ = spanning_forest(n, u, v)
+    else:
+        in_tree = backtracker_tree(dims, rng, u, v, axis)
+    passage = in_tree | (nprng.random(len(u)) < args.loops)
+
+    # Doors sit on spanning-tree edges (never on stairs). With --loops 0 each one separates
+    # the maze; reopened walls can give a way around it.
+    candidates = np.flatnonzero(in_tree & (axis != stairs_axis))
+    wanted = args.doors + args.timed_doors
+    if wanted > len(candidates):
+        raise SystemExit(f"Only {len(candidates)} tree edges can hold a door")
+    door_edges = nprng.choice(candidates, size=wanted, replace=False) if wanted else np.array([], dtype=np.int64)
+    is_door = np.zeros(len(u), dtype=bool)
+    is_door[door_edges] = True
+    doors = [(f"d{i + 1}", int(u[e]), int(v[e])) for i, e in enumerate(door_edges[: args.doors])]
+    timed = [(f"d{args.doors + i + 1}", int(u[e]), int(v[e])) for i, e in enumerate(door_edges[args.doors :])]
+
+    elevators = []
+    lift_axis = stairs_axis if stairs_axis >= 0 else 0
+    for idx in range(args.elevators):
+        for _ in range(100):
+            cell = rng.randrange(n)
+            coords = list(np.unravel_index(cell, dims))
+            other = rng.randrange(dims[lift_axis])
+            if abs(other - int(coords[lift_axis])) >= min(2, dims[lift_axis] - 1) and other != coords[lift_axis]:
+                coords[lift_axis] = other
+                elevators.append((f"e{idx + 1}", cell, int(np.ravel_multi_index(coords, dims))))
+                break
+        else:
+            raise SystemExit(f"Axis {lift_axis} is too short for an elevator")
+
+    cells = nprng.choice(n, size=2 * args.agents, replace=False)
+    starts = [int(c) for c in cells[: args.agents]]
+    goals = [int(c) for c in cells[args.agents :]]
+
+    # Timed doors count as closed here, like button doors: buttons are placed where they can
+    # be reached without waiting for a time window.
+    locks = doors + elevators
+    button_count = max(len(locks), args.buttons or 0)
+    buttons = place_locks(rng, n, u, v, passage & ~is_door, locks, starts, button_count)
+    timed_windows = []
+    for name, _, _ in timed:
+        opens = rng.randint(1, 50)
+        timed_windows.append((name, opens, opens + args.timed_window))
+
+    fmt = NameFormatter(dims)
+    name = fmt.name
+    open_adj = np.flatnonzero(passage & ~is_door & (axis != stairs_axis))
+    open_stairs = np.flatnonzero(passage & ~is_door & (axis == stairs_axis))
+    problem_name = args.problem or "maze-{}d-{}-s{}".format(len(dims), "x".join(map(str, dims)), args.seed)
+
+    def problem_lines():
+        yield f"(define (problem {problem_name})"
+        yield f"  (:domain {args.domain})"
+        yield "  (:objects"
+        yield from declaration_lines(
+            ((fmt.parts(np.arange(lo, min(n, lo + DECLARE_CHUNK))), min(n, lo + DECLARE_CHUNK) - lo)
+             for lo in range(0, n, DECLARE_CHUNK)),
+            n,
+            "cell",
+        )
+        if buttons:
+            yield "    " + " ".join(f"b{i + 1}" for i in range(len(buttons))) + " - button"
+        if doors or timed:
+            yield "    " + " ".join(d for d, _, _ in doors + timed) + " - door"
+        if elevators:
+            yield "    " + " ".join(e for e, _, _ in elevators) + " - elevator"
+        yield "    " + " ".join(f"a{i + 1}" for i in range(args.agents)) + " - agent"
+        yield "  )"
+        yield ""
+        yield "  (:init"
+        for i, cell in enumerate(starts):
+            yield f"    (agent-at a{i + 1} {name(cell)})"
+        for i in range(args.agents):
+            yield f"    (agent-free a{i + 1})"
+        yield ""
+        yield from section("Adjacency for open corridors", pair_lines(fmt, "adjacent", u[open_adj], v[open_adj]))
+        yield from section("Stairs between levels", pair_lines(fmt, "stairs", u[open_stairs], v[open_stairs]))
+        yield from section(
+            "Door edges (closed initially)",
+            (line for d, a, b in doors + timed
+             for line in (f"    (connects {d} {name(a)} {name(b)})", f"    (connects {d} {name(b)} {name(a)})")),
+        )
+        yield from section(
+            "Elevator connections",
+            (line for e, a, b in elevators
+             for line in (f"    (elevator-connects {e} {name(a)} {name(b)})",
+                          f"    (elevator-connects {e} {name(b)} {name(a)})")),
+        )
+        elevator_names = {e for e, _, _ in elevators}
+        yield from section(
+            "Buttons open doors",
+            (f"    ({'up-elevator' if lock in elevator_names else 'up'} b{i + 1} {lock})"
+             for i, (_, lock) in enumerate(buttons)),
+        )
+        yield from section(
+            "Button locations",
+            (f"    (button-at b{i + 1} {name(cell)})" for i, (cell, _) in enumerate(buttons)),
+        )
+        yield from section(
+            "Timed doors",
+            (line for d, opens, closes in timed_windows
+             for line in (f"    (at {opens} (door-open {d}))", f"    (at {closes:g} (not (door-open {d})))")),
+        )
+        yield "    (= (total-cost) 0)"
+        yield "  )"
+        yield ""
+        yield "  (:goal (and"
+        for i, cell in enumerate(goals):
+            yield f"    (agent-at a{i + 1} {name(cell)})"
+        yield "  ))"
+        yield ""
+        yield "  (:metric minimize (total-cost))"
+        yield ")"
+
+    write_problem(args.output, problem_lines(), args.gzip)
+    print(
+        f"{problem_name}: {n} cells, {int(passage.sum())} passages "
+        f"({int(in_tree.sum())} tree + {int((passage & ~in_tree).sum())} loops), "
+        f"{len(doors)} doors, {len(timed)} timed doors, {len(elevators)} elevators, "
+        f"{len(buttons)} buttons, {args.agents} agent(s) -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
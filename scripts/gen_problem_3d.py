@@ -2,6 +2,8 @@
 import argparse
 from pathlib import Path
 
+from pddl_writer import typed_names, write_problem
+
 
 def cell(z, r, c):
     return f"c{z}_{r}_{c}"
@@ -14,7 +16,8 @@ def add_edge(edges, a, b):
 
 def main():
     parser = argparse.ArgumentParser(description="Generate a sparse 3D maze problem (10x10x10).")
-    parser.add_argument("output", type=Path, help="Output problem.pddl path")
+    parser.add_argument("output", type=Path, help="Output problem.pddl path (.gz to compress)")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
     args = parser.parse_args()
 
     size = 10
@@ -114,66 +117,66 @@ def main():
         cells.add(a)
         cells.add(b)
 
-    # PDDL output
-    out = []
-    out.append("(define (problem maze-3d-10x10x10)")
-    out.append("  (:domain temporal-maze)")
-    out.append("  (:objects")
-    out.append("    " + " ".join(sorted(cells)) + " - cell")
-    out.append("    " + " ".join(sorted(button_positions.keys())) + " - button")
-    out.append("    d1 d2 d3 d4 d5 d6 - door")
-    out.append("    e1 - elevator")
-    out.append("    a1 - agent")
-    out.append("  )")
-    out.append("")
-    out.append("  (:init")
-    out.append(f"    (agent-at a1 {cell(0,0,0)})")
-    out.append("    (agent-free a1)")
-    out.append("")
-    out.append("    ;; Adjacency for open corridors")
-    for a, b in sorted(adjacency):
-        out.append(f"    (adjacent {a} {b})")
-    out.append("")
-    out.append("    ;; Door edges (closed initially)")
-    for d, a, b in connects:
-        out.append(f"    (connects {d} {a} {b})")
-    out.append("")
-    out.append("    ;; Stairs between levels")
-    for a, b in sorted(stairs):
-        out.append(f"    (stairs {a} {b})")
-    out.append("")
-    out.append("    ;; Elevator connections")
-    for a, b in sorted(elevator_edges):
-        out.append(f"    (elevator-connects e1 {a} {b})")
-    out.append("")
-    out.append("    ;; Buttons open doors")
-    out.append("    (up b1 d1)")
-    out.append("    (up b2 d2)")
-    out.append("    (up b3 d3)")
-    out.append("    (up b4 d4)")
-    out.append("    (up-elevator b5 e1)")
-    out.append("")
-    out.append("    ;; Button locations")
-    for b, (z, r, c) in button_positions.items():
-        out.append(f"    (button-at {b} {cell(z, r, c)})")
-    out.append("")
-    out.append("    ;; Timed doors")
-    out.append("    (at 30 (door-open d5))")
-    out.append("    (at 200 (not (door-open d5)))")
-    out.append("    (at 120 (door-open d6))")
-    out.append("    (at 300 (not (door-open d6)))")
-    out.append("")
-    out.append("    (= (total-cost) 0)")
-    out.append("  )")
-    out.append("")
-    out.append("  (:goal (and")
-    out.append(f"    (agent-at a1 {cell(9,0,9)})")
-    out.append("  ))")
-    out.append("")
-    out.append("  (:metric minimize (total-cost))")
-    out.append(")")
-
-    args.output.write_text("\n".join(out) + "\n", encoding="utf-8")
+    # PDDL output, streamed section by section
+    def problem_lines():
+        yield "(define (problem maze-3d-10x10x10)"
+        yield "  (:domain temporal-maze)"
+        yield "  (:objects"
+        yield from typed_names(sorted(cells), "cell")
+        yield "    " + " ".join(sorted(button_positions.keys())) + " - button"
+        yield "    d1 d2 d3 d4 d5 d6 - door"
+        yield "    e1 - elevator"
+        yield "    a1 - agent"
+        yield "  )"
+        yield ""
+        yield "  (:init"
+        yield f"    (agent-at a1 {cell(0,0,0)})"
+        yield "    (agent-free a1)"
+        yield ""
+        yield "    ;; Adjacency for open corridors"
+        for a, b in sorted(adjacency):
+            yield f"    (adjacent {a} {b})"
+        yield ""
+        yield "    ;; Door edges (closed initially)"
+        for d, a, b in connects:
+            yield f"    (connects {d} {a} {b})"
+        yield ""
+        yield "    ;; Stairs between levels"
+        for a, b in sorted(stairs):
+            yield f"    (stairs {a} {b})"
+        yield ""
+        yield "    ;; Elevator connections"
+        for a, b in sorted(elevator_edges):
+            yield f"    (elevator-connects e1 {a} {b})"
+        yield ""
+        yield "    ;; Buttons open doors"
+        yield "    (up b1 d1)"
+        yield "    (up b2 d2)"
+        yield "    (up b3 d3)"
+        yield "    (up b4 d4)"
+        yield "    (up-elevator b5 e1)"
+        yield ""
+        yield "    ;; Button locations"
+        for b, (z, r, c) in button_positions.items():
+            yield f"    (button-at {b} {cell(z, r, c)})"
+        yield ""
+        yield "    ;; Timed doors"
+        yield "    (at 30 (door-open d5))"
+        yield "    (at 200 (not (door-open d5)))"
+        yield "    (at 120 (door-open d6))"
+        yield "    (at 300 (not (door-open d6)))"
+        yield ""
+        yield "    (= (total-cost) 0)"
+        yield "  )"
+        yield ""
+        yield "  (:goal (and"
+        yield f"    (agent-at a1 {cell(9,0,9)})"
+        yield "  ))"
+        yield ""
+        yield "  (:metric minimize (total-cost))"
+        yield ")"
+
+    write_problem(args.output, problem_lines(), args.gzip)
 
 
 if __name__ == "__main__":
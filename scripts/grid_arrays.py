@@ -0,0 +1,253 @@
+"""Vectorized grid-to-PDDL emission for `grid_to_pddl.py` (requires numpy).
+
+The grid is one uint8 array of ASCII codes shaped `(layers, rows, cols)`. It
+comes from the text format, or straight from disk without parsing: a `.npy`
+file (memory-mapped), or a raw byte file with `--raw-shape`. Open, door and
+button cells are boolean masks. The down/right neighbour pairs within a layer
+and the stair pairs between layers come from shifted masks. Names and facts
+are formatted in bulk with numpy string ufuncs, a block of rows at a time.
+Everything is emitted in the same order as the pure-Python path, so the output
+is byte-identical.
+"""
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from pddl_writer import NAMES_PER_LINE
+
+WALL = ord("#")
+SPACE = ord(" ")
+START = ord("S")
+GOAL = ord("G")
+# Roughly how many cells one formatted block covers.
+BLOCK_CELLS = 1 << 16
+# Names per declaration block; a multiple of NAMES_PER_LINE.
+DECLARE_CHUNK = 64 * NAMES_PER_LINE
+
+
+def load_grid_array(path: Path, raw_shape: Optional[Sequence[int]] = None):
+    """Memory-map a `.npy` grid, or a raw uint8 grid of `raw_shape`; None for text grids."""
+    path = Path(path)
+    if path.suffix == ".npy":
+        grid = np.load(path, mmap_mode="r")
+    elif raw_shape:
+        grid = np.memmap(path, dtype=np.uint8, mode="r", shape=tuple(raw_shape))
+    else:
+        return None
+    if grid.dtype != np.uint8:
+        raise ValueError(f"Grid array must be uint8 ASCII codes, not {grid.dtype}")
+    if grid.ndim == 2:
+        grid = grid[None]
+    if grid.ndim != 3:
+        raise ValueError("Grid array must be (rows, cols) or (layers, rows, cols)")
+    return grid
+
+
+def layers_to_array(layers):
+    """Pack text layers (from `read_layers`) into one array; None if they are not plain ASCII."""
+    rows = len(layers[0])
+    cols = len(layers[0][0])
+    grid = np.empty((len(layers), rows, cols), dtype=np.uint8)
+    for z, layer in enumerate(layers):
+        if len(layer) != rows or len(layer[0]) != cols:
+            raise ValueError("All layers must have the same dimensions")
+        try:
+            data = "".join(layer).encode("ascii")
+        except UnicodeEncodeError:
+            return None
+        grid[z] = np.frombuffer(data, dtype=np.uint8).reshape(rows, cols)
+    return grid
+
+
+def string_table(strings):
+    """`(table, lengths)`: `strings` as zero-padded rows of a uint8 matrix."""
+    data = [text.encode("ascii") for text in strings]
+    width = max(1, max(len(d) for d in data))
+    table = np.frombuffer(b"".join(d.ljust(width, b"\0") for d in data), dtype=np.uint8)
+    return table.reshape(len(data), width), np.array([len(d) for d in data], dtype=np.int64)
+
+
+def concat_rows(parts, n: int, sep: bytes = b"\n") -> str:
+    """Concatenate `parts` row-wise for `n` rows and join the rows with `sep`.
+
+    Each part is a constant `bytes` or a `(table, lengths, index)` triple that
+    picks row `index[i]` of a `string_table` for row `i`. The parts are laid
+    side by side in a zero-padded `(n, width)` byte matrix and the padding is
+    squeezed out in one pass, so no per-row Python string is ever created.
+    """
+    columns = []
+    for part in parts + [sep]:
+        if isinstance(part, bytes):
+            if part:
+                columns.append(np.broadcast_to(np.frombuffer(part, dtype=np.uint8), (n, len(part))))
+        else:
+            columns.append(part[0][part[2]])
+    out = np.hstack(columns).tobytes().replace(b"\0", b"").decode("ascii")
+    # The caller adds the separator after the last row.
+    return out[: len(out) - len(sep)] if sep else out
+
+
+def declaration_lines(chunks, total: int, typ: str):
+    """`    n1 n2 ... - typ` lines for `total` names, wrapped like `pddl_writer.typed_names`.
+
+    `chunks` yields `(parts, count)` name parts (see `concat_rows`) of
+    `DECLARE_CHUNK` names each, except the last.
+    """
+    if not total:
+        yield f"     - {typ}"
+        return
+    # Each name: optional indent + name + one of " ", "\n", "" (block end) or " - typ" (last).
+    # Blocks hold a whole number of lines, so they end where `write_lines` adds a newline.
+    lead = string_table(["", "    "])
+    trail = string_table([" ", "\n", "", f" - {typ}"])
+    done = 0
+    for parts, count in chunks:
+        in_line = (done + np.arange(count)) % NAMES_PER_LINE
+        trail_idx = np.where(in_line == NAMES_PER_LINE - 1, 1, 0)
+        trail_idx[-1] = 3 if done + count == total else 2
+        yield concat_rows([lead + ((in_line == 0).astype(np.int64),)] + parts + [trail + (trail_idx,)], count, b"")
+        done += count
+
+
+class ArrayGrid:
+    """Same interface as `grid_to_pddl.TextGrid`; lines come out in large blocks."""
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.layer_count, self.rows, self.cols = grid.shape
+        layered = self.layer_count > 1
+        # `c{z}_{r}_{c}` / `c{r}_{c}` like `grid_to_pddl.cell_name`: the separators live in the tables.
+        self._layer_str = string_table([f"c{z}_" if layered else "c" for z in range(self.layer_count)])
+        self._row_str = string_table([f"{r}_" for r in range(self.rows + 1)])
+        self._col_str = string_table([str(c) for c in range(self.cols + 1)])
+        self._block_rows = max(1, BLOCK_CELLS // max(1, self.cols))
+
+    def _name(self, z, r, c):
+        """Parts of the cell names for index arrays `z`, `r`, `c` (see `concat_rows`)."""
+        return [self._layer_str + (z,), self._row_str + (r,), self._col_str + (c,)]
+
+    def _prefix(self, z) -> bytes:
+        table, lengths = self._layer_str
+        return table[z][: lengths[z]].tobytes()
+
+    def is_open(self, z):
+        layer = self.grid[z]
+        return (layer != WALL) & (layer != SPACE)
+
+    def is_door(self, z):
+        layer = self.grid[z]
+        return (layer >= ord("a")) & (layer <= ord("z"))
+
+    def name(self, z, r, c) -> str:
+        parts = self._name(np.array([z]), np.array([r]), np.array([c]))
+        return concat_rows(parts, 1)
+
+    def _unique(self, counts, codes, what):
+        """Map letter -> cell name for the `codes` present, failing when one appears twice."""
+        out = {}
+        for code in codes:
+            if counts[code] > 1:
+                raise ValueError(f"{what} {chr(code)} appears multiple times")
+            if counts[code]:
+                out[chr(code)] = self.name(*np.argwhere(self.grid == code)[0])
+        return out
+
+    def scan(self):
+        """Check the grid and return `(start, goal, button_cells, door_cells)`."""
+        counts = np.bincount(np.asarray(self.grid).ravel(), minlength=256)
+        for code, what in ((START, "start"), (GOAL, "goal")):
+            if counts[code] > 1:
+                raise ValueError(f"Multiple {what} cells found")
+        if not counts[START] or not counts[GOAL]:
+            raise ValueError("Grid must contain S (start) and G (goal)")
+        start = self._unique(counts, [START], "Start")["S"]
+        goal = self._unique(counts, [GOAL], "Goal")["G"]
+        buttons = [c for c in range(ord("A"), ord("Z") + 1) if c not in (START, GOAL)]
+        doors = range(ord("a"), ord("z") + 1)
+        return start, goal, self._unique(counts, buttons, "Button"), self._unique(counts, doors, "Door")
+
+    def _row_blocks(self):
+        for r0 in range(0, self.rows, self._block_rows):
+            yield r0, min(self.rows, r0 + self._block_rows)
+
+    def _open_cells(self, chunk: int):
+        """Yield `(z, r, c)` index arrays of the open cells in grid order, `chunk` at a time."""
+        carry = []
+        held = 0
+        for z in range(self.layer_count):
+            is_open = self.is_open(z)
+            for r0, r1 in self._row_blocks():
+                r, c = np.nonzero(is_open[r0:r1])
+                carry.append((np.full(len(r), z), r + r0, c))
+                held += len(r)
+                while held >= chunk:
+                    z_all, r_all, c_all = (np.concatenate(a) for a in zip(*carry))
+                    yield z_all[:chunk], r_all[:chunk], c_all[:chunk]
+                    carry = [(z_all[chunk:], r_all[chunk:], c_all[chunk:])]
+                    held -= chunk
+        if held:
+            yield tuple(np.concatenate(a) for a in zip(*carry))
+
+    def cell_lines(self):
+        """Cell object declarations, wrapped like `pddl_writer.typed_names`."""
+        total = sum(int(np.count_nonzero(self.is_open(z))) for z in range(self.layer_count))
+        chunks = ((self._name(z, r, c), len(z)) for z, r, c in self._open_cells(DECLARE_CHUNK))
+        return declaration_lines(chunks, total, "cell")
+
+    def edge_lines(self, doors: bool):
+        for z in range(self.layer_count):
+            is_open = self.is_open(z)
+            is_door = self.is_door(z)
+            prefix = self._prefix(z)
+            for r0, r1 in self._row_blocks():
+                # One extra row so the down pairs of the block's last row are seen.
+                o = is_open[r0 : r1 + 1]
+                d = is_door[r0 : r1 + 1]
+                n = r1 - r0
+                slots = np.zeros((n, self.cols, 2), dtype=bool)
+                down = o[:-1] & o[1:] & ((d[:-1] | d[1:]) == doors)
+                slots[: len(down), :, 0] = down
+                right = o[:n, :-1] & o[:n, 1:]
+                slots[:, :-1, 1] = right & ((d[:n, :-1] | d[:n, 1:]) == doors)
+                r, c, k = np.nonzero(slots)
+                if not len(r):
+                    continue
+                r += r0
+                rr = r + (k == 0)
+                cc = c + (k == 1)
+                a = [self._row_str + (r,), self._col_str + (c,)]
+                b = [self._row_str + (rr,), self._col_str + (cc,)]
+                if not doors:
+                    yield concat_rows(
+                        [b"    (adjacent " + prefix] + a + [b" " + prefix] + b
+                        + [b")\n    (adjacent " + prefix] + b + [b" " + prefix] + a + [b")"],
+                        len(r),
+                    )
+                    continue
+                # Door edges are rare: format them one by one.
+                layer = self.grid[z]
+                for i in range(len(r)):
+                    a_name = self.name(z, r[i], c[i])
+                    b_name = self.name(z, rr[i], cc[i])
+                    for ch in (int(layer[r[i], c[i]]), int(layer[rr[i], cc[i]])):
+                        if ord("a") <= ch <= ord("z"):
+                            d_id = f"d{ch - ord('a') + 1}"
+                            yield f"    (connects {d_id} {a_name} {b_name})"
+                            yield f"    (connects {d_id} {b_name} {a_name})"
+
+    def stair_lines(self):
+        for z in range(self.layer_count - 1):
+            both = self.is_open(z) & self.is_open(z + 1)
+            lower = self._prefix(z)
+            upper = self._prefix(z + 1)
+            for r0, r1 in self._row_blocks():
+                r, c = np.nonzero(both[r0:r1])
+                if not len(r):
+                    continue
+                rc = [self._row_str + (r + r0,), self._col_str + (c,)]
+                yield concat_rows(
+                    [b"    (stairs " + lower] + rc + [b" " + upper] + rc
+                    + [b")\n    (stairs " + upper] + rc + [b" " + lower] + rc + [b")"],
+                    len(r),
+                )
@@ -2,21 +2,24 @@
 import argparse
 from pathlib import Path
 
+from pddl_writer import section, typed_names, write_problem
+
 
 def read_layers(path: Path):
-    lines = [line.rstrip("\n") for line in path.read_text(encoding="utf-8", errors="ignore").splitlines()]
     layers = []
     current = []
-    for line in lines:
-        stripped = line.strip()
-        if not stripped or stripped.startswith(";"):
-            continue
-        if stripped == "---":
-            if current:
-                layers.append(current)
-                current = []
-            continue
-        current.append(line)
+    with open(path, encoding="utf-8", errors="ignore") as fh:
+        for line in fh:
+            line = line.rstrip("\r\n")
+            stripped = line.strip()
+            if not stripped or stripped.startswith(";"):
+                continue
+            if stripped == "---":
+                if current:
+                    layers.append(current)
+                    current = []
+                continue
+            current.append(line)
 
     if current:
         layers.append(current)
@@ -27,15 +30,16 @@ def read_layers(path: Path):
     grids = []
     for rows in layers:
         width = max(len(r) for r in rows)
-        grid = [list(r.ljust(width)) for r in rows]
-        grids.append(grid)
+        # Rows stay strings (one byte per cell) rather than lists of characters.
+        grids.append([r.ljust(width) for r in rows])
     return grids
 
 
 def cell_name(r, c, z=None):
+    # Separated like gen_maze_nd.py: `c{r}{c}` made c1_11 and c11_1 both `c111`.
     if z is None:
-        return f"c{r}{c}"
-    return f"c{z}{r}{c}"
+        return f"c{r}_{c}"
+    return f"c{z}_{r}_{c}"
 
 
 def is_wall(ch):
@@ -56,25 +60,15 @@ def letter_index(ch):
     return ord(ch) - ord("a") + 1
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Convert ASCII grid to PDDL problem for temporal-maze.")
-    parser.add_argument("grid", type=Path, help="Path to ASCII grid file")
-    parser.add_argument("output", type=Path, help="Path to write problem.pddl")
-    parser.add_argument("--domain", default="temporal-maze", help="Domain name")
-    parser.add_argument("--problem", default="maze-2d-generated", help="Problem name")
-    parser.add_argument(
-        "--stairs",
-        action="store_true",
-        help="Connect matching cells between layers with stairs",
-    )
-    args = parser.parse_args()
+def is_open(ch):
+    return not is_wall(ch) and ch != " "
+
 
-    layers = read_layers(args.grid)
-    layer_count = len(layers)
+def scan_grid(layers):
+    """Check the layers and return `(start, goal, button_cells, door_cells)`."""
+    layered = len(layers) > 1
     rows = len(layers[0])
     cols = len(layers[0][0])
-
-    cells = []
     door_cells = {}
     button_cells = {}
     start = None
@@ -83,13 +77,11 @@ def main():
     for z, grid in enumerate(layers):
         if len(grid) != rows or len(grid[0]) != cols:
             raise ValueError("All layers must have the same dimensions")
-        for r in range(rows):
-            for c in range(cols):
-                ch = grid[r][c]
-                if is_wall(ch) or ch == " ":
+        for r, row in enumerate(grid):
+            for c, ch in enumerate(row):
+                if ch == "." or not is_open(ch):
                     continue
-                name = cell_name(r, c, z if layer_count > 1 else None)
-                cells.append(name)
+                name = cell_name(r, c, z if layered else None)
                 if ch == "S":
                     if start is not None:
                         raise ValueError("Multiple start cells found")
@@ -109,121 +101,203 @@ def main():
 
     if start is None or goal is None:
         raise ValueError("Grid must contain S (start) and G (goal)")
+    return start, goal, button_cells, door_cells
 
-    buttons = sorted(button_cells.keys())
-    doors = sorted(door_cells.keys())
 
-    adjacency = []
-    connects = []
+def iter_cells(layers):
+    layered = len(layers) > 1
+    for z, grid in enumerate(layers):
+        for r, row in enumerate(grid):
+            for c, ch in enumerate(row):
+                if is_open(ch):
+                    yield cell_name(r, c, z if layered else None)
 
-    def add_adj(a, b):
-        adjacency.append((a, b))
 
-    def add_conn(door_id, a, b):
-        connects.append((door_id, a, b))
+def iter_grid_edges(layers, doors: bool):
+    """Yield the facts of one kind of in-layer edge, both directions, in grid order.
 
+    `doors=False` gives `(adjacent a b)` between open cells, `doors=True` the
+    `(connects d a b)` edges touching a door cell.
+    """
+    layered = len(layers) > 1
+    rows = len(layers[0])
+    cols = len(layers[0][0])
     for z, grid in enumerate(layers):
+        zz = z if layered else None
         for r in range(rows):
+            row = grid[r]
+            below = grid[r + 1] if r + 1 < rows else None
             for c in range(cols):
-                ch = grid[r][c]
-                if is_wall(ch) or ch == " ":
+                ch = row[c]
+                if not is_open(ch):
                     continue
-                a = cell_name(r, c, z if layer_count > 1 else None)
-                for dr, dc in [(1, 0), (0, 1)]:
-                    rr, cc = r + dr, c + dc
-                    if rr >= rows or cc >= cols:
+                a_is_door = is_door(ch)
+                a = None
+                neighbours = (
+                    (r + 1, c, below[c] if below else None),
+                    (r, c + 1, row[c + 1] if c + 1 < cols else None),
+                )
+                for rr, cc, ch2 in neighbours:
+                    if ch2 is None or not is_open(ch2):
                         continue
-                    ch2 = grid[rr][cc]
-                    if is_wall(ch2) or ch2 == " ":
-                        continue
-                    b = cell_name(rr, cc, z if layer_count > 1 else None)
-
-                    a_is_door = is_door(ch)
                     b_is_door = is_door(ch2)
+                    if doors != (a_is_door or b_is_door):
+                        continue
+                    a = a or cell_name(r, c, zz)
+                    b = cell_name(rr, cc, zz)
 
-                    if not a_is_door and not b_is_door:
-                        add_adj(a, b)
-                        add_adj(b, a)
+                    if not doors:
+                        yield f"    (adjacent {a} {b})"
+                        yield f"    (adjacent {b} {a})"
                     else:
                         if a_is_door:
                             d_id = f"d{letter_index(ch)}"
-                            add_conn(d_id, a, b)
-                            add_conn(d_id, b, a)
+                            yield f"    (connects {d_id} {a} {b})"
+                            yield f"    (connects {d_id} {b} {a})"
                         if b_is_door:
                             d_id = f"d{letter_index(ch2)}"
-                            add_conn(d_id, a, b)
-                            add_conn(d_id, b, a)
-
-    stairs = []
-    if args.stairs and layer_count > 1:
-        for z in range(layer_count - 1):
-            g0 = layers[z]
-            g1 = layers[z + 1]
-            for r in range(rows):
-                for c in range(cols):
-                    if is_wall(g0[r][c]) or g0[r][c] == " ":
-                        continue
-                    if is_wall(g1[r][c]) or g1[r][c] == " ":
-                        continue
-                    a = cell_name(r, c, z)
-                    b = cell_name(r, c, z + 1)
-                    stairs.append((a, b))
-                    stairs.append((b, a))
-
-    out = []
-    out.append(f"(define (problem {args.problem})")
-    out.append(f"  (:domain {args.domain})")
-    out.append("  (:objects")
-    out.append("    " + " ".join(cells) + " - cell")
+                            yield f"    (connects {d_id} {a} {b})"
+                            yield f"    (connects {d_id} {b} {a})"
+
+
+def iter_stairs(layers):
+    rows = len(layers[0])
+    cols = len(layers[0][0])
+    for z in range(len(layers) - 1):
+        g0 = layers[z]
+        g1 = layers[z + 1]
+        for r in range(rows):
+            for c in range(cols):
+                if not is_open(g0[r][c]) or not is_open(g1[r][c]):
+                    continue
+                a = cell_name(r, c, z)
+                b = cell_name(r, c, z + 1)
+                yield (a, b)
+                yield (b, a)
+
+
+class TextGrid:
+    """Layers as lists of row strings; the pure-Python emitter."""
+
+    def __init__(self, layers):
+        self.layers = layers
+        self.layer_count = len(layers)
+
+    def scan(self):
+        return scan_grid(self.layers)
+
+    def cell_lines(self):
+        return typed_names(iter_cells(self.layers), "cell")
+
+    def edge_lines(self, doors: bool):
+        return iter_grid_edges(self.layers, doors)
+
+    def stair_lines(self):
+        return (f"    (stairs {a} {b})" for a, b in iter_stairs(self.layers))
+
+
+def problem_lines(args, grid, start, goal, button_cells, door_cells):
+    buttons = sorted(button_cells.keys())
+    doors = sorted(door_cells.keys())
+
+    yield f"(define (problem {args.problem})"
+    yield f"  (:domain {args.domain})"
+    yield "  (:objects"
+    yield from grid.cell_lines()
     if buttons:
-        out.append("    " + " ".join(f"b{letter_index(b)}" for b in buttons) + " - button")
+        yield "    " + " ".join(f"b{letter_index(b)}" for b in buttons) + " - button"
     if doors:
-        out.append("    " + " ".join(f"d{letter_index(d)}" for d in doors) + " - door")
-    out.append("    a1 - agent")
-    out.append("  )")
-    out.append("")
-    out.append("  (:init")
-    out.append(f"    (agent-at a1 {start})")
-    out.append("    (agent-free a1)")
-    out.append("")
-    out.append("    ;; Adjacency for open corridors")
-    for a, b in adjacency:
-        out.append(f"    (adjacent {a} {b})")
-    out.append("")
-    if connects:
-        out.append("    ;; Door edges (closed initially)")
-        for d_id, a, b in connects:
-            out.append(f"    (connects {d_id} {a} {b})")
-        out.append("")
-    if stairs:
-        out.append("    ;; Stairs between layers")
-        for a, b in stairs:
-            out.append(f"    (stairs {a} {b})")
-        out.append("")
+        yield "    " + " ".join(f"d{letter_index(d)}" for d in doors) + " - door"
+    yield "    a1 - agent"
+    yield "  )"
+    yield ""
+    yield "  (:init"
+    yield f"    (agent-at a1 {start})"
+    yield "    (agent-free a1)"
+    yield ""
+    # Each edge section is its own pass over the grid, so no edge list is ever held.
+    yield "    ;; Adjacency for open corridors"
+    yield from grid.edge_lines(doors=False)
+    yield ""
+    yield from section("Door edges (closed initially)", grid.edge_lines(doors=True))
+    if args.stairs and grid.layer_count > 1:
+        yield from section("Stairs between layers", grid.stair_lines())
     if buttons:
-        out.append("    ;; Buttons open doors")
+        yield "    ;; Buttons open doors"
         for b in buttons:
-            b_id = f"b{letter_index(b)}"
-            d_id = f"d{letter_index(b)}"
-            out.append(f"    (up {b_id} {d_id})")
-        out.append("")
-        out.append("    ;; Button locations")
+            yield f"    (up b{letter_index(b)} d{letter_index(b)})"
+        yield ""
+        yield "    ;; Button locations"
         for b in buttons:
-            b_id = f"b{letter_index(b)}"
-            out.append(f"    (button-at {b_id} {button_cells[b]})")
-        out.append("")
-
-    out.append("    (= (total-cost) 0)")
-    out.append("  )")
-    out.append("")
-    out.append("  (:goal (and")
-    out.append(f"    (agent-at a1 {goal})")
-    out.append("  ))")
-    out.append("")
-    out.append("  (:metric minimize (total-cost))")
-    out.append(")")
-
-    args.output.write_text("\n".join(out) + "\n", encoding="utf-8")
+            yield f"    (button-at b{letter_index(b)} {button_cells[b]})"
+        yield ""
+
+    yield "    (= (total-cost) 0)"
+    yield "  )"
+    yield ""
+    yield "  (:goal (and"
+    yield f"    (agent-at a1 {goal})"
+    yield "  ))"
+    yield ""
+    yield "  (:metric minimize (total-cost))"
+    yield ")"
+
+
+def load_grid(args):
+    """`ArrayGrid` when numpy is usable (or required), else `TextGrid`."""
+    is_array = args.grid.suffix == ".npy" or args.raw_shape
+    if args.engine == "python" and is_array:
+        raise SystemExit("Array grids (.npy / --raw-shape) need the numpy engine")
+    if args.engine != "python":
+        try:
+            from grid_arrays import ArrayGrid, layers_to_array, load_grid_array
+        except ImportError as exc:
+            if args.engine == "numpy" or is_array:
+                raise SystemExit("numpy is required. Install with: python3 -m pip install numpy") from exc
+        else:
+            array = load_grid_array(args.grid, args.raw_shape)
+            if array is not None:
+                return ArrayGrid(array)
+            layers = read_layers(args.grid)
+            array = layers_to_array(layers)
+            if array is not None:
+                return ArrayGrid(array)
+            if args.engine == "numpy":
+                raise SystemExit("The numpy engine only handles ASCII grids")
+            return TextGrid(layers)
+    return TextGrid(read_layers(args.grid))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert ASCII grid to PDDL problem for temporal-maze.")
+    parser.add_argument("grid", type=Path, help="ASCII grid file, .npy uint8 array, or raw bytes (--raw-shape)")
+    parser.add_argument("output", type=Path, help="Path to write problem.pddl (.gz to compress)")
+    parser.add_argument("--domain", default="temporal-maze", help="Domain name")
+    parser.add_argument("--problem", default="maze-2d-generated", help="Problem name")
+    parser.add_argument(
+        "--stairs",
+        action="store_true",
+        help="Connect matching cells between layers with stairs",
+    )
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument(
+        "--engine",
+        choices=["auto", "numpy", "python"],
+        default="auto",
+        help="numpy: vectorized conversion; python: per-cell loops; auto: numpy if installed (default)",
+    )
+    parser.add_argument(
+        "--raw-shape",
+        type=lambda text: [int(part) for part in text.split(",")],
+        default=None,
+        help="Read the grid as raw uint8 ASCII codes of this shape, e.g. 10,1000,1000 (layers,rows,cols)",
+    )
+    args = parser.parse_args()
+
+    grid = load_grid(args)
+    # Validate everything before the output file is created.
+    start, goal, button_cells, door_cells = grid.scan()
+    write_problem(args.output, problem_lines(args, grid, start, goal, button_cells, door_cells), args.gzip)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""Static analyses over a parsed temporal-maze problem."""
+from collections import defaultdict, deque
+from typing import Dict, List, Set
+
+from maze_problem import MazeProblem
+
+
+def edges_by_cell(problem: MazeProblem):
+    """Map cell -> [(dst, lock)], where lock is a door/elevator name or None."""
+    out = defaultdict(list)
+    for a, b in problem.adjacent:
+        out[a].append((b, None))
+    for a, b in problem.stairs:
+        out[a].append((b, None))
+    for d, a, b in problem.connects:
+        out[a].append((b, d))
+    for e, a, b in problem.elevator_connects:
+        out[a].append((b, e))
+    return out
+
+
+def locks_by_button_cell(problem: MazeProblem):
+    """Map cell -> locks (doors/elevators) opened by a button placed there."""
+    out = defaultdict(list)
+    for b, lock in list(problem.up) + list(problem.up_elevator):
+        for cell in problem.button_at.get(b, ()):
+            out[cell].append(lock)
+    return out
+
+
+def initially_unlocked(problem: MazeProblem) -> Set[str]:
+    """Locks open at some point without any button: initially or via a timed literal.
+
+    Timed windows are treated optimistically (as if always open).
+    """
+    unlocked = set(problem.open_doors) | set(problem.active_elevators)
+    for _, positive, fact in problem.timed:
+        if positive and fact and fact[0] in ("door-open", "elevator-active"):
+            unlocked.add(fact[1])
+    return unlocked
+
+
+def relaxed_reachability(problem: MazeProblem):
+    """Fixpoint of the cells each agent can ever reach.
+
+    Relaxation: no time, no delete effects. A door/elevator edge becomes usable
+    once any agent reaches a button controlling it (buttons are shared), or
+    right away if it is open initially or in some timed window. Linear in
+    agents * (cells + edges).
+
+    Returns `(reachable_by_agent, unlocked_locks)`.
+    """
+    out_edges = edges_by_cell(problem)
+    button_locks = locks_by_button_cell(problem)
+    unlocked = initially_unlocked(problem)
+    reachable: Dict[str, Set[str]] = {agent: set() for agent in problem.agents}
+    # lock -> [(agent, cell)] waiting behind that lock
+    blocked = defaultdict(list)
+    queue = deque()
+
+    def visit(agent, cell):
+        if cell not in reachable[agent]:
+            reachable[agent].add(cell)
+            queue.append((agent, cell))
+
+    for agent, cell in problem.starts.items():
+        if agent in reachable:
+            visit(agent, cell)
+
+    while queue:
+        agent, cell = queue.popleft()
+        for lock in button_locks.get(cell, ()):
+            if lock not in unlocked:
+                unlocked.add(lock)
+                for waiting_agent, dst in blocked.pop(lock, ()):
+                    visit(waiting_agent, dst)
+        for dst, lock in out_edges.get(cell, ()):
+            if lock is None or lock in unlocked:
+                visit(agent, dst)
+            else:
+                blocked[lock].append((agent, dst))
+    return reachable, unlocked
+
+
+def unreachable_goals(problem: MazeProblem) -> List[dict]:
+    """Goal atoms that can never hold, as `{"agent", "goal", "reason"}` dicts.
+
+    A non-empty result proves the problem unsolvable.
+    """
+    reachable, _ = relaxed_reachability(problem)
+    missing = []
+    for agent, goal in problem.goals.items():
+        if agent not in problem.starts:
+            reason = "agent has no start cell"
+        elif goal not in reachable.get(agent, ()):
+            reason = "goal cell not reachable even with every unlockable door/elevator open"
+        else:
+            continue
+        missing.append({"agent": agent, "goal": goal, "reason": reason})
+    return missing
@@ -0,0 +1,187 @@
+"""Corridor contraction: replace chains of degree-2 cells with macro edges.
+
+A corridor is a maximal chain of cells that only have two (bidirectional)
+`adjacent` neighbours and nothing else going on: no start, goal, button, door,
+stairs or elevator. The derived problem drops the chain's inner cells and links
+its two ends with `(corridor u v)`; the derived domain gets a `move-corridor`
+action whose duration and cost come from per-corridor functions. Plans found on
+the derived problem are expanded back into primitive `move` steps.
+"""
+from collections import defaultdict
+from dataclasses import replace
+from typing import Dict, List, Tuple
+
+from maze_problem import MazeProblem
+from maze_solver import EPSILON
+
+MACRO_ACTION = "move-corridor"
+
+MACRO_DOMAIN_ACTION = """
+  ;; Derived by corridor contraction: walk a whole corridor of primitive moves.
+  (:durative-action move-corridor
+    :parameters (?a - agent ?from - cell ?to - cell)
+    :duration (= ?duration (corridor-duration ?from ?to))
+    :condition (and
+      (at start (agent-at ?a ?from))
+      (at start (agent-free ?a))
+      (at start (corridor ?from ?to))
+    )
+    :effect (and
+      (at start (increase (total-cost) (corridor-cost ?from ?to)))
+      (at start (not (agent-free ?a)))
+      (at start (not (agent-at ?a ?from)))
+      (at end (agent-free ?a))
+      (at end (agent-at ?a ?to))
+    )
+  )
+"""
+
+
+def corridor_duration(moves: int) -> float:
+    # Room for the epsilon gaps between the primitive moves it stands for.
+    return round(moves + (moves - 1) * EPSILON, 6)
+
+
+def find_corridors(problem: MazeProblem) -> Dict[Tuple[str, str], List[str]]:
+    """Return `{(u, v): [u, x1, ..., xk, v]}` for every contractible corridor (both directions)."""
+    adjacent = set(problem.adjacent)
+    neighbours = defaultdict(set)
+    special = set(problem.starts.values()) | set(problem.goals.values())
+    special.update(cell for cells in problem.button_at.values() for cell in cells)
+    for a, b in adjacent:
+        if (b, a) in adjacent:
+            neighbours[a].add(b)
+        else:
+            special.update((a, b))
+    for _, a, b in problem.connects:
+        special.update((a, b))
+    for a, b in problem.stairs:
+        special.update((a, b))
+    for _, a, b in problem.elevator_connects:
+        special.update((a, b))
+
+    def inner(cell):
+        return cell not in special and len(neighbours[cell]) == 2
+
+    corridors: Dict[Tuple[str, str], List[str]] = {}
+    seen = set()
+    for cell in list(neighbours):
+        if cell in seen or not inner(cell):
+            continue
+        seen.add(cell)
+        left, right = sorted(neighbours[cell])
+        chain = [cell]
+        ends = []
+        for direction in (left, right):
+            prev, cur = cell, direction
+            walk = []
+            while inner(cur) and cur not in seen:
+                seen.add(cur)
+                walk.append(cur)
+                nxt = next(n for n in neighbours[cur] if n != prev)
+                prev, cur = cur, nxt
+            ends.append((walk, cur))
+        (left_walk, u), (right_walk, v) = ends
+        path = [u] + list(reversed(left_walk)) + chain + right_walk + [v]
+        # Loops back onto one cell, or a closed ring of inner cells: leave alone.
+        if u == v or inner(u) or inner(v):
+            continue
+        # A direct edge or a shorter corridor between the same ends wins.
+        if (u, v) in adjacent:
+            continue
+        known = corridors.get((u, v))
+        if known is not None and len(known) <= len(path):
+            continue
+        corridors[(u, v)] = path
+        corridors[(v, u)] = list(reversed(path))
+    return corridors
+
+
+def contract_problem(problem: MazeProblem):
+    """Return `(derived_problem, corridors, report)`."""
+    corridors = find_corridors(problem)
+    removed = {c for path in corridors.values() for c in path[1:-1]}
+    macro_facts = []
+    for (u, v), path in sorted(corridors.items()):
+        moves = len(path) - 1
+        macro_facts.append(("corridor", u, v))
+        macro_facts.append(("=", ("corridor-duration", u, v), f"{corridor_duration(moves):g}"))
+        macro_facts.append(("=", ("corridor-cost", u, v), str(moves)))
+    objects = dict(problem.objects)
+    objects["cell"] = [c for c in problem.cells if c not in removed]
+    derived = replace(
+        problem,
+        objects=objects,
+        adjacent=[(a, b) for a, b in problem.adjacent if a not in removed and b not in removed],
+        other_init=list(problem.other_init) + macro_facts,
+    )
+    report = {
+        "corridors": len(corridors) // 2,
+        "cells_before": len(problem.cells),
+        "cells_after": len(objects["cell"]),
+        "longest": max((len(p) - 1 for p in corridors.values()), default=0),
+    }
+    return derived, corridors, report
+
+
+def _insert_into_section(text: str, head: str, addition: str) -> str:
+    """Insert `addition` before the closing paren of the `(head ...)` section."""
+    start = text.find(head)
+    if start < 0:
+        raise ValueError(f"Domain has no {head} section")
+    depth = 0
+    idx = start
+    while idx < len(text):
+        ch = text[idx]
+        if ch == ";":
+            newline = text.find("\n", idx)
+            idx = len(text) if newline < 0 else newline
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return text[:idx] + addition + text[idx:]
+        idx += 1
+    raise ValueError(f"Unbalanced {head} section")
+
+
+def derive_domain(domain_text: str) -> str:
+    """Add the corridor predicate, functions and `move-corridor` action to the domain."""
+    text = _insert_into_section(domain_text, "(:requirements", " :fluents")
+    text = _insert_into_section(text, "(:predicates", "  (corridor ?from - cell ?to - cell)\n  ")
+    text = _insert_into_section(
+        text,
+        "(:functions",
+        "  (corridor-duration ?from - cell ?to - cell)\n"
+        "    (corridor-cost ?from - cell ?to - cell)\n  ",
+    )
+    end = text.rstrip().rfind(")")
+    return text[:end] + MACRO_DOMAIN_ACTION + text[end:]
+
+
+def expand_plan(plan, corridors):
+    """Replace every `move-corridor` step with its primitive `move` steps."""
+    expanded = []
+    for step in plan:
+        parts = step["action"].split()
+        if not parts or parts[0] != MACRO_ACTION or len(parts) < 4:
+            expanded.append(step)
+            continue
+        agent, src, dst = parts[1], parts[2], parts[3]
+        path = corridors.get((src, dst))
+        if path is None:
+            raise ValueError(f"Unknown corridor {src} -> {dst}")
+        for i in range(len(path) - 1):
+            start = round(step["start"] + i * (1 + EPSILON), 6)
+            expanded.append(
+                {
+                    "start": start,
+                    "action": f"move {agent} {path[i]} {path[i + 1]}",
+                    "dur": 1.0,
+                    "end": start + 1.0,
+                }
+            )
+    expanded.sort(key=lambda s: s["start"])
+    return expanded
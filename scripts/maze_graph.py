@@ -0,0 +1,277 @@
+"""Array-backed graph of a temporal-maze problem (requires numpy).
+
+`MazeProblem` keeps edges as lists of name tuples, which is convenient but
+costs a few hundred bytes per edge. `MazeGraph` holds the same static graph in
+flat arrays:
+
+- every name gets an int32 id; cells come first, so cell ids are `0..n_cells-1`,
+- `coords` is an `(n_cells, d)` int32 array parsed from the cell names
+  (`-1` rows for names without coordinates),
+- each edge kind (`adjacent`, `stairs`, `door`, `elevator`) is a CSR pair
+  `indptr` (int64, `n_cells + 1`) / `indices` (int32 destination cell ids);
+  door and elevator edges carry the lock id of every edge in a parallel
+  `locks` array,
+- buttons are parallel `button_cell` / `button_lock` arrays, one row per
+  `(up ...)`/`(up-elevator ...)` fact and cell its button is placed in.
+
+That is about 4 bytes per plain edge and 8 per door/elevator edge, so a
+10^7-edge maze fits in well under a few hundred MB. Built from a compiled
+problem (`load_graph`), the arrays are zero-copy views of the mmapped cache.
+"""
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from maze_problem import MazeProblem, apply_section
+
+EDGE_KINDS = ("adjacent", "stairs", "door", "elevator")
+LOCKED_KINDS = ("door", "elevator")
+# Section prefix of each kind in a compiled problem (see problem_cache.py).
+COMPILED_KIND = {"adjacent": "adjacent", "stairs": "stairs", "door": "connects", "elevator": "elevator"}
+
+
+def csr_from_pairs(n: int, src, dst, locks=None):
+    """Group `(src, dst[, lock])` id arrays by source into `(indptr, indices, locks)`."""
+    src = np.asarray(src, dtype=np.int64)
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    indices = np.asarray(dst, dtype=np.int32)[order]
+    if locks is not None:
+        locks = np.asarray(locks, dtype=np.int32)[order]
+    return indptr, indices, locks
+
+
+class MazeGraph:
+    """Static graph of a maze problem: cells, coordinates, CSR edges, buttons."""
+
+    def __init__(self, names, n_cells: int, coords, edges, button_cell, button_lock, unlocked, starts, goals):
+        self._names = names  # list, or a callable returning one (decoded lazily)
+        self.n_cells = n_cells
+        self.coords = coords
+        self.edges: Dict[str, tuple] = edges
+        self.button_cell = button_cell
+        self.button_lock = button_lock
+        # Lock ids open in the initial state (door-open / elevator-active).
+        self.unlocked = unlocked
+        self.starts: Dict[str, int] = starts
+        self.goals: Dict[str, int] = goals
+        self._ids: Optional[Dict[str, int]] = None
+
+    @property
+    def names(self) -> List[str]:
+        if callable(self._names):
+            self._names = self._names()
+        return self._names
+
+    def name(self, idx: int) -> str:
+        return self.names[idx]
+
+    def cell_id(self, name: str) -> int:
+        """Id of `name` (any interned name, not only cells); KeyError if unknown."""
+        if self._ids is None:
+            self._ids = {n: i for i, n in enumerate(self.names)}
+        return self._ids[name]
+
+    @classmethod
+    def from_problem(cls, problem: MazeProblem) -> "MazeGraph":
+        ids: Dict[str, int] = {}
+        names: List[str] = []
+
+        def intern(name):
+            idx = ids.get(name)
+            if idx is None:
+                idx = ids[name] = len(names)
+                names.append(name)
+            return idx
+
+        # Untyped legacy problems declare cells as plain objects.
+        for name in problem.cells or problem.objects.get("object", []):
+            intern(name)
+        # Edge endpoints that were never declared still need to be cells.
+        for a, b in chain(problem.adjacent, problem.stairs):
+            intern(a)
+            intern(b)
+        for _, a, b in chain(problem.connects, problem.elevator_connects):
+            intern(a)
+            intern(b)
+        for cell in chain(*problem.button_at.values(), problem.starts.values(), problem.goals.values()):
+            intern(cell)
+        n_cells = len(names)
+
+        def ids_of(items, pos):
+            return np.fromiter((intern(item[pos]) for item in items), dtype=np.int32, count=len(items))
+
+        edges = {}
+        for kind, items, lock_pos in (
+            ("adjacent", problem.adjacent, None),
+            ("stairs", problem.stairs, None),
+            ("door", problem.connects, 0),
+            ("elevator", problem.elevator_connects, 0),
+        ):
+            offset = 0 if lock_pos is None else 1
+            src = ids_of(items, offset)
+            dst = ids_of(items, offset + 1)
+            locks = ids_of(items, lock_pos) if lock_pos is not None else None
+            edges[kind] = csr_from_pairs(n_cells, src, dst, locks)
+
+        cells, locks = [], []
+        for button, lock in chain(problem.up, problem.up_elevator):
+            for cell in problem.button_at.get(button, ()):
+                cells.append(intern(cell))
+                locks.append(intern(lock))
+        unlocked = np.array(
+            sorted(intern(n) for n in problem.open_doors | problem.active_elevators), dtype=np.int32
+        )
+        starts = {agent: intern(cell) for agent, cell in problem.starts.items()}
+        goals = {agent: intern(cell) for agent, cell in problem.goals.items()}
+        return cls(
+            names,
+            n_cells,
+            cell_coord_array(names[:n_cells]),
+            edges,
+            np.array(cells, dtype=np.int32),
+            np.array(locks, dtype=np.int32),
+            unlocked,
+            starts,
+            goals,
+        )
+
+    @classmethod
+    def from_compiled(cls, compiled) -> "MazeGraph":
+        """Wrap a `problem_cache.CompiledProblem` without copying its edge arrays.
+
+        Falls back to rebuilding from the model when an edge touches a name that
+        is not a declared cell (ids would not be dense then).
+        """
+        from problem_cache import nested_tuples
+
+        n_cells = compiled.n_cells
+        edges = {}
+        for kind in EDGE_KINDS:
+            indptr, indices, locks = (
+                None if view is None else np.frombuffer(view, dtype=view.format)
+                for view in compiled.edges(COMPILED_KIND[kind])
+            )
+            if indptr[n_cells] != indptr[-1] or (len(indices) and int(indices.max()) >= n_cells):
+                return cls.from_problem(compiled.to_problem())
+            edges[kind] = (indptr[: n_cells + 1], indices, locks)
+
+        def ids(key):
+            view = compiled.section(key)
+            return np.frombuffer(view, dtype=view.format).reshape(-1, 2)
+
+        def names():
+            return compiled.names
+
+        # Join `(up b lock)` with every `(button-at b cell)`: a button may sit in several cells.
+        button_at = ids("button_at")
+        button_at = button_at[np.argsort(button_at[:, 0], kind="stable")]
+        ups = np.concatenate([ids("up"), ids("up_elevator")])
+        lo = np.searchsorted(button_at[:, 0], ups[:, 0], side="left")
+        hi = np.searchsorted(button_at[:, 0], ups[:, 0], side="right")
+        counts = hi - lo
+        rows = np.repeat(np.arange(len(ups)), counts)
+        offsets = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        button_cells = button_at[np.repeat(lo, counts) + offsets, 1]
+        if len(button_cells) and int(button_cells.max()) >= n_cells:
+            return cls.from_problem(compiled.to_problem())
+
+        unlocked = np.sort(
+            np.concatenate([
+                np.frombuffer(compiled.section("open_doors"), dtype=np.int32),
+                np.frombuffer(compiled.section("active_elevators"), dtype=np.int32),
+            ])
+        )
+        dims = compiled.dims
+        coords = np.frombuffer(compiled.section("coords"), dtype=np.int32)
+        coords = coords.reshape(-1, dims)[:n_cells] if dims else np.zeros((n_cells, 0), dtype=np.int32)
+        starts = ids("starts")
+        agent_names = compiled.names
+        # Goals live in the JSON header; reuse the parser's reading of them.
+        goal_model = MazeProblem()
+        apply_section(goal_model, (":goal", nested_tuples(compiled.meta["goal"])))
+        graph = cls(
+            names,
+            n_cells,
+            coords,
+            edges,
+            button_cells,
+            ups[rows, 1],
+            unlocked,
+            {agent_names[a]: int(c) for a, c in starts},
+            {},
+        )
+        graph.goals = {agent: graph.cell_id(cell) for agent, cell in goal_model.goals.items()}
+        graph._compiled = compiled  # keeps the mapping alive for the views
+        return graph
+
+    @staticmethod
+    def _kinds(kinds=None):
+        return EDGE_KINDS if kinds is None else kinds
+
+    def n_edges(self, kinds=None) -> int:
+        return sum(len(self.edges[kind][1]) for kind in self._kinds(kinds))
+
+    def neighbors(self, cell: int, kind: str = "adjacent"):
+        """Destination ids of `kind` edges out of `cell` (a view, not a copy)."""
+        indptr, indices, _ = self.edges[kind]
+        return indices[indptr[cell] : indptr[cell + 1]]
+
+    def out_edges(self, cell: int, kinds=None):
+        """Yield `(dst, kind, lock)` for every edge out of `cell`; lock is -1 for plain edges."""
+        for kind in self._kinds(kinds):
+            indptr, indices, locks = self.edges[kind]
+            lo, hi = indptr[cell], indptr[cell + 1]
+            for pos in range(lo, hi):
+                yield int(indices[pos]), kind, -1 if locks is None else int(locks[pos])
+
+    def edge_pairs(self, kind: str):
+        """`(src, dst)` id arrays of one edge kind, in CSR order."""
+        indptr, indices, _ = self.edges[kind]
+        src = np.repeat(np.arange(self.n_cells, dtype=np.int32), np.diff(indptr))
+        return src, indices
+
+    def degree(self, kinds=None):
+        """Out-degree per cell summed over `kinds`."""
+        out = np.zeros(self.n_cells, dtype=np.int64)
+        for kind in self._kinds(kinds):
+            out += np.diff(self.edges[kind][0])
+        return out
+
+    def touched(self, kinds=None):
+        """Boolean mask of cells with at least one edge (in or out) of `kinds`."""
+        mask = self.degree(kinds) > 0
+        for kind in self._kinds(kinds):
+            mask[self.edges[kind][1]] = True
+        return mask
+
+    def nbytes(self) -> int:
+        """Bytes held by the arrays (names and dicts excluded)."""
+        arrays = [self.coords, self.button_cell, self.button_lock, self.unlocked]
+        for indptr, indices, locks in self.edges.values():
+            arrays += [indptr, indices] + ([locks] if locks is not None else [])
+        return sum(a.nbytes for a in arrays)
+
+
+def cell_coord_array(names) -> "np.ndarray":
+    from problem_cache import cell_coords
+
+    parsed = [cell_coords(name) for name in names]
+    dims = max((len(c) for c in parsed if c), default=0)
+    coords = np.full((len(names), dims), -1, dtype=np.int32)
+    for idx, c in enumerate(parsed):
+        if c and len(c) == dims:
+            coords[idx] = c
+    return coords
+
+
+def load_graph(problem_path: Path, cache_dir: Optional[Path] = None) -> MazeGraph:
+    """`MazeGraph` of a problem file, mapped from the compiled cache when enabled."""
+    from problem_cache import default_cache_dir, load_compiled, load_problem
+
+    if (cache_dir or default_cache_dir()) is None:
+        return MazeGraph.from_problem(load_problem(problem_path))
+    return MazeGraph.from_compiled(load_compiled(problem_path, cache_dir))
@@ -0,0 +1,344 @@
+"""Multi-agent decomposition: plan agents one at a time and merge the plans.
+
+Prioritized planning over a space-time graph. Each agent is planned on its own
+with an A* search over `(cell, tick, own button presses)`, against a
+reservation table holding the plans of the agents planned before it:
+
+- vertex conflicts: two agents on one cell at the same tick,
+- edge conflicts: two agents crossing one edge in opposite directions at once,
+- an agent that has arrived keeps its goal cell for the rest of the timeline.
+
+The temporal-maze domain itself lets agents share cells, so avoiding these is
+stricter than needed; it keeps merged plans readable and is what makes them
+safe to replay on real robots. Shared doors/elevators are honoured: a button
+pressed by an earlier agent opens the lock for every later agent from the end
+of that press, and timed initial literals open/close locks for everyone. If an
+agent cannot be planned, it is moved to the front and the order is retried.
+
+Times are integer ticks on the undelayed timeline; `maze_solver.schedule`
+stretches them by epsilon when the merged plan is emitted.
+"""
+import heapq
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from maze_problem import MazeProblem
+from maze_solver import DOMAIN_NAME, EPSILON, PRESS_COST, build_transitions, format_output, schedule
+
+# Search budget per agent, in expanded states.
+MAX_EXPANSIONS = 2_000_000
+
+
+def decompose_ineligible_reason(problem: MazeProblem, domain: Optional[str]) -> Optional[str]:
+    """Return why `problem` can't be decomposed per agent, or None if it can."""
+    if domain is not None and domain != DOMAIN_NAME:
+        return f"domain is {domain!r}, not {DOMAIN_NAME!r}"
+    if problem.domain and problem.domain != DOMAIN_NAME:
+        return f"problem targets domain {problem.domain!r}"
+    if not problem.agents:
+        return "no agents"
+    for agent in problem.agents:
+        if agent not in problem.starts:
+            return f"agent {agent} has no start cell"
+    for atom in problem.goal_facts:
+        if atom[0] not in ("agent-at", "at"):
+            return f"unsupported goal {atom[0]}"
+    return None
+
+
+def tick_time(tick: int) -> float:
+    return tick * (1 + EPSILON)
+
+
+def first_tick_after(seconds: float) -> int:
+    """Smallest tick whose start is at least EPSILON after `seconds`."""
+    return max(0, math.ceil((seconds + EPSILON) / (1 + EPSILON) - 1e-9))
+
+
+def lock_open(events, seconds: float, own_press_end: Optional[float] = None) -> bool:
+    """Is the lock usable by an action starting at `seconds`?
+
+    `events` is a sorted list of `(time, opens)`; time -1 stands for the
+    initial state. An event within EPSILON of `seconds` makes the start unsafe.
+    """
+    if own_press_end is not None:
+        events = sorted(events + [(own_press_end, True)])
+    state = False
+    for when, opens in events:
+        if when <= seconds - EPSILON + 1e-9:
+            state = opens
+        elif when < seconds + EPSILON - 1e-9:
+            return False
+        else:
+            break
+    return state
+
+
+class Reservations:
+    """Space-time occupancy of the agents planned so far."""
+
+    def __init__(self):
+        self.vertex: Dict[Tuple[str, int], str] = {}
+        self.edge: Dict[Tuple[str, str, int], str] = {}
+        self.hold: Dict[str, int] = {}  # cell -> tick from which an agent parks there
+        self.last_tick: Dict[str, int] = defaultdict(lambda: -1)
+        self.horizon = 0
+
+    def vertex_free(self, cell: str, tick: int) -> bool:
+        if (cell, tick) in self.vertex:
+            return False
+        held = self.hold.get(cell)
+        return held is None or tick < held
+
+    def edge_free(self, src: str, dst: str, tick: int, dur: int) -> bool:
+        return all((dst, src, t) not in self.edge for t in range(tick, tick + dur))
+
+    def can_park(self, cell: str, tick: int) -> bool:
+        return cell not in self.hold and self.last_tick[cell] < tick
+
+    def add(self, agent: str, start: str, timed_steps):
+        """Reserve an agent's plan: `timed_steps` are `(tick, action, dur, src, dst)`."""
+        cell, tick = start, 0
+        for step_tick, _, dur, src, dst in timed_steps:
+            for t in range(tick, step_tick + 1):
+                self._vertex(cell, t, agent)
+            for t in range(step_tick, step_tick + dur):
+                if src != dst:
+                    self.edge[(src, dst, t)] = agent
+            cell, tick = dst, step_tick + dur
+        self._vertex(cell, tick, agent)
+        self.hold[cell] = tick
+        self.horizon = max(self.horizon, tick + 1)
+
+    def _vertex(self, cell: str, tick: int, agent: str):
+        self.vertex[(cell, tick)] = agent
+        self.last_tick[cell] = max(self.last_tick[cell], tick)
+
+
+def goal_distances(problem: MazeProblem, goal: str, moves) -> Dict[str, float]:
+    """Lock-free shortest cost from every cell to `goal` (admissible A* heuristic)."""
+    reverse = defaultdict(list)
+    for src, edges in moves.items():
+        for dst, cost, _, _ in edges:
+            reverse[dst].append((src, cost))
+    dist = {goal: 0}
+    heap = [(0, goal)]
+    while heap:
+        d, cell = heapq.heappop(heap)
+        if d > dist.get(cell, math.inf):
+            continue
+        for src, cost in reverse.get(cell, ()):
+            if d + cost < dist.get(src, math.inf):
+                dist[src] = d + cost
+                heapq.heappush(heap, (d + cost, src))
+    return dist
+
+
+def plan_agent(problem, agent, moves, presses, events, reservations):
+    """Space-time A* for one agent.
+
+    Returns `(timed_steps, cost, expanded)`; `timed_steps` is None on failure.
+    """
+    start = problem.starts[agent]
+    goal = problem.goals[agent]
+    h = goal_distances(problem, goal, moves)
+    if start not in h:
+        return None, None, 0
+    closing = {lock for lock, evs in events.items() if any(not opens for _, opens in evs)}
+    # Past this tick nothing changes any more, so waiting is pointless.
+    horizon = reservations.horizon
+    for evs in events.values():
+        for when, _ in evs:
+            horizon = max(horizon, first_tick_after(when))
+    horizon_time = tick_time(horizon) + 1
+
+    def key(cell, tick, pressed):
+        return (
+            cell,
+            min(tick, horizon),
+            tuple((lock, min(end, horizon_time)) for lock, end in pressed),
+        )
+
+    def usable(lock, tick, pressed):
+        own = dict(pressed).get(lock)
+        return lock_open(events.get(lock, []), tick_time(tick), own)
+
+    start_state = (start, 0, ())
+    best = {key(*start_state): 0}
+    parent = {}
+    heap = [(h[start], 0, 0, 0, start_state)]
+    counter = 1
+    expanded = 0
+    while heap:
+        _, _, cost, _, state = heapq.heappop(heap)
+        cell, tick, pressed = state
+        if cost > best.get(key(*state), math.inf):
+            continue
+        expanded += 1
+        if expanded > MAX_EXPANSIONS:
+            break
+        if cell == goal and reservations.can_park(cell, tick):
+            steps = []
+            while state in parent:
+                state, step = parent[state]
+                if step is not None:
+                    steps.append(step)
+            steps.reverse()
+            return steps, cost, expanded
+
+        successors = []
+        for dst, step_cost, lock, fmt in moves.get(cell, ()):
+            if dst not in h:
+                continue
+            if lock is not None and not usable(lock, tick, pressed):
+                continue
+            dur = step_cost
+            if not reservations.vertex_free(dst, tick + dur):
+                continue
+            if not reservations.edge_free(cell, dst, tick, dur):
+                continue
+            action = fmt.format(agent=agent, src=cell, dst=dst)
+            successors.append(((dst, tick + dur, pressed), step_cost, (tick, action, dur, cell, dst)))
+        for lock, fmt in presses.get(cell, ()):
+            if usable(lock, tick + PRESS_COST, pressed) and lock not in closing:
+                continue
+            if not reservations.vertex_free(cell, tick + PRESS_COST):
+                continue
+            end = tick_time(tick) + PRESS_COST
+            new_pressed = tuple(sorted(dict(pressed, **{lock: end}).items()))
+            step = (tick, fmt.format(agent=agent), PRESS_COST, cell, cell)
+            successors.append(((cell, tick + PRESS_COST, new_pressed), PRESS_COST, step))
+        if tick < horizon and reservations.vertex_free(cell, tick + 1):
+            successors.append(((cell, tick + 1, pressed), 0, None))
+
+        for new_state, step_cost, step in successors:
+            new_cost = cost + step_cost
+            new_key = key(*new_state)
+            if new_cost < best.get(new_key, math.inf):
+                best[new_key] = new_cost
+                parent[new_state] = (state, step)
+                heapq.heappush(heap, (new_cost + h[new_state[0]], new_state[1], new_cost, counter, new_state))
+                counter += 1
+    return None, None, expanded
+
+
+def base_events(problem: MazeProblem) -> Dict[str, List[Tuple[float, bool]]]:
+    """Lock open/close events every agent sees: initial state and timed literals."""
+    events = defaultdict(list)
+    for lock in problem.open_doors | problem.active_elevators:
+        events[lock].append((-1.0, True))
+    for when, positive, fact in problem.timed:
+        if fact and fact[0] in ("door-open", "elevator-active"):
+            events[fact[1]].append((when, positive))
+    return events
+
+
+def plan_in_order(problem: MazeProblem, order, moves, presses):
+    """Plan agents in `order`; return `(per_agent_steps, cost, expanded, failed_agent)`."""
+    reservations = Reservations()
+    events = base_events(problem)
+    for evs in events.values():
+        evs.sort()
+    per_agent = {}
+    total_cost = 0
+    expanded = 0
+    for agent in order:
+        if agent not in problem.goals:
+            # No goal: the agent never moves, so it parks on its start cell.
+            reservations.add(agent, problem.starts[agent], [])
+            per_agent[agent] = []
+            continue
+        steps, cost, agent_expanded = plan_agent(problem, agent, moves, presses, events, reservations)
+        expanded += agent_expanded
+        if steps is None:
+            return None, None, expanded, agent
+        reservations.add(agent, problem.starts[agent], steps)
+        for tick, action, dur, _, _ in steps:
+            if action.startswith(("press-button", "activate-elevator")):
+                lock = action.split()[3]
+                events[lock].append((tick_time(tick) + dur, True))
+                events[lock].sort()
+        per_agent[agent] = steps
+        total_cost += cost
+    return per_agent, total_cost, expanded, None
+
+
+def find_conflicts(problem: MazeProblem, per_agent) -> List[dict]:
+    """Vertex and edge conflicts between per-agent plans (empty for a valid merge)."""
+    occupied = defaultdict(list)
+    crossing = {}
+    end_tick = max(
+        (steps[-1][0] + steps[-1][2] for steps in per_agent.values() if steps), default=0
+    )
+    conflicts = []
+    for agent, steps in per_agent.items():
+        cell, tick = problem.starts[agent], 0
+        for step_tick, _, dur, src, dst in steps:
+            for t in range(tick, step_tick + 1):
+                occupied[(cell, t)].append(agent)
+            for t in range(step_tick, step_tick + dur):
+                if src != dst:
+                    other = crossing.get((dst, src, t))
+                    if other is not None:
+                        conflicts.append({"type": "edge", "agents": [other, agent], "cells": [src, dst], "tick": t})
+                    crossing[(src, dst, t)] = agent
+            cell, tick = dst, step_tick + dur
+        for t in range(tick, end_tick + 1):
+            occupied[(cell, t)].append(agent)
+    for (cell, t), agents in occupied.items():
+        # Agents may begin on a shared cell; they only have to split up afterwards.
+        if len(agents) > 1 and t > 0:
+            conflicts.append({"type": "vertex", "agents": agents, "cells": [cell], "tick": t})
+    return conflicts
+
+
+def solve_decomposed(problem: MazeProblem, max_orders: Optional[int] = None):
+    """Plan every agent and merge; return `(plan, output_text, info)`.
+
+    `plan` is None when no tried priority order works. `info` records the
+    order used, the number of orders tried and the agent that failed last.
+    """
+    t0 = time.perf_counter()
+    moves, presses = build_transitions(problem)
+    agents = list(problem.agents)
+    # Agents without a goal park first, then the longest trips: they have the fewest alternatives.
+    distance = {}
+    for agent in agents:
+        goal = problem.goals.get(agent)
+        if goal is None:
+            distance[agent] = math.inf
+        else:
+            distance[agent] = goal_distances(problem, goal, moves).get(problem.starts[agent], math.inf)
+    order = sorted(agents, key=lambda a: -distance[a])
+    max_orders = max_orders or 2 * len(agents)
+
+    tried = []
+    total_expanded = 0
+    failed = None
+    while len(tried) < max_orders and order not in tried:
+        tried.append(order)
+        per_agent, cost, expanded, failed = plan_in_order(problem, order, moves, presses)
+        total_expanded += expanded
+        if per_agent is not None:
+            timed_steps = [
+                (tick, action, dur) for steps in per_agent.values() for tick, action, dur, _, _ in steps
+            ]
+            plan = schedule(timed_steps)
+            seconds = time.perf_counter() - t0
+            info = {
+                "order": order,
+                "orders_tried": len(tried),
+                "conflicts": len(find_conflicts(problem, per_agent)),
+            }
+            return plan, format_output(plan, float(cost), total_expanded, seconds), info
+        order = [failed] + [a for a in order if a != failed]
+
+    seconds = time.perf_counter() - t0
+    info = {"order": None, "orders_tried": len(tried), "failed_agent": failed}
+    output = (
+        f";; Decomposition failed: no priority order plans agent {failed}\n"
+        f"; States evaluated: {total_expanded}\n; Time {seconds:.2f}\n"
+    )
+    return None, output, info
@@ -0,0 +1,273 @@
+"""In-memory model of a temporal-maze problem PDDL.
+
+This is the one problem parser the scripts share. The file is tokenized in a
+single streaming pass and every `:init` fact is sorted into a typed field of
+`MazeProblem` (graph edges, buttons, doors, elevators, agents, starts, goals,
+timed initial literals) as soon as its closing paren is read. Nothing but the
+model itself is kept, so time and memory stay linear in the problem size.
+"""
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"[()]|[^\s()]+")
+
+
+@dataclass
+class MazeProblem:
+    name: str = ""
+    domain: str = ""
+    objects: Dict[str, List[str]] = field(default_factory=dict)
+    adjacent: List[Tuple[str, str]] = field(default_factory=list)
+    connects: List[Tuple[str, str, str]] = field(default_factory=list)
+    stairs: List[Tuple[str, str]] = field(default_factory=list)
+    elevator_connects: List[Tuple[str, str, str]] = field(default_factory=list)
+    up: List[Tuple[str, str]] = field(default_factory=list)
+    up_elevator: List[Tuple[str, str]] = field(default_factory=list)
+    # button -> every cell it is placed in (the domain allows several `button-at` facts)
+    button_at: Dict[str, List[str]] = field(default_factory=dict)
+    open_doors: Set[str] = field(default_factory=set)
+    active_elevators: Set[str] = field(default_factory=set)
+    starts: Dict[str, str] = field(default_factory=dict)
+    goals: Dict[str, str] = field(default_factory=dict)
+    # (time, positive, fact) for `(at T (fact))` / `(at T (not (fact)))`
+    timed: List[Tuple[float, bool, tuple]] = field(default_factory=list)
+    # Init facts not sorted into a field above (agent-free, numeric fluents, ...)
+    other_init: List[tuple] = field(default_factory=list)
+    goal_facts: List[tuple] = field(default_factory=list)
+    metric: Optional[tuple] = None
+
+    @property
+    def cells(self) -> List[str]:
+        return self.objects.get("cell", [])
+
+    @property
+    def agents(self) -> List[str]:
+        agents = list(self.objects.get("agent", []))
+        for agent in list(self.starts) + list(self.goals):
+            if agent not in agents:
+                agents.append(agent)
+        return agents
+
+
+def tokenize_lines(lines):
+    """Yield tokens from an iterable of lines (e.g. an open file), comments dropped."""
+    for line in lines:
+        # Names repeat across thousands of facts; interning keeps one copy of each.
+        for tok in TOKEN_RE.findall(line.split(";", 1)[0]):
+            yield sys.intern(tok)
+
+
+def tokenize(text: str):
+    return tokenize_lines(text.splitlines())
+
+
+def parse_typed_list(items) -> Dict[str, List[str]]:
+    objects: Dict[str, List[str]] = {}
+    pending: List[str] = []
+    it = iter(items)
+    for tok in it:
+        if tok == "-":
+            typ = next(it, "object")
+            objects.setdefault(typ, []).extend(pending)
+            pending = []
+        else:
+            pending.append(tok)
+    if pending:
+        objects.setdefault("object", []).extend(pending)
+    return objects
+
+
+def add_init_fact(problem: MazeProblem, fact: tuple):
+    head = fact[0] if fact else None
+    if head == "at" and len(fact) == 3 and isinstance(fact[2], tuple):
+        lit = fact[2]
+        positive = True
+        if lit and lit[0] == "not":
+            positive = False
+            lit = lit[1]
+        problem.timed.append((float(fact[1]), positive, lit))
+    elif head == "at" and len(fact) == 2:
+        # Back-compat (old single-agent): (at cX)
+        problem.starts.setdefault("a1", fact[1])
+    elif head == "agent-at":
+        problem.starts[fact[1]] = fact[2]
+    elif head == "adjacent":
+        problem.adjacent.append((fact[1], fact[2]))
+    elif head == "connects":
+        problem.connects.append((fact[1], fact[2], fact[3]))
+    elif head == "stairs":
+        problem.stairs.append((fact[1], fact[2]))
+    elif head == "elevator-connects":
+        problem.elevator_connects.append((fact[1], fact[2], fact[3]))
+    elif head == "up":
+        problem.up.append((fact[1], fact[2]))
+    elif head == "up-elevator":
+        problem.up_elevator.append((fact[1], fact[2]))
+    elif head == "button-at":
+        cells = problem.button_at.setdefault(fact[1], [])
+        if fact[2] not in cells:
+            cells.append(fact[2])
+    elif head == "door-open":
+        problem.open_doors.add(fact[1])
+    elif head == "elevator-active":
+        problem.active_elevators.add(fact[1])
+    else:
+        problem.other_init.append(fact)
+
+
+def goal_atoms(expr):
+    if not expr:
+        return []
+    if expr[0] == "and":
+        atoms = []
+        for sub in expr[1:]:
+            atoms.extend(goal_atoms(sub))
+        return atoms
+    return [expr]
+
+
+def apply_section(problem: MazeProblem, section: tuple):
+    """Store one top-level `(define ...)` section (`:init` facts arrive separately)."""
+    head = section[0] if section else None
+    if head == "problem":
+        problem.name = section[1]
+    elif head == ":domain":
+        problem.domain = section[1]
+    elif head == ":objects":
+        problem.objects = parse_typed_list(section[1:])
+    elif head == ":init":
+        for fact in section[1:]:
+            if isinstance(fact, tuple):
+                add_init_fact(problem, fact)
+    elif head == ":goal":
+        for atom in goal_atoms(section[1] if len(section) > 1 else ()):
+            problem.goal_facts.append(atom)
+            if atom[0] == "agent-at":
+                problem.goals[atom[1]] = atom[2]
+            elif atom[0] == "at" and len(atom) == 2:
+                problem.goals.setdefault("a1", atom[1])
+    elif head == ":metric":
+        problem.metric = section[1:]
+
+
+def parse_problem_tokens(tokens) -> MazeProblem:
+    """Build a `MazeProblem` from a token stream in one pass.
+
+    `:init` facts are handed to `add_init_fact` as they close instead of being
+    collected into one huge section tuple first.
+    """
+    problem = MazeProblem()
+    stack: List[list] = []
+    seen_define = False
+    for tok in tokens:
+        if tok == "(":
+            stack.append([])
+        elif tok == ")":
+            if not stack:
+                raise ValueError("Unbalanced ')' in PDDL")
+            form = tuple(stack.pop())
+            depth = len(stack)
+            if depth == 0:
+                seen_define = seen_define or (bool(form) and form[0] == "define")
+            elif depth == 1 and stack[0] and stack[0][0] == "define":
+                apply_section(problem, form)
+            elif depth == 2 and stack[1] and stack[1][0] == ":init" and stack[0][:1] == ["define"]:
+                add_init_fact(problem, form)
+            else:
+                stack[-1].append(form)
+        elif stack:
+            stack[-1].append(tok)
+    if stack:
+        raise ValueError("Unbalanced '(' in PDDL")
+    if not seen_define:
+        raise ValueError("No (define ...) form found")
+    return problem
+
+
+def parse_problem_text(text: str) -> MazeProblem:
+    return parse_problem_tokens(tokenize(text))
+
+
+def parse_problem_file(path: Path) -> MazeProblem:
+    """Parse a problem file; `.gz` files (see `pddl_writer.py`) are decompressed on the fly."""
+    if Path(path).suffix == ".gz":
+        import gzip
+
+        fh = gzip.open(path, "rt", encoding="utf-8", errors="ignore")
+    else:
+        fh = open(path, encoding="utf-8", errors="ignore")
+    with fh:
+        return parse_problem_tokens(tokenize_lines(fh))
+
+
+def domain_name(text: str) -> Optional[str]:
+    m = re.search(r"\(\s*domain\s+([^\s()]+)\s*\)", text, re.I)
+    return m.group(1) if m else None
+
+
+def sexpr(item) -> str:
+    if isinstance(item, tuple):
+        return "(" + " ".join(sexpr(x) for x in item) + ")"
+    return str(item)
+
+
+def format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+def init_facts(problem: MazeProblem):
+    """Yield every init fact of `problem` as a tuple (timed literals included)."""
+    for agent, cell in problem.starts.items():
+        yield ("agent-at", agent, cell)
+    for a, b in problem.adjacent:
+        yield ("adjacent", a, b)
+    for d, a, b in problem.connects:
+        yield ("connects", d, a, b)
+    for a, b in problem.stairs:
+        yield ("stairs", a, b)
+    for e, a, b in problem.elevator_connects:
+        yield ("elevator-connects", e, a, b)
+    for b, d in problem.up:
+        yield ("up", b, d)
+    for b, e in problem.up_elevator:
+        yield ("up-elevator", b, e)
+    for b, cells in problem.button_at.items():
+        for cell in cells:
+            yield ("button-at", b, cell)
+    for d in sorted(problem.open_doors):
+        yield ("door-open", d)
+    for e in sorted(problem.active_elevators):
+        yield ("elevator-active", e)
+    for t, positive, fact in problem.timed:
+        yield ("at", format_number(t), fact if positive else ("not", fact))
+    yield from problem.other_init
+
+
+def format_problem(problem: MazeProblem) -> str:
+    """Serialize `problem` back to PDDL."""
+    out = []
+    out.append(f"(define (problem {problem.name})")
+    out.append(f"  (:domain {problem.domain})")
+    out.append("  (:objects")
+    for typ, names in problem.objects.items():
+        if names:
+            out.append("    " + " ".join(names) + f" - {typ}")
+    out.append("  )")
+    out.append("")
+    out.append("  (:init")
+    for fact in init_facts(problem):
+        out.append(f"    {sexpr(fact)}")
+    out.append("  )")
+    out.append("")
+    out.append("  (:goal (and")
+    for atom in problem.goal_facts:
+        out.append(f"    {sexpr(atom)}")
+    out.append("  ))")
+    if problem.metric:
+        out.append("")
+        out.append("  (:metric " + " ".join(sexpr(x) for x in problem.metric) + ")")
+    out.append(")")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,140 @@
+"""Shrink a temporal-maze problem before handing it to a planner.
+
+The reduced problem only drops objects and static facts; every name it keeps is
+unchanged. A plan for the reduced problem is therefore a plan for the original
+one as-is: the mapping between the two is the identity on kept objects.
+
+Removed:
+- cells no agent can reach even in the relaxed problem (see maze_analysis),
+- door/elevator edges whose lock can never open,
+- dead-end subtrees that hold no start, goal or useful button,
+- doors/elevators left without edges, and buttons left without anything to open.
+"""
+from collections import defaultdict
+from dataclasses import replace
+from typing import Dict, Set
+
+from maze_analysis import relaxed_reachability
+from maze_problem import MazeProblem, init_facts
+
+
+def problem_counts(problem: MazeProblem) -> dict:
+    return {
+        "objects": sum(len(names) for names in problem.objects.values()),
+        "cells": len(problem.cells),
+        "init_facts": sum(1 for _ in init_facts(problem)),
+    }
+
+
+def _prune_dead_ends(cells: Set[str], edges, protected: Set[str]) -> Set[str]:
+    """Repeatedly drop unprotected cells with at most one distinct neighbour."""
+    neighbours = defaultdict(set)
+    for a, b in edges:
+        if a != b:
+            neighbours[a].add(b)
+            neighbours[b].add(a)
+    stack = [c for c in cells if c not in protected and len(neighbours[c]) <= 1]
+    removed = set()
+    while stack:
+        cell = stack.pop()
+        if cell in removed or cell in protected or len(neighbours[cell]) > 1:
+            continue
+        removed.add(cell)
+        for other in neighbours.pop(cell, ()):
+            neighbours[other].discard(cell)
+            if other not in removed and other not in protected and len(neighbours[other]) <= 1:
+                stack.append(other)
+    return cells - removed
+
+
+def reduce_problem(problem: MazeProblem):
+    """Return `(reduced_problem, report)`.
+
+    `report` has `before`/`after` counts and the removed object names by type.
+    """
+    reachable, unlocked = relaxed_reachability(problem)
+    cells = set().union(*reachable.values()) if reachable else set()
+    goal_cells = set(problem.goals.values())
+    # Goal cells stay even if unreachable: the goal must still name declared objects.
+    cells |= set(problem.starts.values()) | goal_cells
+
+    adjacent = [(a, b) for a, b in problem.adjacent if a in cells and b in cells]
+    stairs = [(a, b) for a, b in problem.stairs if a in cells and b in cells]
+    connects = [
+        (d, a, b) for d, a, b in problem.connects if d in unlocked and a in cells and b in cells
+    ]
+    elevators = [
+        (e, a, b)
+        for e, a, b in problem.elevator_connects
+        if e in unlocked and a in cells and b in cells
+    ]
+
+    # Buttons and edges depend on each other: iterate until nothing changes.
+    while True:
+        locks = {d for d, _, _ in connects} | {e for e, _, _ in elevators}
+        controls = defaultdict(set)
+        for b, lock in list(problem.up) + list(problem.up_elevator):
+            if lock in locks:
+                controls[b].add(lock)
+        buttons = {}
+        for b, placed in problem.button_at.items():
+            placed = [cell for cell in placed if cell in cells]
+            if b in controls and placed:
+                buttons[b] = placed
+        protected = set(problem.starts.values()) | goal_cells | {c for placed in buttons.values() for c in placed}
+        edges = adjacent + stairs + [(a, b) for _, a, b in connects] + [(a, b) for _, a, b in elevators]
+        kept = _prune_dead_ends(cells, edges, protected)
+        if kept == cells:
+            break
+        cells = kept
+        adjacent = [(a, b) for a, b in adjacent if a in cells and b in cells]
+        stairs = [(a, b) for a, b in stairs if a in cells and b in cells]
+        connects = [(d, a, b) for d, a, b in connects if a in cells and b in cells]
+        elevators = [(e, a, b) for e, a, b in elevators if a in cells and b in cells]
+
+    kept_locks = locks
+    kept_buttons = set(buttons)
+    keep: Dict[str, Set[str]] = {
+        "cell": cells,
+        "door": {d for d in problem.objects.get("door", []) if d in kept_locks},
+        "elevator": {e for e in problem.objects.get("elevator", []) if e in kept_locks},
+        "button": kept_buttons,
+    }
+    objects = {}
+    removed = {}
+    for typ, names in problem.objects.items():
+        if typ in keep:
+            objects[typ] = [n for n in names if n in keep[typ]]
+            dropped = [n for n in names if n not in keep[typ]]
+            if dropped:
+                removed[typ] = dropped
+        else:
+            objects[typ] = list(names)
+    gone = {n for names in removed.values() for n in names}
+
+    def mentions_removed(fact) -> bool:
+        return any(
+            mentions_removed(x) if isinstance(x, tuple) else x in gone for x in fact
+        )
+
+    reduced = replace(
+        problem,
+        objects=objects,
+        adjacent=adjacent,
+        connects=connects,
+        stairs=stairs,
+        elevator_connects=elevators,
+        up=[(b, d) for b, d in problem.up if b in kept_buttons and d in kept_locks],
+        up_elevator=[(b, e) for b, e in problem.up_elevator if b in kept_buttons and e in kept_locks],
+        button_at=buttons,
+        open_doors={d for d in problem.open_doors if d in kept_locks},
+        active_elevators={e for e in problem.active_elevators if e in kept_locks},
+        timed=[t for t in problem.timed if not mentions_removed(t[2])],
+        other_init=[f for f in problem.other_init if not mentions_removed(f)],
+    )
+    report = {
+        "before": problem_counts(problem),
+        "after": problem_counts(reduced),
+        "removed": removed,
+    }
+    return reduced, report
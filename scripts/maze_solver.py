@@ -0,0 +1,338 @@
+"""Native solver for single-agent temporal-maze problems.
+
+Without timed initial literals and with one agent, the temporal-maze domain is
+a weighted shortest-path problem: moves, door moves and elevator rides cost 1,
+stairs cost 3, and a door/elevator is usable once a button controlling it was
+pressed (cost 1). Dijkstra over (cell, opened door/elevator bitmask) states
+gives an optimal plan for `(:metric minimize (total-cost))`.
+
+Only buttons whose door/elevator an optimal plan can need are pressed
+(`useful_locks`), which keeps irrelevant buttons from multiplying the states.
+The search still gives up after `deadline`/`max_expanded`
+(`SearchLimitReached`), so callers can fall back to OPTIC.
+"""
+import heapq
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+from maze_problem import MazeProblem
+
+DOMAIN_NAME = "temporal-maze"
+# OPTIC separates dependent actions by epsilon; plans here follow the same convention.
+EPSILON = 0.001
+
+MOVE_COST = 1
+STAIRS_COST = 3
+PRESS_COST = 1
+# States the native search may expand before run_optic falls back to OPTIC.
+MAX_EXPANDED = 2_000_000
+
+
+class SearchLimitReached(RuntimeError):
+    """The native search hit its deadline or state cap before finishing."""
+
+
+def native_ineligible_reason(problem: MazeProblem, domain: Optional[str]) -> Optional[str]:
+    """Return why `problem` can't use the native solver, or None if it can."""
+    if domain is not None and domain != DOMAIN_NAME:
+        return f"domain is {domain!r}, not {DOMAIN_NAME!r}"
+    if problem.domain and problem.domain != DOMAIN_NAME:
+        return f"problem targets domain {problem.domain!r}"
+    if len(problem.agents) != 1:
+        return f"{len(problem.agents)} agents"
+    if problem.timed:
+        return "timed initial literals"
+    agent = problem.agents[0]
+    if agent not in problem.starts or agent not in problem.goals:
+        return "missing start or goal"
+    for atom in problem.goal_facts:
+        if atom[0] not in ("agent-at", "at"):
+            return f"unsupported goal {atom[0]}"
+    return None
+
+
+def build_transitions(problem: MazeProblem):
+    """Group the static graph by source cell."""
+    moves = defaultdict(list)  # cell -> [(to, cost, lock, action_fmt)]
+    for a, b in problem.adjacent:
+        moves[a].append((b, MOVE_COST, None, "move {agent} {src} {dst}"))
+    for d, a, b in problem.connects:
+        moves[a].append((b, MOVE_COST, d, "move-through-door {agent} {src} {dst} " + d))
+    for a, b in problem.stairs:
+        moves[a].append((b, STAIRS_COST, None, "take-stairs {agent} {src} {dst}"))
+    for e, a, b in problem.elevator_connects:
+        moves[a].append((b, MOVE_COST, e, "take-elevator {agent} {src} {dst} " + e))
+
+    presses = defaultdict(list)  # cell -> [(lock, action_fmt)]
+    for b, d in problem.up:
+        for cell in problem.button_at.get(b, ()):
+            presses[cell].append((d, f"press-button {{agent}} {b} {d} {cell}"))
+    for b, e in problem.up_elevator:
+        for cell in problem.button_at.get(b, ()):
+            presses[cell].append((e, f"activate-elevator {{agent}} {b} {e} {cell}"))
+    return moves, presses
+
+
+def lock_bits(problem: MazeProblem) -> Dict[str, int]:
+    """Assign one bit per door and elevator."""
+    locks = sorted(
+        {d for d, _, _ in problem.connects}
+        | {e for e, _, _ in problem.elevator_connects}
+        | {d for _, d in problem.up}
+        | {e for _, e in problem.up_elevator}
+    )
+    return {name: 1 << idx for idx, name in enumerate(locks)}
+
+
+def biconnected_blocks(moves, start: str):
+    """Blocks (biconnected components) of the undirected maze graph around `start`.
+
+    Returns `(index, blocks)`: cell -> id for the cells reachable from `start`
+    with every lock open, and one `(cell_ids, locks)` pair per block.
+    """
+    index = {start: 0}
+    adj = [[]]
+    edges = []
+    seen = set()
+    for cell, out in moves.items():
+        for dst, _, lock, _ in out:
+            key = (min(cell, dst), max(cell, dst), lock)
+            if cell == dst or key in seen:
+                continue
+            seen.add(key)
+            ids = []
+            for name in (cell, dst):
+                if name not in index:
+                    index[name] = len(adj)
+                    adj.append([])
+                ids.append(index[name])
+            u, v = ids
+            adj[u].append((v, len(edges)))
+            adj[v].append((u, len(edges)))
+            edges.append((u, v, lock))
+
+    # Iterative Tarjan with an edge stack; only the start's component is visited.
+    disc = [-1] * len(adj)
+    low = [0] * len(adj)
+    disc[0] = 0
+    clock = 1
+    stack = [(0, -1, iter(adj[0]))]
+    edge_stack = []
+    blocks = []
+    while stack:
+        v, parent_edge, neighbours = stack[-1]
+        for w, eid in neighbours:
+            if eid == parent_edge:
+                continue
+            if disc[w] == -1:
+                edge_stack.append(eid)
+                disc[w] = low[w] = clock
+                clock += 1
+                stack.append((w, eid, iter(adj[w])))
+                break
+            if disc[w] < disc[v]:
+                edge_stack.append(eid)
+                low[v] = min(low[v], disc[w])
+        else:
+            stack.pop()
+            if not stack:
+                continue
+            u = stack[-1][0]
+            low[u] = min(low[u], low[v])
+            if low[v] >= disc[u]:
+                cells = set()
+                locks = set()
+                while True:
+                    eid = edge_stack.pop()
+                    a, b, lock = edges[eid]
+                    cells.update((a, b))
+                    if lock is not None:
+                        locks.add(lock)
+                    if eid == parent_edge:
+                        break
+                blocks.append((cells, locks))
+    reachable = {name: idx for name, idx in index.items() if disc[idx] != -1}
+    return reachable, blocks
+
+
+def useful_locks(moves, presses, start: str, goal: str) -> set:
+    """Doors/elevators an optimal plan may need to open; pressing any other button never pays.
+
+    In the block-cut tree of the maze (every lock open, edges undirected), a
+    branch holding neither the start, the goal nor a button of a lock needed
+    elsewhere is only ever entered and left through one cut cell, so an
+    optimal plan skips it. The locks of the remaining blocks, the Steiner
+    subtree of those cells, are the useful ones; this grows to a fixpoint as
+    their buttons become targets too.
+    """
+    index, blocks = biconnected_blocks(moves, start)
+    if not blocks:
+        return set()
+    buttons = defaultdict(set)
+    for cell, entries in presses.items():
+        for lock, _ in entries:
+            buttons[lock].add(cell)
+
+    # Tree nodes: blocks 0..n-1, then one node per cut cell (a cell in several blocks).
+    owners = defaultdict(list)
+    for node, (cells, _) in enumerate(blocks):
+        for cell in cells:
+            owners[cell].append(node)
+    tree = defaultdict(set)
+    node_of = {}
+    for cell, nodes in owners.items():
+        if len(nodes) == 1:
+            node_of[cell] = nodes[0]
+            continue
+        cut = len(blocks) + len(node_of)
+        node_of[cell] = cut
+        for node in nodes:
+            tree[cut].add(node)
+            tree[node].add(cut)
+
+    useful = set()
+    targets = {start, goal}
+    while True:
+        keep = {node_of[index[cell]] for cell in targets if cell in index}
+        degree = {node: len(tree[node]) for node in range(len(blocks) + len(tree))}
+        alive = set(degree)
+        leaves = deque(node for node, d in degree.items() if d <= 1 and node not in keep)
+        while leaves:
+            node = leaves.popleft()
+            if node not in alive:
+                continue
+            alive.discard(node)
+            for other in tree[node]:
+                if other in alive:
+                    degree[other] -= 1
+                    if degree[other] <= 1 and other not in keep:
+                        leaves.append(other)
+        found = set().union(*(blocks[node][1] for node in alive if node < len(blocks)))
+        if found <= useful:
+            return useful
+        useful |= found
+        for lock in found:
+            targets |= buttons[lock]
+
+
+def solve_single_agent(
+    problem: MazeProblem,
+    agent: Optional[str] = None,
+    deadline: Optional[float] = None,
+    max_expanded: Optional[int] = MAX_EXPANDED,
+):
+    """Return `(steps, cost, expanded)` or `(None, None, expanded)` if unreachable.
+
+    `steps` is a list of `(action, duration)` in execution order. Raises
+    `SearchLimitReached` past `deadline` (a `time.perf_counter()` value) or
+    after `max_expanded` states.
+    """
+    agent = agent or problem.agents[0]
+    start = problem.starts[agent]
+    goal = problem.goals[agent]
+    moves, presses = build_transitions(problem)
+    useful = useful_locks(moves, presses, start, goal)
+    presses = {
+        cell: [(lock, fmt) for lock, fmt in entries if lock in useful] for cell, entries in presses.items()
+    }
+    bits = lock_bits(problem)
+    mask0 = 0
+    for name in problem.open_doors | problem.active_elevators:
+        mask0 |= bits.get(name, 0)
+
+    start_state = (start, mask0)
+    best = {start_state: 0}
+    parent: Dict[Tuple[str, int], Tuple[Tuple[str, int], str, int]] = {}
+    heap = [(0, 0, start, mask0)]
+    counter = 1
+    expanded = 0
+    while heap:
+        cost, _, cell, mask = heapq.heappop(heap)
+        state = (cell, mask)
+        if cost > best.get(state, cost):
+            continue
+        expanded += 1
+        if max_expanded is not None and expanded > max_expanded:
+            raise SearchLimitReached(f"state cap of {max_expanded} expanded states reached")
+        # The clock is only read every 1024 expansions.
+        if deadline is not None and not expanded & 1023 and time.perf_counter() > deadline:
+            raise SearchLimitReached(f"deadline reached after {expanded} expanded states")
+        if cell == goal:
+            steps = []
+            while state in parent:
+                state, action, dur = parent[state]
+                steps.append((action, dur))
+            steps.reverse()
+            return steps, cost, expanded
+
+        successors = []
+        for dst, step_cost, lock, fmt in moves.get(cell, ()):
+            if lock is not None and not mask & bits[lock]:
+                continue
+            successors.append((dst, mask, step_cost, fmt.format(agent=agent, src=cell, dst=dst)))
+        for lock, fmt in presses.get(cell, ()):
+            if mask & bits[lock]:
+                continue
+            successors.append((cell, mask | bits[lock], PRESS_COST, fmt.format(agent=agent)))
+
+        for dst, new_mask, step_cost, action in successors:
+            new_state = (dst, new_mask)
+            new_cost = cost + step_cost
+            if new_cost < best.get(new_state, new_cost + 1):
+                best[new_state] = new_cost
+                # Every action here lasts as long as it costs.
+                parent[new_state] = (state, action, step_cost)
+                heapq.heappush(heap, (new_cost, counter, dst, new_mask))
+                counter += 1
+    return None, None, expanded
+
+
+def schedule(timed_steps) -> List[dict]:
+    """Turn `(tick, action, duration)` triples into plan steps.
+
+    Ticks are integer start times on the undelayed timeline. Each start is
+    stretched by `EPSILON` per tick, so an action starting when another ends is
+    always at least `EPSILON` after it, as OPTIC/VAL require.
+    """
+    plan = []
+    for tick, action, dur in sorted(timed_steps, key=lambda s: (s[0], s[1])):
+        start = round(tick * (1 + EPSILON), 6)
+        plan.append({"start": start, "action": action, "dur": float(dur), "end": start + dur})
+    return plan
+
+
+def sequential_schedule(steps) -> List[dict]:
+    timed_steps = []
+    tick = 0
+    for action, dur in steps:
+        timed_steps.append((tick, action, dur))
+        tick += dur
+    return schedule(timed_steps)
+
+
+def format_output(plan, metric, expanded, seconds) -> str:
+    """Render a result the way OPTIC prints one, so run_optic's parsers apply."""
+    lines = [
+        ";;;; Solution Found",
+        f"; States evaluated: {expanded}",
+        f"; Plan found with metric {metric:.3f}",
+        f"; Time {seconds:.2f}",
+    ]
+    for step in plan:
+        lines.append(f"{step['start']:.3f}: ({step['action']})  [{step['dur']:.3f}]")
+    return "\n".join(lines) + "\n"
+
+
+def solve_problem(problem: MazeProblem, deadline: Optional[float] = None, max_expanded: Optional[int] = MAX_EXPANDED):
+    """Solve an eligible problem; return `(plan, output_text)` (plan empty if unsolvable).
+
+    Raises `SearchLimitReached` like `solve_single_agent`.
+    """
+    t0 = time.perf_counter()
+    steps, cost, expanded = solve_single_agent(problem, deadline=deadline, max_expanded=max_expanded)
+    seconds = time.perf_counter() - t0
+    if steps is None:
+        return [], f";; Native solver: goal unreachable\n; States evaluated: {expanded}\n; Time {seconds:.2f}\n"
+    plan = sequential_schedule(steps)
+    return plan, format_output(plan, float(cost), expanded, seconds)
@@ -2,68 +2,24 @@
 import argparse
 import re
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from maze_problem import MazeProblem
+from problem_cache import load_problem
 
-EDGE_RE = re.compile(r"\((adjacent|connects|stairs|elevator-connects)\s+(\S+)\s+(\S+)(?:\s+(\S+))?\)")
 PLAN_STEP_RE = re.compile(r"^\s*[0-9]+(?:\.[0-9]+)?:\s*\(([^)]+)\)\s*\[[0-9]+(?:\.[0-9]+)?\]\s*$")
 CELL_RE = re.compile(r"^c[0-9_]+$|^c\d+[,_]?\d+$")
 
 
-def parse_edges(text: str):
-    edges = []
-    for match in EDGE_RE.finditer(text):
-        kind, a, b, c = match.groups()
-        if kind == "connects":
-            door = a
-            src = b
-            dst = c
-            edges.append((kind, src, dst, door))
-        elif kind == "elevator-connects":
-            elev = a
-            src = b
-            dst = c
-            edges.append((kind, src, dst, elev))
-        else:
-            edges.append((kind, a, b, None))
+def parse_edges(problem: MazeProblem):
+    """Return `(kind, src, dst, door_or_elevator)` for every graph edge of `problem`."""
+    edges = [("adjacent", a, b, None) for a, b in problem.adjacent]
+    edges += [("connects", a, b, door) for door, a, b in problem.connects]
+    edges += [("stairs", a, b, None) for a, b in problem.stairs]
+    edges += [("elevator-connects", a, b, elev) for elev, a, b in problem.elevator_connects]
     return edges
 
 
-def parse_agent_starts_and_goals(problem_text: str) -> Tuple[Dict[str, str], Dict[str, str]]:
-    """Return (start_cell_by_agent, goal_cell_by_agent) if present in the problem."""
-    start_by_agent: Dict[str, str] = {}
-    goal_by_agent: Dict[str, str] = {}
-
-    init_match = re.search(r"\(:init(.*?)\)\s*\(:goal", problem_text, re.S | re.I)
-    init_block = init_match.group(1) if init_match else problem_text
-
-    goal_match = re.search(r"\(:goal(.*)\)\s*\(:metric|\(:goal(.*)\)\s*\)", problem_text, re.S | re.I)
-    goal_block = ""
-    if goal_match:
-        goal_block = "".join([g for g in goal_match.groups() if g])
-    else:
-        # fallback: everything after (:goal
-        idx = problem_text.lower().find("(:goal")
-        if idx >= 0:
-            goal_block = problem_text[idx:]
-
-    for agent, cell in re.findall(r"\(agent-at\s+(\w+)\s+(\S+)\)", init_block, re.I):
-        start_by_agent[agent] = cell
-    for agent, cell in re.findall(r"\(agent-at\s+(\w+)\s+(\S+)\)", goal_block, re.I):
-        goal_by_agent[agent] = cell
-
-    # Back-compat: single-agent (at cX)
-    if not start_by_agent:
-        m = re.search(r"\(at\s+(\S+)\)", init_block, re.I)
-        if m:
-            start_by_agent["a1"] = m.group(1)
-    if not goal_by_agent:
-        m = re.search(r"\(at\s+(\S+)\)", goal_block, re.I)
-        if m:
-            goal_by_agent["a1"] = m.group(1)
-
-    return start_by_agent, goal_by_agent
-
-
 def safe_id(raw: str) -> str:
     s = re.sub(r"[^A-Za-z0-9_]", "_", raw)
     if not s:
@@ -140,7 +96,7 @@ def is_cell(token: str) -> bool:
 
 
 def plan_to_dot(
-    problem_text: str,
+    problem: MazeProblem,
     plan_text: str,
     agents_filter: Optional[Sequence[str]] = None,
     include_full_graph: bool = True,
@@ -152,7 +108,7 @@ def plan_to_dot(
     inferred_agents = infer_agents_from_steps(steps)
     agents = list(agents_filter) if agents_filter else inferred_agents
     color_by_agent = agent_palette(agents)
-    start_by_agent, goal_by_agent = parse_agent_starts_and_goals(problem_text)
+    start_by_agent, goal_by_agent = problem.starts, problem.goals
 
     lines: List[str] = []
     lines.append("digraph plan {")
@@ -163,7 +119,7 @@ def plan_to_dot(
 
     # Optional: render full connectivity graph in the background (minimal / no labels)
     if include_full_graph:
-        bg_edges = parse_edges(problem_text)
+        bg_edges = parse_edges(problem)
         for kind, src, dst, meta in bg_edges:
             # Keep it intentionally low-noise for higher dimensions.
             lines.append(
@@ -203,7 +159,7 @@ def plan_to_dot(
     # Declare cell nodes with compact labels.
     cell_nodes: Dict[str, str] = {}
     if include_full_graph:
-        for kind, src, dst, meta in parse_edges(problem_text):
+        for kind, src, dst, meta in parse_edges(problem):
             if is_cell(src):
                 cell_nodes[src] = cell_label(src)
             if is_cell(dst):
@@ -353,10 +309,10 @@ def main():
     )
     args = parser.parse_args()
 
-    text = args.problem.read_text(encoding="utf-8", errors="ignore")
+    problem = load_problem(args.problem)
 
     if args.plan is None:
-        edges = parse_edges(text)
+        edges = parse_edges(problem)
         args.output.write_text(to_dot(edges) + "\n", encoding="utf-8")
         return
 
@@ -372,7 +328,7 @@ def main():
         include_full_graph = True
 
     dot = plan_to_dot(
-        problem_text=text,
+        problem=problem,
         plan_text=plan_text,
         agents_filter=agents_filter,
         include_full_graph=include_full_graph,
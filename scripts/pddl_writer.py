@@ -0,0 +1,76 @@
+"""Chunked writing of generated PDDL problems.
+
+The generators describe a problem as a stream of lines (usually generators per
+section) instead of one big list. Lines are joined and written in blocks of
+`CHUNK_LINES` to a buffered handle, so memory stays flat however large the
+grid is. Paths ending in `.gz` (or `compress=True`) are gzip-compressed.
+"""
+import gzip
+import io
+from pathlib import Path
+from typing import Iterable, Iterator
+
+CHUNK_LINES = 8192
+BUFFER_BYTES = 1 << 20
+# Object declarations are wrapped so no single line grows with the grid.
+NAMES_PER_LINE = 1000
+
+
+def open_output(path: Path, compress: bool = False):
+    """Open `path` for text writing; gzip when asked or when it ends in `.gz`."""
+    path = Path(path)
+    if compress or path.suffix == ".gz":
+        raw = gzip.open(path, "wb", compresslevel=6)
+        return io.TextIOWrapper(io.BufferedWriter(raw, BUFFER_BYTES), encoding="utf-8", newline="\n")
+    return open(path, "w", encoding="utf-8", newline="\n", buffering=BUFFER_BYTES)
+
+
+def write_lines(fh, lines: Iterable[str]) -> int:
+    """Write `lines` (newline-terminated) in chunks; returns the number of items written.
+
+    An item may itself be a newline-joined block of lines (the vectorized
+    emitters produce those); chunks are flushed by size as well as by count.
+    """
+    count = 0
+    size = 0
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if len(chunk) >= CHUNK_LINES or size >= BUFFER_BYTES:
+            fh.write("\n".join(chunk) + "\n")
+            count += len(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        fh.write("\n".join(chunk) + "\n")
+        count += len(chunk)
+    return count
+
+
+def typed_names(names: Iterable[str], typ: str, indent: str = "    ") -> Iterator[str]:
+    """`indent n1 n2 ... - typ`, wrapped every `NAMES_PER_LINE` names."""
+    batch = []
+    for name in names:
+        if len(batch) == NAMES_PER_LINE:
+            yield indent + " ".join(batch)
+            batch = []
+        batch.append(name)
+    yield indent + " ".join(batch) + f" - {typ}"
+
+
+def section(comment, lines):
+    """The lines of a commented `:init` block followed by a blank line, or nothing when empty."""
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    yield f"    ;; {comment}"
+    yield first
+    yield from lines
+    yield ""
+
+
+def write_problem(path: Path, lines: Iterable[str], compress: bool = False) -> int:
+    with open_output(path, compress) as fh:
+        return write_lines(fh, lines)
@@ -0,0 +1,251 @@
+"""Race several run_optic.py configurations on one problem.
+
+Every configuration runs as its own `run_optic.py` child process in a fresh
+session (so a kill reaches OPTIC too), pinned to one CPU core where the OS
+supports affinity. In Docker mode the signals only reach the `docker run`
+client, so each child's container is pinned to the same core
+(`--docker-cpuset`), records its id (`--docker-cidfile`) and is stopped with
+`docker kill`. With the `first` policy the first child that exits with a
+plan wins; with `best` the children run until they finish or the deadline
+passes, and the plan with the lowest metric wins. Losers are killed.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# name -> run_optic.py flags; tried in this order when there are fewer cores than configs.
+PORTFOLIO_CONFIGS = {
+    "first-solution": ["--fast"],
+    "anytime": ["--stream"],
+    "reduced-first": ["--reduce", "--fast"],
+    "contracted-anytime": ["--contract", "--stream"],
+    "decomposed": ["--decompose", "--fast"],
+}
+KILL_GRACE_SECONDS = 2
+POLL_SECONDS = 0.1
+
+
+def select_configs(names: Optional[List[str]], agents: int, cores: int) -> List[str]:
+    """Pick the configurations to race: at most one per core."""
+    if names:
+        unknown = [n for n in names if n not in PORTFOLIO_CONFIGS]
+        if unknown:
+            raise ValueError(f"Unknown portfolio config(s): {', '.join(unknown)}")
+        chosen = list(names)
+    else:
+        chosen = [n for n in PORTFOLIO_CONFIGS if n != "decomposed" or agents > 1]
+    return chosen[: max(1, cores)]
+
+
+def kill_container(cidfile: Path):
+    """`docker kill` the container whose id `cidfile` holds, if it was started."""
+    try:
+        cid = cidfile.read_text(encoding="utf-8").strip()
+    except OSError:
+        return
+    if cid:
+        subprocess.run(["docker", "kill", cid], capture_output=True, check=False)
+
+
+def stop_group(proc: subprocess.Popen, cidfile: Optional[Path] = None):
+    """Terminate a child started with `start_new_session`, planner (or its container) included."""
+    if cidfile is not None:
+        # Before the client goes: OPTIC is PID 1 in the container and ignores SIGTERM.
+        kill_container(cidfile)
+    if proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except (AttributeError, ProcessLookupError):
+        proc.terminate()
+    try:
+        proc.wait(timeout=KILL_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError):
+            proc.kill()
+        proc.wait()
+
+
+def child_cmd(args, flags, out_dir: Path, name: str, core: int) -> List[str]:
+    cmd = [
+        sys.executable,
+        str(Path(__file__).with_name("run_optic.py")),
+        str(args.domain),
+        str(args.problem),
+        "--no-precheck",
+        "--no-native",
+        "--stats-out",
+        str(out_dir / f"{name}.json"),
+        "--plan-out",
+        str(out_dir / f"{name}.out"),
+        "--raw-out",
+        str(out_dir / f"{name}.txt"),
+    ]
+    if args.time_limit is not None:
+        cmd.extend(["--time-limit", str(args.time_limit)])
+    if args.docker:
+        cmd.append("--docker")
+    cmd.extend(["--docker-image", args.docker_image, "--planner", str(args.planner)])
+    # Also when the child falls back to Docker on its own (no local planner binary).
+    cmd.extend(["--docker-cpuset", str(core), "--docker-cidfile", str(out_dir / f"{name}.cid")])
+    return cmd + list(flags)
+
+
+def read_child(out_dir: Path, name: str):
+    """Return the child's `(stats, plan_text, raw_output)`; missing parts are None/""."""
+    stats_path = out_dir / f"{name}.json"
+    try:
+        stats = json.loads(stats_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None, "", ""
+    plan_path = out_dir / f"{name}.out"
+    raw_path = out_dir / f"{name}.txt"
+    plan_text = plan_path.read_text(encoding="utf-8") if plan_path.exists() else ""
+    raw = raw_path.read_text(encoding="utf-8", errors="ignore") if raw_path.exists() else ""
+    return stats, plan_text, raw
+
+
+def stats_quality(stats: dict):
+    numbers = stats.get("stats", {})
+    for key in ("metric", "cost"):
+        if numbers.get(key) is not None:
+            return numbers[key]
+    return stats.get("plan", {}).get("makespan")
+
+
+def usable(stats: Optional[dict]) -> bool:
+    if not stats or not stats.get("plan", {}).get("found"):
+        return False
+    return stats.get("return_code") == 0 or bool(stats.get("timed_out"))
+
+
+def portfolio_resources(runs: dict) -> dict:
+    """Usage of all configurations together; they run side by side, so peaks add up (an upper bound)."""
+    blocks = [(run["stats"] or {}).get("resources") or {} for run in runs.values()]
+
+    def total(key):
+        values = [b[key] for b in blocks if b.get(key) is not None]
+        return round(sum(values), 3) if values else None
+
+    return {
+        "source": "portfolio",
+        "peak_rss_mb": total("peak_rss_mb"),
+        "user_cpu_seconds": total("user_cpu_seconds"),
+        "system_cpu_seconds": total("system_cpu_seconds"),
+    }
+
+
+def run_portfolio(args, agents: int):
+    """Race the configurations; return `(result, info)`.
+
+    `result` is `run_planner`-shaped, plus `stats_payload` (the winner's stats
+    JSON, None when no configuration produced a plan).
+    """
+    from run_optic import available_cores, extract_plan
+
+    cores = available_cores()
+    names = select_configs(args.portfolio_configs, agents, len(cores))
+    deadline = None if args.time_limit is None else args.time_limit + KILL_GRACE_SECONDS + 3
+    wall_start = time.perf_counter()
+    runs = {}
+    with tempfile.TemporaryDirectory(prefix="optic-portfolio-") as tmp:
+        out_dir = Path(tmp)
+        for idx, name in enumerate(names):
+            core = cores[idx % len(cores)]
+
+            def pin(core=core):
+                if hasattr(os, "sched_setaffinity"):
+                    os.sched_setaffinity(0, {core})
+
+            proc = subprocess.Popen(
+                child_cmd(args, PORTFOLIO_CONFIGS[name], out_dir, name, core),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                preexec_fn=pin if os.name == "posix" else None,
+            )
+            runs[name] = {"proc": proc, "core": core, "seconds": None}
+
+        winner = None
+        while True:
+            running = [n for n, r in runs.items() if r["seconds"] is None]
+            for name in running:
+                run = runs[name]
+                if run["proc"].poll() is None:
+                    continue
+                run["seconds"] = time.perf_counter() - wall_start
+                if args.portfolio_policy == "first" and usable(read_child(out_dir, name)[0]):
+                    winner = name
+                    break
+            if winner or all(r["seconds"] is not None for r in runs.values()):
+                break
+            if deadline is not None and time.perf_counter() - wall_start > deadline:
+                break
+            time.sleep(POLL_SECONDS)
+
+        for name, run in runs.items():
+            if run["seconds"] is None:
+                stop_group(run["proc"], out_dir / f"{name}.cid")
+                run["seconds"] = time.perf_counter() - wall_start
+                run["killed"] = True
+
+        candidates = []
+        for name, run in runs.items():
+            stats, plan_text, raw = read_child(out_dir, name)
+            run.update(stats=stats, plan_text=plan_text, raw=raw)
+            # A killed anytime child still leaves its last incumbent behind.
+            if usable(stats) or (run.get("killed") and stats and stats.get("plan", {}).get("found")):
+                candidates.append(name)
+        if winner is None and candidates:
+            winner = min(candidates, key=lambda n: (stats_quality(runs[n]["stats"]), runs[n]["seconds"]))
+
+    info = {
+        "policy": args.portfolio_policy,
+        "winner": winner,
+        "winner_seconds": runs[winner]["seconds"] if winner else None,
+        "configs": [
+            {
+                "name": name,
+                "flags": PORTFOLIO_CONFIGS[name],
+                "core": run["core"],
+                "seconds": run["seconds"],
+                "killed": bool(run.get("killed")),
+                "found": bool(run["stats"] and run["stats"].get("plan", {}).get("found")),
+                "quality": stats_quality(run["stats"]) if run["stats"] else None,
+                "peak_rss_mb": ((run["stats"] or {}).get("resources") or {}).get("peak_rss_mb"),
+            }
+            for name, run in runs.items()
+        ],
+    }
+    if winner is None:
+        timed_out = any(r.get("killed") or (r["stats"] or {}).get("timed_out") for r in runs.values())
+        return {
+            "output": "",
+            "plan": [],
+            "return_code": 124 if timed_out else 1,
+            "timed_out": timed_out,
+            "stop_reason": "exit",
+            "wall_seconds": time.perf_counter() - wall_start,
+            "resources": portfolio_resources(runs),
+            "stats_payload": None,
+        }, info
+    won = runs[winner]
+    stats = won["stats"]
+    return {
+        "output": won["raw"],
+        "plan": extract_plan(won["plan_text"]),
+        "return_code": stats.get("return_code"),
+        "timed_out": bool(stats.get("timed_out")),
+        "stop_reason": "exit",
+        "wall_seconds": time.perf_counter() - wall_start,
+        "resources": portfolio_resources(runs),
+        "stats_payload": stats,
+    }, info
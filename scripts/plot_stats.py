@@ -1,14 +1,11 @@
 #!/usr/bin/env python3
 import argparse
-import json
+import csv
 import math
+import statistics
 from pathlib import Path
 
 
-def load_stats(path: Path):
-    return json.loads(path.read_text(encoding="utf-8", errors="ignore"))
-
-
 def metric_value(data: dict, metric: str):
     if metric in ("wall_seconds", "return_code", "timed_out"):
         return data.get(metric)
@@ -18,19 +15,152 @@ def metric_value(data: dict, metric: str):
     return stats.get(metric)
 
 
+def trial_summary(data: dict, metric: str):
+    """Median/quartiles of `metric` over a repeated-trial run (`run_batch.py --trials`), or None."""
+    return (((data.get("trials") or {}).get("summary") or {}).get(metric)) or None
+
+
+def anytime_points(data: dict):
+    """`(seconds, metric)` of every incumbent; wall time when streamed, else OPTIC's own clock."""
+    points = []
+    for entry in (data.get("trajectory") or {}).get("incumbents") or []:
+        seconds = entry.get("seconds")
+        if seconds is None:
+            seconds = entry.get("planner_seconds")
+        if seconds is not None and entry.get("metric") is not None:
+            points.append((float(seconds), float(entry["metric"])))
+    return points
+
+
+def plot_anytime(plt, data, out_dir: Path):
+    """Plan quality over time per problem, plus all problems normalized to their final metric."""
+    per_problem = out_dir / "anytime"
+    per_problem.mkdir(parents=True, exist_ok=True)
+    curves = []
+    for d in data:
+        points = anytime_points(d)
+        if not points:
+            continue
+        xs, ys = zip(*points)
+        end = max(xs[-1], float(d.get("wall_seconds") or xs[-1]))
+        fig, ax = plt.subplots(figsize=(7, 4))
+        ax.step(list(xs) + [end], list(ys) + [ys[-1]], where="post", color="#4C78A8", marker="o")
+        ax.set_xlabel("seconds")
+        ax.set_ylabel("metric")
+        ax.set_title(f"{d['_name']}: incumbents")
+        progress = [p for p in (d.get("trajectory") or {}).get("progress") or [] if p[0] is not None]
+        if progress:
+            twin = ax.twinx()
+            twin.plot([p[0] for p in progress], [p[1] for p in progress], color="#999999", linewidth=1)
+            twin.set_ylabel("best heuristic (b)")
+        fig.tight_layout()
+        out_path = per_problem / f"{d['_name']}.png"
+        fig.savefig(out_path, dpi=160)
+        plt.close(fig)
+
+        final = ys[-1]
+        within = next((x for x, y in points if final and y <= final * 1.05), xs[-1])
+        print(f"[anytime] {d['_name']}: first={xs[0]:.2f}s within-5%={within:.2f}s final={xs[-1]:.2f}s")
+        curves.append((d["_name"], xs, ys, end))
+
+    if not curves:
+        raise SystemExit("No stats file has an incumbent trajectory (run_optic.py writes one with --stats-out).")
+    plt.figure(figsize=(8, 4.5))
+    for name, xs, ys, end in curves:
+        # Quality relative to the final plan: 1.0 means the final metric was reached.
+        rel = [ys[-1] / y if y else 1.0 for y in ys]
+        plt.step(list(xs) + [end], rel + [rel[-1]], where="post", label=name)
+    plt.xlabel("seconds")
+    plt.ylabel("final metric / incumbent metric")
+    plt.title("Anytime quality")
+    plt.ylim(0, 1.05)
+    if len(curves) <= 12:
+        plt.legend(fontsize="small")
+    plt.tight_layout()
+    out_path = out_dir / "anytime.png"
+    plt.savefig(out_path, dpi=160)
+    plt.close()
+    print(f"[ok] Wrote {out_path} and {len(curves)} per-problem charts in {per_problem}")
+
+
+def plot_benchmark(plt, index_csv: Path, out_dir: Path, sla_seconds=None):
+    """Scaling curves from a `benchmark.py` index: median wall time vs the family axis, one line per task."""
+    with index_csv.open(encoding="utf-8", newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    if not rows:
+        raise SystemExit(f"No runs in {index_csv}")
+
+    families = {}
+    for row in rows:
+        runs = families.setdefault(row["family"], {}).setdefault(row["task"], {})
+        runs.setdefault(float(row["value"]), []).append(row)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for family, tasks in sorted(families.items()):
+        axis = next(iter(next(iter(tasks.values())).values()))[0]["axis"]
+        plt.figure(figsize=(7, 4.5))
+        xs_all = []
+        for task, by_value in sorted(tasks.items()):
+            xs = sorted(by_value)
+            ys = [statistics.median(float(r["wall_seconds"]) for r in by_value[x]) for x in xs]
+            xs_all.extend(xs)
+            plt.plot(xs, ys, marker="o", label=task)
+            # Runs that hit the time limit are circled: the curve is only a lower bound there.
+            capped = [(x, y) for x, y in zip(xs, ys) if any(r.get("timed_out") == "True" for r in by_value[x])]
+            if capped:
+                plt.scatter(*zip(*capped), s=120, facecolors="none", edgecolors="#d62728")
+        if sla_seconds is not None:
+            plt.axhline(sla_seconds, color="#d62728", linestyle="--", linewidth=1, label=f"SLA {sla_seconds:g}s")
+        positive = [x for x in xs_all if x > 0]
+        if positive and max(positive) / min(positive) >= 16:
+            plt.xscale("log")
+        plt.yscale("log")
+        plt.title(f"{family}: wall time vs {axis}")
+        plt.xlabel(axis)
+        plt.ylabel("median wall seconds")
+        plt.grid(True, which="both", alpha=0.3)
+        plt.legend(fontsize="small")
+        plt.tight_layout()
+
+        out_path = out_dir / f"{family}.png"
+        plt.savefig(out_path, dpi=160)
+        plt.close()
+        print(f"[ok] Wrote {out_path}")
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Plot bar charts from OPTIC stats JSON.")
+    parser = argparse.ArgumentParser(
+        description="Plot bar charts from OPTIC stats JSON, or scaling curves from a benchmark index.csv."
+    )
+    parser.add_argument(
+        "index_csv",
+        type=Path,
+        nargs="?",
+        default=None,
+        help="benchmark.py index.csv; plots go to graphs/benchmarks/<timestamp>/ unless --out-dir is given.",
+    )
     parser.add_argument(
         "--stats-dir",
         type=Path,
         default=Path("stats"),
         help="Directory with stats JSON files.",
     )
+    parser.add_argument(
+        "--store",
+        type=Path,
+        default=None,
+        help="SQLite run store (default: <stats-dir>/runs.sqlite); new or changed stats files are ingested first.",
+    )
+    parser.add_argument(
+        "--tag",
+        default=None,
+        help="Plot the latest run per problem among those ingested with this tag.",
+    )
     parser.add_argument(
         "--out-dir",
         type=Path,
-        default=Path("plots"),
-        help="Output directory for PNG charts.",
+        default=None,
+        help="Output directory for PNG charts (default: plots).",
     )
     parser.add_argument(
         "--metrics",
@@ -42,6 +172,17 @@ def main():
         default=None,
         help="Sort problems by this metric (e.g. metric, wall_seconds).",
     )
+    parser.add_argument(
+        "--anytime",
+        action="store_true",
+        help="Plot anytime-quality curves from the incumbent trajectories instead of bar charts.",
+    )
+    parser.add_argument(
+        "--sla-seconds",
+        type=float,
+        default=None,
+        help="With index.csv: draw this time budget as a horizontal line.",
+    )
     args = parser.parse_args()
 
     try:
@@ -51,15 +192,23 @@ def main():
             "matplotlib is required. Install with: python3 -m pip install matplotlib"
         ) from exc
 
-    stats_files = sorted(args.stats_dir.glob("*.json"))
-    if not stats_files:
-        raise SystemExit(f"No stats JSON files found in {args.stats_dir}")
+    if args.index_csv:
+        out_dir = args.out_dir or Path("graphs/benchmarks") / args.index_csv.resolve().parent.name
+        plot_benchmark(plt, args.index_csv, out_dir, args.sla_seconds)
+        return
+    args.out_dir = args.out_dir or Path("plots")
 
-    data = []
-    for path in stats_files:
-        entry = load_stats(path)
-        entry["_name"] = path.stem
-        data.append(entry)
+    from run_store import RunStore, default_store_path
+
+    with RunStore(args.store or default_store_path(args.stats_dir)) as store:
+        store.ingest(args.stats_dir)
+        if args.tag:
+            data = store.payloads(stats_dir=args.stats_dir, current=False, tag=args.tag)
+        else:
+            data = store.payloads(stats_dir=args.stats_dir)
+    if not data:
+        raise SystemExit(f"No stats JSON files found in {args.stats_dir}")
+    data.sort(key=lambda d: d["_name"])
 
     metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
     if not metrics:
@@ -71,22 +220,32 @@ def main():
             key=lambda d: (metric_value(d, sort_key) is None, metric_value(d, sort_key))
         )
 
+    if args.anytime:
+        plot_anytime(plt, data, args.out_dir)
+        return
+
     names = [d["_name"] for d in data]
     args.out_dir.mkdir(parents=True, exist_ok=True)
 
     for metric in metrics:
         values = []
+        errors = [[], []]
         missing = []
         for d in data:
-            v = metric_value(d, metric)
+            summary = trial_summary(d, metric)
+            v = summary["median"] if summary else metric_value(d, metric)
             if v is None:
                 missing.append(d["_name"])
                 v = 0
             values.append(v)
+            # Whiskers span the interquartile range of the trials.
+            errors[0].append(v - summary["q1"] if summary else 0)
+            errors[1].append(summary["q3"] - v if summary else 0)
 
         width = max(6, len(names) * 0.6)
         plt.figure(figsize=(width, 4))
-        plt.bar(names, values, color="#4C78A8")
+        yerr = errors if any(errors[0]) or any(errors[1]) else None
+        plt.bar(names, values, color="#4C78A8", yerr=yerr, capsize=3 if yerr else 0)
         plt.title(metric)
         plt.ylabel(metric)
         plt.xticks(rotation=45, ha="right")
@@ -0,0 +1,384 @@
+"""Compiled binary cache of parsed problems.
+
+Parsing a large problem PDDL dominates the start-up of the render/graph tools,
+so the parsed model is stored once per file content as a compact binary file
+and memory-mapped on later runs:
+
+- an interned name table (every object and every name a fact mentions),
+- an `(n, d)` int32 coordinate array parsed from `c<i>_<j>_...` / `cXYZ` names,
+- CSR arrays per edge kind (adjacent, stairs, door, elevator), with the door
+  or elevator id of every edge as a parallel array,
+- id pair tables for buttons, `up`/`up-elevator`, open locks and starts.
+
+Small, irregular parts (goal, metric, timed literals, other init facts) go in
+a JSON header. Files live in `.cache/compiled/<sha256 of the PDDL>.nmz`; set
+`MAZE_PROBLEM_CACHE` to another directory, or to `off` to always parse. The
+directory is capped at `MAZE_PROBLEM_CACHE_MAX_MB` (default 1024); after each
+write the least-recently-used files go first.
+
+`load_problem` skips the text parser but still rebuilds the full `MazeProblem`
+(one tuple per fact) from the mapped arrays, so its memory use matches a fresh
+parse. Callers that only need the graph should take the arrays instead:
+`load_compiled` here, or `maze_graph.load_graph`.
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from maze_problem import MazeProblem, apply_section, parse_problem_file
+
+MAGIC = b"NMZC"
+# 2: every `button-at` fact is kept (v1 files held one cell per button).
+VERSION = 2
+HEADER = struct.Struct("<4sIQ")  # magic, version, JSON length
+CELL_COORDS_RE = re.compile(r"^c(\d+(?:[,_-]\d+)*)$")
+EDGE_KINDS = ("adjacent", "stairs", "connects", "elevator")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def default_cache_dir() -> Optional[Path]:
+    env = os.environ.get("MAZE_PROBLEM_CACHE")
+    if env and env.lower() in ("off", "0", "no", "none"):
+        return None
+    if env:
+        return Path(env)
+    return Path(__file__).resolve().parent.parent / ".cache" / "compiled"
+
+
+def cache_max_bytes() -> int:
+    env = os.environ.get("MAZE_PROBLEM_CACHE_MAX_MB")
+    try:
+        return int(float(env) * 1024 * 1024) if env else DEFAULT_MAX_BYTES
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cell_coords(name: str):
+    """`c3_0_2` -> (3, 0, 2); legacy `c012` -> (0, 1, 2); None for other names."""
+    m = CELL_COORDS_RE.match(name)
+    if not m:
+        return None
+    body = m.group(1)
+    if body.isdigit():
+        return tuple(int(ch) for ch in body)
+    return tuple(int(part) for part in re.split(r"[,_-]", body))
+
+
+def nested_lists(item):
+    """Parser tuples (facts, goal, metric) as JSON-ready nested lists."""
+    return [nested_lists(x) for x in item] if isinstance(item, tuple) else item
+
+
+def nested_tuples(item):
+    """Undo `nested_lists`: JSON arrays back to the parser's nested tuples."""
+    return tuple(nested_tuples(x) for x in item) if isinstance(item, list) else item
+
+
+class _Interner:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def __call__(self, name: str) -> int:
+        idx = self.ids.get(name)
+        if idx is None:
+            idx = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+
+def _csr(n: int, edges):
+    """`edges` are `(src, dst, lock)` id triples; returns `(indptr, indices, locks)` arrays."""
+    counts = [0] * (n + 1)
+    for src, _, _ in edges:
+        counts[src + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    indptr = array("q", counts)
+    fill = list(counts[:-1])
+    indices = array("i", bytes(4 * len(edges)))
+    locks = array("i", bytes(4 * len(edges)))
+    for src, dst, lock in edges:
+        pos = fill[src]
+        indices[pos] = dst
+        locks[pos] = lock
+        fill[src] = pos + 1
+    return indptr, indices, locks
+
+
+def compile_problem(problem: MazeProblem, source_sha256: str = "") -> bytes:
+    """Serialize `problem` to the binary cache format."""
+    intern = _Interner()
+    # Cells first, so cell ids are 0..n_cells-1.
+    types = sorted(problem.objects, key=lambda t: (t != "cell",))
+    object_ranges = []
+    for typ in types:
+        start = len(intern.names)
+        for name in problem.objects[typ]:
+            intern(name)
+        object_ranges.append([typ, start, len(intern.names) - start])
+    # Keep the declaration order of types for round trips.
+    object_ranges.sort(key=lambda r: list(problem.objects).index(r[0]))
+
+    edges = {
+        "adjacent": [(intern(a), intern(b), -1) for a, b in problem.adjacent],
+        "stairs": [(intern(a), intern(b), -1) for a, b in problem.stairs],
+        "connects": [(intern(a), intern(b), intern(d)) for d, a, b in problem.connects],
+        "elevator": [(intern(a), intern(b), intern(e)) for e, a, b in problem.elevator_connects],
+    }
+
+    def pairs(items):
+        out = array("i")
+        for a, b in items:
+            out.append(intern(a))
+            out.append(intern(b))
+        return out
+
+    sections = {
+        "button_at": pairs((b, cell) for b, cells in problem.button_at.items() for cell in cells),
+        "up": pairs(problem.up),
+        "up_elevator": pairs(problem.up_elevator),
+        "starts": pairs(problem.starts.items()),
+        "open_doors": array("i", [intern(d) for d in sorted(problem.open_doors)]),
+        "active_elevators": array("i", [intern(e) for e in sorted(problem.active_elevators)]),
+    }
+    n = len(intern.names)
+    for kind in EDGE_KINDS:
+        indptr, indices, locks = _csr(n, edges[kind])
+        sections[f"{kind}_indptr"] = indptr
+        sections[f"{kind}_indices"] = indices
+        if kind in ("connects", "elevator"):
+            sections[f"{kind}_locks"] = locks
+
+    parsed = [cell_coords(name) for name in intern.names]
+    dims = max((len(c) for c in parsed if c), default=0)
+    coords = array("i", [-1]) * (n * dims)
+    for idx, c in enumerate(parsed):
+        if c and len(c) == dims:
+            coords[idx * dims : (idx + 1) * dims] = array("i", c)
+    sections["coords"] = coords
+    sections["names"] = array("B", "\n".join(intern.names).encode("utf-8"))
+
+    meta = {
+        "source_sha256": source_sha256,
+        "name": problem.name,
+        "domain": problem.domain,
+        "objects": object_ranges,
+        "n_names": n,
+        "dims": dims,
+        "goal": nested_lists(("and",) + tuple(problem.goal_facts)),
+        "metric": nested_lists(problem.metric) if problem.metric else None,
+        "timed": [[t, positive, nested_lists(fact)] for t, positive, fact in problem.timed],
+        "other_init": [nested_lists(f) for f in problem.other_init],
+        "sections": {},
+    }
+    blobs = []
+    offset = 0
+    for key, arr in sections.items():
+        data = arr.tobytes()
+        meta["sections"][key] = [offset, arr.typecode, len(arr)]
+        padded = len(data) + (-len(data)) % 8
+        blobs.append(data + b"\0" * (padded - len(data)))
+        offset += padded
+    head = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    head += b" " * ((-(HEADER.size + len(head))) % 8)
+    return HEADER.pack(MAGIC, VERSION, len(head)) + head + b"".join(blobs)
+
+
+class CompiledProblem:
+    """A memory-mapped compiled problem; arrays are zero-copy memoryviews."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, head_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{self.path} is not a compiled problem (v{VERSION})")
+        self.meta = json.loads(bytes(self._mm[HEADER.size : HEADER.size + head_len]))
+        self._base = HEADER.size + head_len
+        self._names = None
+
+    def close(self):
+        self._mm.close()
+
+    def section(self, key: str) -> memoryview:
+        offset, typecode, length = self.meta["sections"][key]
+        size = array(typecode).itemsize
+        start = self._base + offset
+        return memoryview(self._mm)[start : start + size * length].cast(typecode)
+
+    @property
+    def names(self) -> List[str]:
+        if self._names is None:
+            raw = bytes(self.section("names"))
+            self._names = raw.decode("utf-8").split("\n") if raw else []
+        return self._names
+
+    @property
+    def n_cells(self) -> int:
+        for typ, start, count in self.meta["objects"]:
+            if typ == "cell":
+                return count
+        return 0
+
+    @property
+    def dims(self) -> int:
+        return self.meta["dims"]
+
+    def edges(self, kind: str):
+        """`(indptr, indices, locks_or_None)` CSR views of one edge kind."""
+        locks = self.section(f"{kind}_locks") if kind in ("connects", "elevator") else None
+        return self.section(f"{kind}_indptr"), self.section(f"{kind}_indices"), locks
+
+    def to_problem(self) -> MazeProblem:
+        """Rebuild the `MazeProblem` model (edges come back grouped by source cell)."""
+        names = self.names
+        meta = self.meta
+        problem = MazeProblem(name=meta["name"], domain=meta["domain"])
+        problem.objects = {typ: names[start : start + count] for typ, start, count in meta["objects"]}
+
+        def edge_list(kind):
+            indptr, indices, locks = self.edges(kind)
+            out = []
+            for src in range(len(indptr) - 1):
+                a = names[src]
+                for pos in range(indptr[src], indptr[src + 1]):
+                    if locks is None:
+                        out.append((a, names[indices[pos]]))
+                    else:
+                        out.append((names[locks[pos]], a, names[indices[pos]]))
+            return out
+
+        def pair_list(key):
+            ids = self.section(key)
+            return [(names[ids[i]], names[ids[i + 1]]) for i in range(0, len(ids), 2)]
+
+        problem.adjacent = edge_list("adjacent")
+        problem.stairs = edge_list("stairs")
+        problem.connects = edge_list("connects")
+        problem.elevator_connects = edge_list("elevator")
+        for b, cell in pair_list("button_at"):
+            problem.button_at.setdefault(b, []).append(cell)
+        problem.up = pair_list("up")
+        problem.up_elevator = pair_list("up_elevator")
+        problem.starts = dict(pair_list("starts"))
+        problem.open_doors = {names[i] for i in self.section("open_doors")}
+        problem.active_elevators = {names[i] for i in self.section("active_elevators")}
+        problem.timed = [(t, positive, nested_tuples(fact)) for t, positive, fact in meta["timed"]]
+        problem.other_init = [nested_tuples(f) for f in meta["other_init"]]
+        apply_section(problem, (":goal", nested_tuples(meta["goal"])))
+        if meta["metric"] is not None:
+            problem.metric = nested_tuples(meta["metric"])
+        return problem
+
+
+def write_compiled(problem: MazeProblem, path: Path, source_sha256: str = ""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(compile_problem(problem, source_sha256))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    evict(path.parent, cache_max_bytes(), keep=path)
+
+
+def evict(cache_dir: Path, max_bytes: int, keep: Optional[Path] = None):
+    """Delete least-recently-used `.nmz` files until `cache_dir` fits in `max_bytes`.
+
+    File mtime is the LRU clock (`_touch` on every hit); `keep` is never deleted.
+    """
+    entries = []
+    total = 0
+    for path in cache_dir.glob("*.nmz"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue  # Evicted by another process meanwhile.
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            # Open maps of the file stay valid on POSIX.
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+
+
+def _touch(path: Path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass  # Read-only cache: the LRU order just goes stale.
+
+
+def load_compiled(problem_path: Path, cache_dir: Optional[Path] = None) -> CompiledProblem:
+    """Open the compiled form of `problem_path`, compiling it first if needed."""
+    cache_dir = cache_dir or default_cache_dir() or Path(tempfile.gettempdir()) / "maze-compiled"
+    sha = file_sha256(problem_path)
+    path = cache_dir / f"{sha}.nmz"
+    if path.exists():
+        try:
+            compiled = CompiledProblem(path)
+            _touch(path)
+            return compiled
+        except (OSError, ValueError, struct.error):
+            pass  # Stale format or truncated: rebuild below.
+    write_compiled(parse_problem_file(problem_path), path, sha)
+    return CompiledProblem(path)
+
+
+def load_problem(problem_path: Path, cache_dir: Optional[Path] = None) -> MazeProblem:
+    """Parse `problem_path`, going through the compiled cache unless it is disabled.
+
+    A cache hit saves the tokenizer, not the model: the `MazeProblem` is rebuilt
+    in full from the compiled arrays.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    if cache_dir is None:
+        return parse_problem_file(problem_path)
+    sha = file_sha256(problem_path)
+    path = cache_dir / f"{sha}.nmz"
+    if path.exists():
+        try:
+            compiled = CompiledProblem(path)
+        except (OSError, ValueError, struct.error):
+            compiled = None
+        if compiled is not None:
+            _touch(path)
+            try:
+                return compiled.to_problem()
+            finally:
+                compiled.close()
+    problem = parse_problem_file(problem_path)
+    try:
+        write_compiled(problem, path, sha)
+    except OSError:
+        pass  # Read-only checkout: parsing still worked, just not cached.
+    return problem
@@ -3,58 +3,59 @@ import argparse
 import json
 import os
 import re
+from itertools import chain
 from pathlib import Path
 from typing import Optional
 
-CELL_OBJ_RE = re.compile(r"\bc\w+\b")
+from maze_problem import MazeProblem
+from problem_cache import load_problem
+
 CELL_3D_SPLIT_RE = re.compile(r"^c(\d+)[,_-](\d+)[,_-](\d+)$")
 CELL_3D_FIXED_RE = re.compile(r"^c(\d)(\d)(\d)$")
 PLAN_RE = re.compile(r"\(([^)]+)\)")
 
 
-def parse_adjacency(problem_path: Path):
-  raw = problem_path.read_text(encoding="utf-8", errors="ignore")
-  text = "\n".join(line.split(";", 1)[0] for line in raw.splitlines())
-  # (adjacent c0_0_0 c0_0_1)
-  return {
-    (m.group(1), m.group(2))
-    for m in re.finditer(r"\(adjacent\s+(c\w+)\s+(c\w+)\)", text)
-  }
-
-
-def parse_connects(problem_path: Path):
-  raw = problem_path.read_text(encoding="utf-8", errors="ignore")
-  text = "\n".join(line.split(";", 1)[0] for line in raw.splitlines())
-  return {
-    (m.group(1), m.group(2), m.group(3))
-    for m in re.finditer(r"\(connects\s+(\w+)\s+(c\w+)\s+(c\w+)\)", text)
-  }
-
-
-def parse_stairs(problem_path: Path):
-  raw = problem_path.read_text(encoding="utf-8", errors="ignore")
-  text = "\n".join(line.split(";", 1)[0] for line in raw.splitlines())
-  return {
-    (m.group(1), m.group(2))
-    for m in re.finditer(r"\(stairs\s+(c\w+)\s+(c\w+)\)", text)
-  }
-
-
-def parse_elevator_connects(problem_path: Path):
-  raw = problem_path.read_text(encoding="utf-8", errors="ignore")
-  text = "\n".join(line.split(";", 1)[0] for line in raw.splitlines())
-  return {
-    (m.group(1), m.group(2), m.group(3))
-    for m in re.finditer(r"\(elevator-connects\s+(\w+)\s+(c\w+)\s+(c\w+)\)", text)
-  }
-
+def traversable_cells(problem: MazeProblem, cells: dict, extra_cells: set):
+  """Cells touched by any edge, plus `extra_cells`.
+
+  Endpoint names are collected straight from the edge lists, without building
+  an edge set or graph arrays first: for 10^6-cell mazes that is the bulk of
+  the render time.
+  """
+  keep = set(extra_cells)
+  keep.update(chain.from_iterable(problem.adjacent))
+  keep.update(chain.from_iterable(problem.stairs))
+  for edges in (problem.connects, problem.elevator_connects):
+    keep.update(cell for _, a, b in edges for cell in (a, b))
+  return {name: pos for name, pos in cells.items() if name in keep}
+
+
+def graph_traversable_cells(problem_path: Path, extra_cells: set):
+  """`traversable_cells(problem, cell_positions(problem), extra_cells)` from the `MazeGraph` arrays.
+
+  Edge endpoints and coordinates come straight from the memory-mapped
+  compiled problem, instead of walking the name tuples of the model. None
+  without NumPy, with the compiled cache off, or when the cells are not 3D.
+  """
+  try:
+    import numpy as np
+    from maze_graph import load_graph
+  except ImportError:
+    return None
+  from problem_cache import default_cache_dir
 
-def filter_traversable_cells(cells: dict, edges: set, extra_cells: set):
-  traversable = set(extra_cells)
-  for a, b in edges:
-    traversable.add(a)
-    traversable.add(b)
-  return {name: pos for name, pos in cells.items() if name in traversable}
+  if default_cache_dir() is None:
+    return None
+  graph = load_graph(problem_path)
+  if graph.coords.shape[1] != 3:
+    return None
+  keep = graph.touched()
+  for name in extra_cells:
+    keep[graph.cell_id(name)] = True
+  keep &= (graph.coords >= 0).all(axis=1)
+  ids = np.flatnonzero(keep)
+  names = graph.names
+  return {names[i]: (c, r, z) for i, (z, r, c) in zip(ids.tolist(), graph.coords[ids].tolist())}
 
 
 def parse_cell_name(name: str):
@@ -69,110 +70,24 @@ def parse_cell_name(name: str):
     return None
 
 
-def parse_problem(problem_path: Path):
-    raw = problem_path.read_text(encoding="utf-8", errors="ignore")
-    text = "\n".join(line.split(";", 1)[0] for line in raw.splitlines())
-
-    obj_block = ""
-    obj_start = text.find("(:objects")
-    init_start = text.find("(:init")
-    if obj_start != -1 and init_start != -1 and init_start > obj_start:
-        obj_block = text[obj_start:init_start]
-
-    cells = {}
-    for name in CELL_OBJ_RE.findall(obj_block):
-        parsed = parse_cell_name(name)
-        if parsed:
-            z, r, c = parsed
-            cells[name] = (c, r, z)
-
-    # Prefer multi-agent format: (agent-at a1 c...)
-    agent = "a1"
-    if not re.search(r"\ba1\b", obj_block):
-        # Fall back to first declared agent name if any
-        m_agent = re.search(r"\b(\w+)\s*-\s*agent\b", obj_block)
-        if m_agent:
-            agent = m_agent.group(1)
-
-    start = None
-    goal = None
-    init_at = re.search(rf"\(agent-at\s+{re.escape(agent)}\s+(c\w+)\)", text)
-    if init_at:
-        start = init_at.group(1)
-    goal_at = re.search(rf"\(agent-at\s+{re.escape(agent)}\s+(c\w+)\)", text[text.find("(:goal"):])
-    if goal_at:
-        goal = goal_at.group(1)
-
-    # Back-compat (old single-agent): (at c...)
-    if start is None:
-        init_at_old = re.search(r"\(at\s+(c\w+)\)", text)
-        if init_at_old:
-            start = init_at_old.group(1)
-    if goal is None:
-        goal_at_old = re.search(r"\(at\s+(c\w+)\)", text[text.find("(:goal"):])
-        if goal_at_old:
-            goal = goal_at_old.group(1)
-
-    buttons = {}
-    for match in re.finditer(r"\(button-at\s+(\w+)\s+(c\w+)\)", text):
-        buttons[match.group(1)] = match.group(2)
-
-    return cells, start, goal, buttons
-
-
-def parse_agents(problem_path: Path):
-    raw = problem_path.read_text(encoding="utf-8", errors="ignore")
-    text = "\n".join(line.split(";", 1)[0] for line in raw.splitlines())
-    obj_start = text.find("(:objects")
-    init_start = text.find("(:init")
-    obj_block = text[obj_start:init_start] if obj_start != -1 and init_start != -1 and init_start > obj_start else ""
-
-    agents = re.findall(r"\b(\w+)\s*-\s*agent\b", obj_block)
-
-    # Preserve order and uniqueness
-    seen = set()
-    unique = []
-    for agent in agents:
-        if agent not in seen:
-            unique.append(agent)
-            seen.add(agent)
-    return unique
-
-
-def parse_problem_multi(problem_path: Path, agents: list):
-    raw = problem_path.read_text(encoding="utf-8", errors="ignore")
-    text = "\n".join(line.split(";", 1)[0] for line in raw.splitlines())
-
-    obj_block = ""
-    obj_start = text.find("(:objects")
-    init_start = text.find("(:init")
-    if obj_start != -1 and init_start != -1 and init_start > obj_start:
-        obj_block = text[obj_start:init_start]
-
+def cell_positions(problem: MazeProblem):
+    # Untyped legacy problems declare cells as plain objects.
+    names = problem.cells or problem.objects.get("object", [])
     cells = {}
-    for name in CELL_OBJ_RE.findall(obj_block):
+    for name in names:
         parsed = parse_cell_name(name)
         if parsed:
             z, r, c = parsed
             cells[name] = (c, r, z)
+    return cells
 
-    buttons = {}
-    for match in re.finditer(r"\(button-at\s+(\w+)\s+(c\w+)\)", text):
-        buttons[match.group(1)] = match.group(2)
-
-    starts = {}
-    goals = {}
-    goal_section = text[text.find("(:goal"):] if "(:goal" in text else text
-
-    for agent in agents:
-        init_at = re.search(rf"\(agent-at\s+{re.escape(agent)}\s+(c\w+)\)", text)
-        if init_at:
-            starts[agent] = init_at.group(1)
-        goal_at = re.search(rf"\(agent-at\s+{re.escape(agent)}\s+(c\w+)\)", goal_section)
-        if goal_at:
-            goals[agent] = goal_at.group(1)
 
-    return cells, starts, goals, buttons
+def default_agent(problem: MazeProblem):
+    """a1 if declared, else the first declared agent, else a1."""
+    declared = problem.objects.get("agent", [])
+    if "a1" in declared or not declared:
+        return "a1"
+    return declared[0]
 
 
 def parse_plan(plan_path: Path, agent: Optional[str] = "a1"):
@@ -229,6 +144,39 @@ def parse_plan(plan_path: Path, agent: Optional[str] = "a1"):
     return compact
 
 
+def flat_positions(cells):
+    """`[x0, y0, z0, x1, ...]` of `{"pos": ...}` entries: one instanced batch, compact in JSON."""
+    return [v for cell in cells if cell for v in cell["pos"]]
+
+
+def agent_paths(data):
+    """The per-agent path entries of `data`; a single-agent render becomes one entry."""
+    if "paths" in data:
+        return data["paths"]
+    return [
+        {
+            "agent": None,
+            "color": "#ff3030",
+            "path": data.get("path", []),
+            "start": data.get("start"),
+            "goal": data.get("goal"),
+        }
+    ]
+
+
+def instance_batches(data):
+    """Flat positions per static category (cell, door, start, goal, button), one draw call each."""
+    doors = set(data.get("doorCells", []))
+    paths = agent_paths(data)
+    return {
+        "cell": flat_positions(c for c in data["cells"] if c["name"] not in doors),
+        "door": flat_positions(c for c in data["cells"] if c["name"] in doors),
+        "start": flat_positions(p["start"] for p in paths),
+        "goal": flat_positions(p["goal"] for p in paths),
+        "button": flat_positions(data["buttons"]),
+    }
+
+
 def make_html(data, output_path: Path, use_local: bool):
     if use_local:
         vendor_dir = Path(__file__).resolve().parent / "vendor"
@@ -240,7 +188,15 @@ def make_html(data, output_path: Path, use_local: bool):
         three_path = "https://unpkg.com/three@0.161.0/build/three.module.js"
         orbit_path = "https://unpkg.com/three@0.161.0/examples/jsm/controls/OrbitControls.js"
 
-    payload = json.dumps(data)
+    paths = agent_paths(data)
+    # Cells go out as flat coordinate arrays per category rather than named objects.
+    payload = json.dumps(
+        {
+            "batches": instance_batches(data),
+            "paths": [{"agent": p["agent"], "color": p["color"], "path": p["path"]} for p in paths],
+        },
+        separators=(",", ":"),
+    )
     import_map = ""
     if use_local:
         import_map = f"""
@@ -253,9 +209,7 @@ def make_html(data, output_path: Path, use_local: bool):
 </script>
 """
 
-    steps_count = len(data.get("path", [])) if isinstance(data, dict) else 0
-    if isinstance(data, dict) and "paths" in data and isinstance(data["paths"], list):
-      steps_count = sum(len(p.get("path", [])) for p in data["paths"] if isinstance(p, dict))
+    steps_count = sum(len(p["path"]) for p in paths)
 
     html = f"""<!doctype html>
 <html>
@@ -278,6 +232,7 @@ def make_html(data, output_path: Path, use_local: bool):
 <div id=\"legend\">
   <div><strong>Legend</strong></div>
   <div class=\"row\"><span class=\"swatch\" style=\"background:#2a6fd2;opacity:0.4\"></span>Cell</div>
+  <div class=\"row\"><span class=\"swatch\" style=\"background:#ff4d4d;opacity:0.4\"></span>Door cell</div>
   <div class=\"row\"><span class=\"swatch\" style=\"background:#ff3030\"></span>Path</div>
   <div class=\"row\"><span class=\"swatch\" style=\"background:#2ecc71\"></span>Start</div>
   <div class=\"row\"><span class=\"swatch\" style=\"background:#f1c40f\"></span>Goal</div>
@@ -293,8 +248,10 @@ const data = {payload};
 const scene = new THREE.Scene();
 scene.background = new THREE.Color(0x0b1020);
 
+// Multisampling costs more than it is worth once the maze has many instances.
+const instanceCount = Object.values(data.batches).reduce((n, a) => n + a.length / 3, 0);
 const camera = new THREE.PerspectiveCamera(60, window.innerWidth / window.innerHeight, 0.1, 1000);
-const renderer = new THREE.WebGLRenderer({{ antialias: true }});
+const renderer = new THREE.WebGLRenderer({{ antialias: instanceCount < 200000 }});
 renderer.setSize(window.innerWidth, window.innerHeight);
 document.body.appendChild(renderer.domElement);
 
@@ -310,49 +267,77 @@ scene.add(dir);
 const cubeGeom = new THREE.BoxGeometry(0.9, 0.9, 0.9);
 const pathGeom = new THREE.BoxGeometry(0.6, 0.6, 0.6);
 
-function addCube(pos, color, opacity, geom = cubeGeom) {{
-  const mat = new THREE.MeshPhongMaterial({{ color, transparent: true, opacity }});
-  const mesh = new THREE.Mesh(geom, mat);
-  mesh.position.set(pos[0], pos[1], pos[2]);
+// One shared material per category; every category is a single InstancedMesh (one draw call).
+function material(color, opacity) {{
+  return new THREE.MeshPhongMaterial({{ color, transparent: opacity < 1, opacity, depthWrite: opacity >= 0.5 }});
+}}
+const materials = {{
+  cell: material(0x2a6fd2, 0.2),
+  door: material(0xff4d4d, 0.2),
+  path: material(0xffffff, 0.9),
+  start: material(0x2ecc71, 0.9),
+  goal: material(0xf1c40f, 0.9),
+  button: material(0xff7f0e, 0.5),
+}};
+
+function addBatch(positions, geom, mat, colors = null) {{
+  const count = positions.length / 3;
+  if (!count) return null;
+  const mesh = new THREE.InstancedMesh(geom, mat, count);
+  // Translation-only matrices, written straight into the instance buffer.
+  const m = mesh.instanceMatrix.array;
+  for (let i = 0; i < count; i++) {{
+    const o = i * 16;
+    m[o] = m[o + 5] = m[o + 10] = m[o + 15] = 1;
+    m[o + 12] = positions[i * 3];
+    m[o + 13] = positions[i * 3 + 1];
+    m[o + 14] = positions[i * 3 + 2];
+  }}
+  mesh.instanceMatrix.needsUpdate = true;
+  if (colors) {{
+    mesh.instanceColor = new THREE.InstancedBufferAttribute(colors, 3);
+  }}
+  mesh.computeBoundingSphere();
   scene.add(mesh);
+  return mesh;
 }}
 
-const doorCells = new Set(data.doorCells || []);
-
-for (const cell of data.cells) {{
-  const isDoor = doorCells.has(cell.name);
-  addCube(cell.pos, isDoor ? 0xff4d4d : 0x2a6fd2, 0.2);
-}}
+addBatch(data.batches.cell, cubeGeom, materials.cell);
+addBatch(data.batches.door, cubeGeom, materials.door);
 
 function lerp(a, b, t) {{
   return a + (b - a) * t;
 }}
 
-function lerpColor(c1, c2, t) {{
-  const r1 = (c1 >> 16) & 255;
-  const g1 = (c1 >> 8) & 255;
-  const b1 = c1 & 255;
-  const r2 = (c2 >> 16) & 255;
-  const g2 = (c2 >> 8) & 255;
-  const b2 = c2 & 255;
-  const r = Math.round(lerp(r1, r2, t));
-  const g = Math.round(lerp(g1, g2, t));
-  const b = Math.round(lerp(b1, b2, t));
-  return (r << 16) | (g << 8) | b;
-}}
-
-const pathPoints = [];
+// Path steps fade from the agent colour towards white, as per-instance colours of one batch.
+const pathPositions = [];
+const pathColors = [];
 const pathList = document.getElementById('pathList');
-for (let i = 0; i < data.path.length; i++) {{
-  const cell = data.path[i];
-  const t = data.path.length > 1 ? i / (data.path.length - 1) : 0;
-  const color = lerpColor(0xff3030, 0xffaaaa, t);
-  addCube(cell.pos, color, 0.9, pathGeom);
-  pathPoints.push(new THREE.Vector3(cell.pos[0], cell.pos[1], cell.pos[2]));
-  const li = document.createElement('li');
-  li.textContent = `${{i + 1}}: ${{cell.name}}`;
-  pathList.appendChild(li);
+const labelled = [];
+for (const agentPath of data.paths) {{
+  const base = new THREE.Color(agentPath.color);
+  const light = base.clone().lerp(new THREE.Color(0xffffff), 0.6);
+  const steps = agentPath.path;
+  const points = [];
+  for (let i = 0; i < steps.length; i++) {{
+    const cell = steps[i];
+    const t = steps.length > 1 ? i / (steps.length - 1) : 0;
+    pathPositions.push(cell.pos[0], cell.pos[1], cell.pos[2]);
+    pathColors.push(lerp(base.r, light.r, t), lerp(base.g, light.g, t), lerp(base.b, light.b, t));
+    points.push(new THREE.Vector3(cell.pos[0], cell.pos[1], cell.pos[2]));
+    const prefix = agentPath.agent && data.paths.length > 1 ? `${{agentPath.agent}} ` : '';
+    const li = document.createElement('li');
+    li.textContent = `${{prefix}}${{i + 1}}: ${{cell.name}}`;
+    pathList.appendChild(li);
+    labelled.push([`${{prefix}}${{i + 1}}:${{cell.name}}`, cell.pos]);
+  }}
+  if (points.length >= 2) {{
+    const lineGeom = new THREE.BufferGeometry().setFromPoints(points);
+    const lineMat = new THREE.LineBasicMaterial({{ color: base }});
+    scene.add(new THREE.Line(lineGeom, lineMat));
+  }}
 }}
+addBatch(pathPositions, pathGeom, materials.path, new Float32Array(pathColors));
 
 function makeLabel(text) {{
   const canvas = document.createElement('canvas');
@@ -375,43 +360,36 @@ function makeLabel(text) {{
   return sprite;
 }}
 
-for (let i = 0; i < data.path.length; i++) {{
-  const cell = data.path[i];
-  const label = makeLabel(`${{i + 1}}:${{cell.name}}`);
-  label.position.set(cell.pos[0], cell.pos[1] + 0.65, cell.pos[2]);
+// Every label is its own texture, so long paths are labelled every few steps only.
+const maxLabels = 400;
+const labelEvery = Math.max(1, Math.ceil(labelled.length / maxLabels));
+for (let i = 0; i < labelled.length; i += labelEvery) {{
+  const [text, pos] = labelled[i];
+  const label = makeLabel(text);
+  label.position.set(pos[0], pos[1] + 0.65, pos[2]);
   scene.add(label);
 }}
 
-if (pathPoints.length >= 2) {{
-  const lineGeom = new THREE.BufferGeometry().setFromPoints(pathPoints);
-  const lineMat = new THREE.LineBasicMaterial({{ color: 0xff3030 }});
-  const line = new THREE.Line(lineGeom, lineMat);
-  scene.add(line);
-}}
-
-if (data.start) {{
-  addCube(data.start.pos, 0x2ecc71, 0.9);
-}}
-
-if (data.goal) {{
-  addCube(data.goal.pos, 0xf1c40f, 0.9);
-}}
-
-for (const cell of data.buttons) {{
-  addCube(cell.pos, 0xff7f0e, 0.5);
-}}
+addBatch(data.batches.start, cubeGeom, materials.start);
+addBatch(data.batches.goal, cubeGeom, materials.goal);
+addBatch(data.batches.button, cubeGeom, materials.button);
 
 const bbox = new THREE.Box3();
-for (const cell of data.cells) {{
-  const v = new THREE.Vector3(cell.pos[0], cell.pos[1], cell.pos[2]);
-  bbox.expandByPoint(v);
+const v = new THREE.Vector3();
+for (const positions of [data.batches.cell, data.batches.door]) {{
+  for (let i = 0; i < positions.length; i += 3) {{
+    bbox.expandByPoint(v.set(positions[i], positions[i + 1], positions[i + 2]));
+  }}
 }}
+if (bbox.isEmpty()) bbox.expandByPoint(v.set(0, 0, 0));
 const size = new THREE.Vector3();
 bbox.getSize(size);
 const center = new THREE.Vector3();
 bbox.getCenter(center);
 
 camera.position.set(center.x + size.x * 1.5 + 1, center.y + size.y * 1.5 + 1, center.z + size.z * 1.5 + 1);
+camera.far = Math.max(1000, size.length() * 10);
+camera.updateProjectionMatrix();
 controls.target.copy(center);
 
 function onResize() {{
@@ -437,10 +415,15 @@ def make_html_babylon(data, output_path: Path):
     vendor_dir = Path(__file__).resolve().parent / "vendor"
     babylon_file = vendor_dir / "babylon.js"
     babylon_path = Path(os.path.relpath(babylon_file, output_path.parent)).as_posix()
-    payload = json.dumps(data)
-    steps_count = len(data.get("path", [])) if isinstance(data, dict) else 0
-    if isinstance(data, dict) and "paths" in data and isinstance(data["paths"], list):
-      steps_count = sum(len(p.get("path", [])) for p in data["paths"] if isinstance(p, dict))
+    paths = agent_paths(data)
+    payload = json.dumps(
+        {
+            "batches": instance_batches(data),
+            "paths": [{"agent": p["agent"], "color": p["color"], "path": p["path"]} for p in paths],
+        },
+        separators=(",", ":"),
+    )
+    steps_count = sum(len(p["path"]) for p in paths)
 
     html = f"""<!doctype html>
 <html>
@@ -463,6 +446,7 @@ def make_html_babylon(data, output_path: Path):
 <div id="legend">
   <div><strong>Legend</strong></div>
   <div class="row"><span class="swatch" style="background:#2a6fd2;opacity:0.4"></span>Cell</div>
+  <div class="row"><span class="swatch" style="background:#ff4d4d;opacity:0.4"></span>Door cell</div>
   <div class="row"><span class="swatch" style="background:#ff3030"></span>Path</div>
   <div class="row"><span class="swatch" style="background:#2ecc71"></span>Start</div>
   <div class="row"><span class="swatch" style="background:#f1c40f"></span>Goal</div>
@@ -475,8 +459,10 @@ def make_html_babylon(data, output_path: Path):
 <script>
 const data = {payload};
 
+// Multisampling costs more than it is worth once the maze has many instances.
+const instanceCount = Object.values(data.batches).reduce((n, a) => n + a.length / 3, 0);
 const canvas = document.getElementById('renderCanvas');
-const engine = new BABYLON.Engine(canvas, true);
+const engine = new BABYLON.Engine(canvas, instanceCount < 200000);
 const scene = new BABYLON.Scene(engine);
 scene.clearColor = new BABYLON.Color4(0.04, 0.06, 0.12, 1.0);
 
@@ -486,126 +472,135 @@ camera.attachControl(canvas, true);
 const light = new BABYLON.HemisphericLight('light', new BABYLON.Vector3(0, 1, 0), scene);
 light.intensity = 0.8;
 
-function makeMat(color, alpha) {{
-  const mat = new BABYLON.StandardMaterial('mat', scene);
+function makeMat(name, color, alpha) {{
+  const mat = new BABYLON.StandardMaterial(name, scene);
   mat.diffuseColor = BABYLON.Color3.FromHexString(color);
   mat.alpha = alpha;
+  mat.freeze();
   return mat;
 }}
 
-function addBox(pos, size, color, alpha) {{
-  const box = BABYLON.MeshBuilder.CreateBox('box', {{ size }}, scene);
-  box.position = new BABYLON.Vector3(pos[0], pos[1], pos[2]);
-  box.material = makeMat(color, alpha);
-  return box;
+// One mesh and one shared material per category; every cell of it is a thin
+// instance, so each category is a single draw call.
+function addBatch(name, mesh, positions, color, alpha) {{
+  const count = positions.length / 3;
+  if (!count) {{
+    mesh.dispose();
+    return null;
+  }}
+  const matrices = new Float32Array(count * 16);
+  for (let i = 0; i < count; i++) {{
+    const o = i * 16;
+    matrices[o] = matrices[o + 5] = matrices[o + 10] = matrices[o + 15] = 1;
+    matrices[o + 12] = positions[i * 3];
+    matrices[o + 13] = positions[i * 3 + 1];
+    matrices[o + 14] = positions[i * 3 + 2];
+  }}
+  mesh.thinInstanceSetBuffer('matrix', matrices, 16, true);
+  mesh.thinInstanceRefreshBoundingInfo(false);
+  mesh.material = makeMat(`${{name}}Mat`, color, alpha);
+  mesh.isPickable = false;
+  return mesh;
 }}
 
-const doorCells = new Set(data.doorCells || []);
-
-function addSphere(pos, diameter, color, alpha) {{
-  const sphere = BABYLON.MeshBuilder.CreateSphere('sphere', {{ diameter }}, scene);
-  sphere.position = new BABYLON.Vector3(pos[0], pos[1], pos[2]);
-  sphere.material = makeMat(color, alpha);
-  return sphere;
+const box = (name, size) => BABYLON.MeshBuilder.CreateBox(name, {{ size }}, scene);
+const sphere = (name, diameter) => BABYLON.MeshBuilder.CreateSphere(name, {{ diameter }}, scene);
+addBatch('cell', box('cell', 0.9), data.batches.cell, '#2a6fd2', 0.2);
+addBatch('door', box('door', 0.9), data.batches.door, '#ff4d4d', 0.2);
+addBatch('start', sphere('start', 0.65), data.batches.start, '#2ecc71', 0.95);
+addBatch('goal', sphere('goal', 0.65), data.batches.goal, '#f1c40f', 0.95);
+// More translucent so it doesn't hide start/goal spheres if overlapping
+addBatch('button', box('button', 0.7), data.batches.button, '#ff7f0e', 0.5);
+
+// Labels: every path step's text is drawn once into a shared atlas texture and
+// shown as a billboard sprite; one sprite manager (one draw call) per atlas.
+const labelCell = {{ width: 256, height: 64 }};
+const atlasSize = Math.min(engine.getCaps().maxTextureSize || 4096, 4096);
+const labelsPerRow = atlasSize / labelCell.width;
+const labelsPerAtlas = labelsPerRow * (atlasSize / labelCell.height);
+
+function makeAtlas(texts) {{
+  // Power-of-two sides; the sprite manager derives the column count from the width.
+  const rows = Math.ceil(texts.length / labelsPerRow);
+  let width = labelCell.width;
+  while (width < Math.min(texts.length, labelsPerRow) * labelCell.width) width *= 2;
+  let height = labelCell.height;
+  while (height < rows * labelCell.height) height *= 2;
+  const dt = new BABYLON.DynamicTexture('labelAtlas', {{ width, height }}, scene, false);
+  dt.hasAlpha = true;
+  const ctx = dt.getContext();
+  ctx.font = '36px monospace';
+  texts.forEach((text, i) => {{
+    const x = (i % labelsPerRow) * labelCell.width;
+    const y = Math.floor(i / labelsPerRow) * labelCell.height;
+    ctx.fillStyle = 'rgba(10,16,32,0.8)';
+    ctx.fillRect(x, y, labelCell.width, labelCell.height);
+    ctx.fillStyle = '#ffffff';
+    ctx.fillText(text, x + 6, y + 46, labelCell.width - 12);
+  }});
+  // Sprite sheets are read top row first, i.e. without flipping.
+  dt.update(false);
+  const manager = new BABYLON.SpriteManager('labels', '', texts.length, labelCell, scene);
+  manager.texture = dt;
+  manager.isPickable = false;
+  return manager;
 }}
 
-function lerp(a, b, t) {{ return a + (b - a) * t; }}
-function lerpColor(c1, c2, t) {{
-  const r1 = parseInt(c1.slice(1, 3), 16);
-  const g1 = parseInt(c1.slice(3, 5), 16);
-  const b1 = parseInt(c1.slice(5, 7), 16);
-  const r2 = parseInt(c2.slice(1, 3), 16);
-  const g2 = parseInt(c2.slice(3, 5), 16);
-  const b2 = parseInt(c2.slice(5, 7), 16);
-  const r = Math.round(lerp(r1, r2, t));
-  const g = Math.round(lerp(g1, g2, t));
-  const b = Math.round(lerp(b1, b2, t));
-  return `#${{r.toString(16).padStart(2,'0')}}${{g.toString(16).padStart(2,'0')}}${{b.toString(16).padStart(2,'0')}}`;
+// Like the Three.js viewer, long paths are labelled every few steps only.
+const maxLabels = 400;
+
+function addLabels(labels) {{
+  const labelEvery = Math.max(1, Math.ceil(labels.length / maxLabels));
+  const shown = labels.filter((_, i) => i % labelEvery === 0);
+  for (let start = 0; start < shown.length; start += labelsPerAtlas) {{
+    const chunk = shown.slice(start, start + labelsPerAtlas);
+    const manager = makeAtlas(chunk.map(([text]) => text));
+    chunk.forEach(([, pos], i) => {{
+      const sprite = new BABYLON.Sprite('label', manager);
+      sprite.cellIndex = i;
+      sprite.width = 1.1;
+      sprite.height = 0.28;
+      sprite.position = new BABYLON.Vector3(pos[0], pos[1] + 0.65, pos[2]);
+    }});
+  }}
 }}
 
 const pathList = document.getElementById('pathList');
-const pathPoints = [];
-
-for (const cell of data.cells) {{
-  const isDoor = doorCells.has(cell.name);
-  addBox(cell.pos, 0.9, isDoor ? '#ff4d4d' : '#2a6fd2', 0.2);
-}}
-
-function addLabel(text, pos) {{
-  const dt = new BABYLON.DynamicTexture('label', {{ width: 256, height: 64 }}, scene, true);
-  dt.hasAlpha = true;
-  dt.drawText(text, 6, 46, '36px monospace', '#ffffff', 'rgba(10,16,32,0.8)', true);
-  const mat = new BABYLON.StandardMaterial('labelMat', scene);
-  mat.diffuseTexture = dt;
-  mat.opacityTexture = dt;
-  const plane = BABYLON.MeshBuilder.CreatePlane('labelPlane', {{ width: 1.1, height: 0.28 }}, scene);
-  plane.material = mat;
-  plane.position = new BABYLON.Vector3(pos[0], pos[1] + 0.65, pos[2]);
-  plane.billboardMode = BABYLON.Mesh.BILLBOARDMODE_ALL;
-  return plane;
-}}
-
-function drawPath(pathData) {{
+const labels = [];
+for (const pathData of data.paths) {{
+  const agent = pathData.agent || 'a1';
   const points = [];
   for (let i = 0; i < pathData.path.length; i++) {{
     const cell = pathData.path[i];
     points.push(new BABYLON.Vector3(cell.pos[0], cell.pos[1], cell.pos[2]));
     const li = document.createElement('li');
-    li.textContent = `${{pathData.agent}} ${{i + 1}}: ${{cell.name}}`;
+    li.textContent = `${{agent}} ${{i + 1}}: ${{cell.name}}`;
     pathList.appendChild(li);
-    addLabel(`${{pathData.agent}}:${{i + 1}}:${{cell.name}}`, cell.pos);
+    labels.push([`${{agent}}:${{i + 1}}:${{cell.name}}`, cell.pos]);
   }}
-
-  if (pathData.start) {{
-    addSphere(pathData.start.pos, 0.65, '#2ecc71', 0.95);
-  }}
-  if (pathData.goal) {{
-    addSphere(pathData.goal.pos, 0.65, '#f1c40f', 0.95);
-  }}
-
-  // Draw line for this agent
+  // One line per agent; no combined polyline.
   if (points.length >= 2) {{
-    const line = BABYLON.MeshBuilder.CreateLines(`path_${{pathData.agent}}`, {{ points }}, scene);
+    const line = BABYLON.MeshBuilder.CreateLines(`path_${{agent}}`, {{ points }}, scene);
     line.color = BABYLON.Color3.FromHexString(pathData.color);
+    line.isPickable = false;
   }}
 }}
-
-// Back-compat: single-path renders
-if (data.path) {{
-  drawPath({{
-    agent: 'a1',
-    color: '#ff3030',
-    path: data.path,
-    start: data.start,
-    goal: data.goal,
-  }});
-}}
-
-// Multi-agent renders
-if (data.paths) {{
-  for (const p of data.paths) {{
-    drawPath(p);
+addLabels(labels);
+
+// Fit camera (loops, not Math.min(...xs): spreading 10^6 values overflows the stack)
+const lo = [Infinity, Infinity, Infinity];
+const hi = [-Infinity, -Infinity, -Infinity];
+for (const positions of [data.batches.cell, data.batches.door]) {{
+  for (let i = 0; i < positions.length; i++) {{
+    lo[i % 3] = Math.min(lo[i % 3], positions[i]);
+    hi[i % 3] = Math.max(hi[i % 3], positions[i]);
   }}
 }}
-for (const cell of data.buttons) {{
-  // More translucent so it doesn't hide start/goal spheres if overlapping
-  addBox(cell.pos, 0.7, '#ff7f0e', 0.5);
-}}
-
-// NOTE: we draw per-agent lines above; do not draw a combined polyline.
-
-// Fit camera
-if (data.cells.length > 0) {{
-  const xs = data.cells.map(c => c.pos[0]);
-  const ys = data.cells.map(c => c.pos[1]);
-  const zs = data.cells.map(c => c.pos[2]);
-  const center = new BABYLON.Vector3(
-    (Math.min(...xs) + Math.max(...xs)) / 2,
-    (Math.min(...ys) + Math.max(...ys)) / 2,
-    (Math.min(...zs) + Math.max(...zs)) / 2
-  );
+if (lo[0] <= hi[0]) {{
+  const center = new BABYLON.Vector3((lo[0] + hi[0]) / 2, (lo[1] + hi[1]) / 2, (lo[2] + hi[2]) / 2);
   camera.target = center;
-  camera.radius = Math.max(...xs.map(x => Math.abs(x - center.x))) + Math.max(...ys.map(y => Math.abs(y - center.y))) + 6;
+  camera.radius = (hi[0] - lo[0]) / 2 + (hi[1] - lo[1]) / 2 + 6;
+  camera.maxZ = Math.max(10000, camera.radius * 20);
 }}
 
 engine.runRenderLoop(() => scene.render());
@@ -643,6 +638,8 @@ def main():
     )
     args = parser.parse_args()
 
+    problem = load_problem(args.problem)
+
     # Decide which agents to render
     requested_agents = None
     if args.agents:
@@ -653,90 +650,58 @@ def main():
     elif args.agent:
       agents = [args.agent]
     else:
-      # Default: a1 if present, else first declared agent, else a1.
-      agents_found = parse_agents(args.problem)
-      agents = ["a1"] if "a1" in agents_found else ([agents_found[0]] if agents_found else ["a1"])
+      agents = [default_agent(problem)]
 
-    # Parse cells, buttons, starts/goals
-    if len(agents) == 1:
-      cells, start, goal, buttons = parse_problem(args.problem)
+    buttons = [(b, cell) for b, cells in problem.button_at.items() for cell in cells]
+    door_cells = {c for _, a, b in problem.connects for c in (a, b)}
+
+    extra = {cell for _, cell in buttons}
+    for agent in agents:
+      if problem.starts.get(agent):
+        extra.add(problem.starts[agent])
+      if problem.goals.get(agent):
+        extra.add(problem.goals[agent])
+    filtered_cells = graph_traversable_cells(args.problem, extra)
+    if filtered_cells is None:
+      cells = cell_positions(problem)
       if not cells:
         print("Warning: no 3D cells parsed. Expect names like c012 or c0_1_2.", flush=True)
+      filtered_cells = traversable_cells(problem, cells, extra)
+
+    def marker(name):
+      return {"name": name, "pos": filtered_cells[name]} if name in filtered_cells else None
 
-      adjacency = parse_adjacency(args.problem)
-      connects = parse_connects(args.problem)
-      stairs = parse_stairs(args.problem)
-      elevators = parse_elevator_connects(args.problem)
-
-      door_cells = {c for _, a, b in connects for c in (a, b)}
-      edges = set(adjacency)
-      edges |= {(a, b) for _, a, b in connects}
-      edges |= set(stairs)
-      edges |= {(a, b) for _, a, b in elevators}
-
-      extra = set()
-      if start:
-        extra.add(start)
-      if goal:
-        extra.add(goal)
-      extra |= set(buttons.values())
-
-      filtered_cells = filter_traversable_cells(cells, edges, extra)
+    if len(agents) == 1:
+      start = problem.starts.get(agents[0])
+      goal = problem.goals.get(agents[0])
       path_cells = parse_plan(args.plan, agent=agents[0]) if args.plan else []
       data = {
         "cells": [{"name": k, "pos": v} for k, v in filtered_cells.items()],
         "path": [{"name": n, "pos": filtered_cells[n]} for n in path_cells if n in filtered_cells],
-        "start": {"name": start, "pos": filtered_cells[start]} if start in filtered_cells else None,
-        "goal": {"name": goal, "pos": filtered_cells[goal]} if goal in filtered_cells else None,
-        "buttons": [{"name": b, "pos": filtered_cells[c]} for b, c in buttons.items() if c in filtered_cells],
+        "start": marker(start),
+        "goal": marker(goal),
+        "buttons": [{"name": b, "pos": filtered_cells[c]} for b, c in buttons if c in filtered_cells],
         "doorCells": [c for c in door_cells if c in filtered_cells],
       }
     else:
-      cells, starts, goals, buttons = parse_problem_multi(args.problem, agents)
-      if not cells:
-        print("Warning: no 3D cells parsed. Expect names like c012 or c0_1_2.", flush=True)
-
-      adjacency = parse_adjacency(args.problem)
-      connects = parse_connects(args.problem)
-      stairs = parse_stairs(args.problem)
-      elevators = parse_elevator_connects(args.problem)
-
-      door_cells = {c for _, a, b in connects for c in (a, b)}
-      edges = set(adjacency)
-      edges |= {(a, b) for _, a, b in connects}
-      edges |= set(stairs)
-      edges |= {(a, b) for _, a, b in elevators}
-
-      extra = set()
-      for agent in agents:
-        if starts.get(agent):
-          extra.add(starts[agent])
-        if goals.get(agent):
-          extra.add(goals[agent])
-      extra |= set(buttons.values())
-
-      filtered_cells = filter_traversable_cells(cells, edges, extra)
-
       palette = ["#ff3030", "#8a5cff", "#2dd4bf", "#f97316", "#22c55e"]
       paths = []
       for idx, agent in enumerate(agents):
         path_cells = parse_plan(args.plan, agent=agent) if args.plan else []
-        start = starts.get(agent)
-        goal = goals.get(agent)
         paths.append(
           {
             "agent": agent,
             "color": palette[idx % len(palette)],
             "path": [{"name": n, "pos": filtered_cells[n]} for n in path_cells if n in filtered_cells],
-            "start": {"name": start, "pos": filtered_cells[start]} if start in filtered_cells else None,
-            "goal": {"name": goal, "pos": filtered_cells[goal]} if goal in filtered_cells else None,
+            "start": marker(problem.starts.get(agent)),
+            "goal": marker(problem.goals.get(agent)),
           }
         )
 
       data = {
         "cells": [{"name": k, "pos": v} for k, v in filtered_cells.items()],
         "paths": paths,
-        "buttons": [{"name": b, "pos": filtered_cells[c]} for b, c in buttons.items() if c in filtered_cells],
+        "buttons": [{"name": b, "pos": filtered_cells[c]} for b, c in buttons if c in filtered_cells],
         "doorCells": [c for c in door_cells if c in filtered_cells],
       }
 
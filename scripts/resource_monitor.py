@@ -0,0 +1,309 @@
+"""Memory and CPU accounting for planner runs.
+
+`ResourceMonitor` samples the planner while it runs, from a background thread:
+
+- natively, the process tree under the child from `/proc` (`VmRSS`/`VmHWM`
+  and utime/stime of every process), topped up after exit with
+  `resource.getrusage(RUSAGE_CHILDREN)`, which also covers platforms without
+  `/proc`;
+- in Docker mode, the container's cgroup (v1 or v2), found from the id that
+  `docker run --cidfile` writes. When the cgroup is not visible from the host
+  (Docker Desktop), `docker stats` is polled for memory instead.
+
+`stop()` returns the `resources` block of the stats JSON: peak RSS, user and
+system CPU seconds, a coarse `[seconds, rss_mb]` series and per-process peaks.
+"""
+import glob
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SAMPLE_SECONDS = 0.5
+# The series is thinned (every other point dropped, interval doubled) past this length.
+MAX_SERIES_POINTS = 240
+MB = 1024 * 1024
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+DOCKER_UNITS = {"B": 1, "KB": 1e3, "MB": 1e6, "GB": 1e9, "KIB": 1024, "MIB": MB, "GIB": 1024 * MB}
+
+
+def rusage_children():
+    """`(user, system, maxrss_bytes)` of all reaped children so far, or None without `resource`."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    scale = 1 if os.uname().sysname == "Darwin" else 1024
+    return usage.ru_utime, usage.ru_stime, usage.ru_maxrss * scale
+
+
+def self_usage() -> dict:
+    """The `resources` block for work done inside this process (native solver, precheck, ...)."""
+    if resource is None:
+        return {"source": "self"}
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    scale = 1 if os.uname().sysname == "Darwin" else 1024
+    return {
+        "source": "self",
+        "peak_rss_mb": round(usage.ru_maxrss * scale / MB, 1),
+        "user_cpu_seconds": round(usage.ru_utime, 3),
+        "system_cpu_seconds": round(usage.ru_stime, 3),
+    }
+
+
+def read_proc(pid: int):
+    """`(name, rss_bytes, hwm_bytes, cpu_seconds, children)` of a live process, or None."""
+    base = f"/proc/{pid}"
+    try:
+        with open(f"{base}/stat", encoding="utf-8") as fh:
+            stat = fh.read()
+        rss = hwm = 0
+        with open(f"{base}/status", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    hwm = int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    # The name is in parentheses and may contain spaces; fields resume after the last ')'.
+    name = stat[stat.index("(") + 1 : stat.rindex(")")]
+    fields = stat[stat.rindex(")") + 2 :].split()
+    cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    children = []
+    for path in glob.glob(f"{base}/task/*/children"):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                children.extend(int(child) for child in fh.read().split())
+        except (OSError, ValueError):
+            continue
+    return name, rss, hwm, cpu, children
+
+
+def read_int(path: Path):
+    try:
+        return int(path.read_text(encoding="utf-8").split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def read_keyed(path: Path) -> dict:
+    """`key value` lines (cpu.stat, cpuacct.stat, memory.stat) as a dict of ints."""
+    out = {}
+    try:
+        for line in path.read_text(encoding="utf-8").splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[1].isdigit():
+                out[parts[0]] = int(parts[1])
+    except OSError:
+        pass
+    return out
+
+
+def container_cgroups(container_id: str):
+    """`(memory_dir, cpu_dir, version)` of a running container's cgroup, or None if not visible."""
+    v2 = [
+        CGROUP_ROOT / "system.slice" / f"docker-{container_id}.scope",
+        CGROUP_ROOT / "docker" / container_id,
+    ]
+    for path in v2:
+        if (path / "memory.current").exists():
+            return path, path, 2
+    for rel in (f"docker/{container_id}", f"system.slice/docker-{container_id}.scope"):
+        memory = CGROUP_ROOT / "memory" / rel
+        if (memory / "memory.usage_in_bytes").exists():
+            cpu = next(
+                (CGROUP_ROOT / c / rel for c in ("cpuacct", "cpu,cpuacct", "cpu") if (CGROUP_ROOT / c / rel).exists()),
+                None,
+            )
+            return memory, cpu, 1
+    return None
+
+
+def parse_docker_size(text: str):
+    """Bytes of a `docker stats` size like `12.5MiB`, or None."""
+    text = text.strip()
+    for unit in sorted(DOCKER_UNITS, key=len, reverse=True):
+        if text.upper().endswith(unit):
+            try:
+                return float(text[: -len(unit)]) * DOCKER_UNITS[unit]
+            except ValueError:
+                return None
+    return None
+
+
+class ResourceMonitor:
+    """Sample one planner run; see the module docstring.
+
+    Usage: `start(pid)` right after spawning the child, `stop()` once it has
+    been waited for. `snapshot()` gives the numbers so far while it runs.
+    """
+
+    def __init__(self, cidfile: Optional[Path] = None, interval: float = SAMPLE_SECONDS):
+        self.cidfile = Path(cidfile) if cidfile else None
+        self.interval = interval
+        self.source = "docker" if cidfile else "proc"
+        self.series = []
+        self.peak_rss = 0
+        self.user_cpu = None
+        self.system_cpu = None
+        self.processes = {}
+        self._cgroup = None
+        self._container = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, pid: int):
+        self.pid = pid
+        self._before = rusage_children()
+        self._start = time.perf_counter()
+        self._next_at = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._sample()
+            except (OSError, subprocess.SubprocessError):
+                pass
+            self._stop.wait(self.interval)
+
+    def _record(self, rss: float):
+        elapsed = time.perf_counter() - self._start
+        with self._lock:
+            self.peak_rss = max(self.peak_rss, rss)
+            if elapsed < self._next_at:
+                return
+            self.series.append([round(elapsed, 2), round(rss / MB, 1)])
+            if len(self.series) > MAX_SERIES_POINTS:
+                self.series = self.series[::2]
+                self.interval *= 2
+            self._next_at = elapsed + self.interval
+
+    def _sample(self):
+        if self.cidfile:
+            self._sample_container()
+        else:
+            self._sample_tree()
+
+    def _sample_tree(self):
+        total = 0
+        hwm_max = 0
+        todo = [self.pid]
+        seen = set()
+        while todo:
+            pid = todo.pop()
+            if pid in seen:
+                continue
+            seen.add(pid)
+            info = read_proc(pid)
+            if info is None:
+                continue
+            name, rss, hwm, cpu, children = info
+            total += rss
+            hwm_max = max(hwm_max, hwm)
+            with self._lock:
+                entry = self.processes.setdefault(pid, {"pid": pid, "name": name, "peak_rss": 0, "cpu_seconds": 0.0})
+                entry["peak_rss"] = max(entry["peak_rss"], rss, hwm)
+                entry["cpu_seconds"] = cpu
+            todo.extend(children)
+        if total:
+            # VmHWM catches a single process's spikes between samples.
+            with self._lock:
+                self.peak_rss = max(self.peak_rss, hwm_max)
+            self._record(total)
+
+    def _sample_container(self):
+        if self._container is None:
+            try:
+                self._container = self.cidfile.read_text(encoding="utf-8").strip() or None
+            except OSError:
+                return
+            if self._container is None:
+                return
+            self._cgroup = container_cgroups(self._container)
+        if self._cgroup is None:
+            self._sample_docker_stats()
+            return
+        memory, cpu, version = self._cgroup
+        self.source = "cgroup"
+        if version == 2:
+            rss = read_int(memory / "memory.current")
+            peak = read_int(memory / "memory.peak")
+            stat = read_keyed(cpu / "cpu.stat")
+            if "user_usec" in stat:
+                self.user_cpu = stat["user_usec"] / 1e6
+                self.system_cpu = stat.get("system_usec", 0) / 1e6
+        else:
+            rss = read_int(memory / "memory.usage_in_bytes")
+            peak = read_int(memory / "memory.max_usage_in_bytes")
+            stat = read_keyed(cpu / "cpuacct.stat") if cpu else {}
+            if "user" in stat:
+                self.user_cpu = stat["user"] / CLOCK_TICKS
+                self.system_cpu = stat.get("system", 0) / CLOCK_TICKS
+        if peak:
+            with self._lock:
+                self.peak_rss = max(self.peak_rss, peak)
+        if rss is not None:
+            self._record(rss)
+
+    def _sample_docker_stats(self):
+        self.source = "docker-stats"
+        proc = subprocess.run(
+            ["docker", "stats", "--no-stream", "--format", "{{.MemUsage}}", self._container],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=10,
+        )
+        used = parse_docker_size(proc.stdout.split("/")[0]) if proc.returncode == 0 else None
+        if used is not None:
+            self._record(used)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {
+                "source": self.source,
+                "interval_seconds": self.interval,
+                "peak_rss_mb": round(self.peak_rss / MB, 1) if self.peak_rss else None,
+                "user_cpu_seconds": None if self.user_cpu is None else round(self.user_cpu, 3),
+                "system_cpu_seconds": None if self.system_cpu is None else round(self.system_cpu, 3),
+                "rss_series": [list(point) for point in self.series],
+            }
+            if self.processes:
+                out["processes"] = [
+                    {
+                        "pid": p["pid"],
+                        "name": p["name"],
+                        "peak_rss_mb": round(p["peak_rss"] / MB, 1),
+                        "cpu_seconds": round(p["cpu_seconds"], 3),
+                    }
+                    for p in sorted(self.processes.values(), key=lambda p: p["pid"])
+                ]
+        return out
+
+    def stop(self) -> dict:
+        """Stop sampling; call after the child was waited for. Returns the `resources` block."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=15)
+        after = rusage_children()
+        if self.source == "proc" and self._before and after:
+            # Exact totals for the reaped tree; ru_maxrss only says something if it grew.
+            self.user_cpu = after[0] - self._before[0]
+            self.system_cpu = after[1] - self._before[1]
+            if after[2] > self._before[2]:
+                self.peak_rss = max(self.peak_rss, after[2])
+            if not self.series:
+                self.source = "rusage"
+        return self.snapshot()
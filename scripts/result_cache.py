@@ -0,0 +1,161 @@
+"""Content-addressed cache of planner runs.
+
+Entries are keyed by a hash of everything that determines a run's result: the
+domain text, the normalized problem text, the planner identity (binary hash or
+Docker image id) and the run flags. Each entry is a directory holding the
+stats JSON, the extracted plan and the raw planner output. The cache is capped
+by total size and evicts least-recently-used entries first.
+"""
+import errno
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+COMMENT_RE = re.compile(r";[^\n]*")
+SPACE_RE = re.compile(r"\s+")
+PAREN_SPACE_RE = re.compile(r"\s*([()])\s*")
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def normalize_pddl(text: str) -> str:
+    """Drop comments, case and layout so cosmetic edits keep the same key."""
+    text = COMMENT_RE.sub("", text).lower()
+    text = SPACE_RE.sub(" ", text)
+    return PAREN_SPACE_RE.sub(r"\1", text).strip()
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def planner_identity(use_docker: bool, planner: Optional[Path], docker_image: Optional[str]) -> str:
+    """Identify the planner build: image id for Docker, file hash for a native binary."""
+    if use_docker:
+        proc = subprocess.run(
+            ["docker", "image", "inspect", "--format", "{{.Id}}", docker_image],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        image_id = proc.stdout.strip()
+        # Unknown/unbuilt image: fall back to the tag so lookups still work.
+        return f"docker:{image_id or docker_image}"
+    return f"native:{sha256_file(planner)}"
+
+
+def run_flags(
+    fast: bool,
+    time_limit: Optional[float],
+    stall_seconds: Optional[float] = None,
+    target_metric: Optional[float] = None,
+    reduce: bool = False,
+    contract: bool = False,
+) -> dict:
+    """The run options that go into `cache_key`; every caller builds them here so keys agree."""
+    return {
+        "fast": bool(fast),
+        "time_limit": time_limit,
+        "stall_seconds": stall_seconds,
+        "target_metric": target_metric,
+        "reduce": bool(reduce),
+        "contract": bool(contract),
+    }
+
+
+def cache_key(domain_text: str, problem_text: str, planner_id: str, flags: dict) -> str:
+    digest = hashlib.sha256()
+    for part in (
+        normalize_pddl(domain_text),
+        normalize_pddl(problem_text),
+        planner_id,
+        json.dumps(flags, sort_keys=True),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str):
+        """Return `{"stats", "plan", "output"}` for `key`, or None on a miss."""
+        entry = self._entry(key)
+        try:
+            stats = json.loads((entry / "stats.json").read_text(encoding="utf-8"))
+            plan = (entry / "plan.out").read_text(encoding="utf-8")
+            output = (entry / "raw.txt").read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            return None
+        # Entry mtime is the LRU clock.
+        now = time.time()
+        try:
+            os.utime(entry, (now, now))
+        except FileNotFoundError:
+            pass  # Evicted by another process after the read; the result is still good.
+        return {"stats": stats, "plan": plan, "output": output}
+
+    def put(self, key: str, stats: dict, plan_text: str, output: str):
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # Build the entry next to its final place, then rename it in atomically.
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key[:8]}-", dir=entry.parent))
+        try:
+            (tmp / "stats.json").write_text(
+                json.dumps(stats, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+            )
+            (tmp / "plan.out").write_text(plan_text, encoding="utf-8")
+            (tmp / "raw.txt").write_text(output, encoding="utf-8")
+            if entry.exists():
+                shutil.rmtree(entry, ignore_errors=True)
+            try:
+                os.replace(tmp, entry)
+            except OSError as exc:
+                # Another process stored this key in between; same key, same result.
+                if exc.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                    raise
+        finally:
+            if tmp.exists():
+                shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits in `max_bytes`."""
+        entries = []
+        total = 0
+        for shard in self.root.iterdir() if self.root.exists() else []:
+            if not shard.is_dir():
+                continue
+            for entry in shard.iterdir():
+                if not entry.is_dir() or entry.name.startswith("."):
+                    continue
+                try:
+                    size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue  # Evicted or replaced by another process meanwhile.
+                entries.append((mtime, size, entry))
+                total += size
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 import argparse
 import json
+import os
+import queue
+import shutil
 import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 
@@ -12,7 +18,353 @@ def load_stats(path: Path):
     return json.loads(path.read_text(encoding="utf-8", errors="ignore"))
 
 
+def report_done(problem: Path, stats_path: Path):
+    stats = load_stats(stats_path)
+    if stats:
+        found = stats.get("plan", {}).get("found")
+        actions = stats.get("plan", {}).get("actions")
+        wall = stats.get("wall_seconds")
+        timed_out = stats.get("timed_out")
+        print(
+            f"[done] {problem.name} found={found} actions={actions} wall={wall:.2f}s timed_out={timed_out}"
+        )
+        for item in stats.get("unsolvable", {}).get("unreachable_goals", []):
+            print(f"[unsolvable] {problem.name} {item['agent']} cannot reach {item['goal']}")
+    else:
+        print(f"[warn] {problem.name} stats not written")
+
+
+def is_stale(stats: dict, problem: Path) -> bool:
+    """True when the stats were produced from a different version of `problem`."""
+    from result_cache import sha256_file
+
+    recorded = stats.get("problem_sha256")
+    # Stats written before hashes were recorded can't be checked; keep them.
+    return recorded is not None and recorded != sha256_file(problem)
+
+
+def run_in_pool(pool, args, problem: Path, stats_path: Path, plan_path):
+    """Run one problem inside a warm pool container and write its stats/plan."""
+    import run_optic
+
+    cache = None
+    key = None
+    if args.cache_dir:
+        from result_cache import ResultCache, cache_key, planner_identity, run_flags
+
+        cache = ResultCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+        key = cache_key(
+            args.domain.read_text(encoding="utf-8", errors="ignore"),
+            problem.read_text(encoding="utf-8", errors="ignore"),
+            planner_identity(True, None, pool.image),
+            # Pool jobs run OPTIC on the problem as is: same key as a plain `run_optic.py` run.
+            run_flags(args.fast, args.time_limit),
+        )
+        hit = cache.get(key)
+        if hit:
+            payload = hit["stats"]
+            payload.update(problem=str(problem), cache={"key": key, "hit": True})
+            if plan_path:
+                payload["plan_out"] = str(plan_path)
+                if hit["plan"]:
+                    run_optic.write_text_atomic(plan_path, hit["plan"])
+            run_optic.write_stats_file(payload, stats_path)
+            return
+
+    job_args = argparse.Namespace(
+        domain=args.domain,
+        problem=problem,
+        docker_image=pool.image,
+        planner=None,
+        fast=args.fast,
+        time_limit=args.time_limit,
+        plan_out=plan_path,
+    )
+    builtin, unsolvable = run_optic.run_precheck(job_args)
+    mode = "precheck"
+    if builtin is None:
+        builtin, _ = run_optic.run_native(job_args)
+        mode = "native-solver"
+    if builtin:
+        plan = builtin["plan"]
+        payload = run_optic.build_stats_payload(
+            job_args,
+            False,
+            plan,
+            run_optic.parse_stats(builtin["output"]),
+            False,
+            0,
+            builtin["wall_seconds"],
+        )
+        payload.update(mode=mode, planner=None)
+        if unsolvable:
+            payload["unsolvable"] = {"unreachable_goals": unsolvable}
+        run_optic.write_stats_file(payload, stats_path)
+        if plan_path and plan:
+            run_optic.write_plan_file(plan, plan_path)
+        return
+
+    worker = pool.acquire()
+    try:
+        cmd = pool.exec_cmd(worker, args.domain, problem, args.fast, args.time_limit)
+        # Host-side backstop in case the in-container timeout never fires.
+        backstop = None if args.time_limit is None else args.time_limit + 10
+        result = run_optic.run_planner(cmd, time_limit=backstop)
+        if result["timed_out"]:
+            worker["broken"] = True
+        timed_out = result["timed_out"] or result["return_code"] == 124
+        return_code = 124 if timed_out else result["return_code"]
+        output = result["output"]
+        plan = run_optic.extract_plan(output)
+        payload = run_optic.build_stats_payload(
+            job_args,
+            True,
+            plan,
+            run_optic.parse_stats(output),
+            timed_out,
+            return_code,
+            result["wall_seconds"],
+        )
+        payload["mode"] = "docker-pool"
+        payload["worker"] = worker["name"]
+        run_optic.write_stats_file(payload, stats_path)
+        if plan_path and plan:
+            run_optic.write_plan_file(plan, plan_path)
+        if cache and (return_code == 0 or timed_out):
+            plan_text = run_optic.plan_file_text(plan) if plan else ""
+            cache.put(key, payload, plan_text, output)
+    finally:
+        pool.release(worker)
+
+
+def batch_cmd(args, run_optic: Path, problem: Path, stats_path: Path, plan_path):
+    """Command line of one run_optic.py job."""
+    cmd = [
+        sys.executable,
+        str(run_optic),
+        str(args.domain),
+        str(problem),
+        "--time-limit",
+        str(args.time_limit),
+        "--stats-out",
+        str(stats_path),
+    ]
+    if plan_path:
+        cmd.extend(["--plan-out", str(plan_path)])
+    if args.fast:
+        cmd.append("--fast")
+    if args.docker:
+        cmd.append("--docker")
+        if args.docker_image:
+            cmd.extend(["--docker-image", args.docker_image])
+    elif args.docker_image:
+        cmd.extend(["--docker-image", args.docker_image])
+    if args.cache_dir:
+        cmd.extend(["--cache-dir", str(args.cache_dir), "--cache-max-mb", str(args.cache_max_mb)])
+    return cmd
+
+
+def isolated_cores():
+    """Cores the kernel keeps the scheduler off (`isolcpus=`), empty where unknown."""
+    try:
+        text = Path("/sys/devices/system/cpu/isolated").read_text(encoding="utf-8").strip()
+    except OSError:
+        return set()
+    cores = set()
+    for part in filter(None, text.split(",")):
+        low, _, high = part.partition("-")
+        cores.update(range(int(low), int(high or low) + 1))
+    return cores
+
+
+def pin_to(core):
+    """preexec_fn pinning the child to `core`, or None."""
+    if core is None or not hasattr(os, "sched_setaffinity"):
+        return None
+    return lambda: os.sched_setaffinity(0, {core})
+
+
+def run_trials(args, run_optic: Path, problem: Path, stats_path: Path, plan_path):
+    """Run `problem` `--warmup` times unrecorded, then `--trials` times; write the combined stats.
+
+    Each trial writes to a scratch directory. The stats JSON is the median
+    trial's (see `trial_stats.py`) and its plan is the one kept.
+    """
+    from trial_stats import trials_payload
+
+    import run_optic as optic
+
+    payloads = []
+    plans = []
+    with tempfile.TemporaryDirectory(prefix="trials-") as tmp:
+        for i in range(args.warmup + args.trials):
+            warm = i < args.warmup
+            trial_stats = Path(tmp) / f"{i}.json"
+            trial_plan = Path(tmp) / f"{i}.out" if plan_path else None
+            cmd = batch_cmd(args, run_optic, problem, trial_stats, trial_plan)
+            if args.isolate_core is not None and args.docker:
+                cmd.extend(["--docker-cpuset", str(args.isolate_core)])
+            proc = subprocess.run(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                preexec_fn=pin_to(args.isolate_core),
+                check=False,
+            )
+            stats = load_stats(trial_stats)
+            if warm:
+                kind, count = "warmup", f"{i + 1}/{args.warmup}"
+            else:
+                kind, count = "trial", f"{i - args.warmup + 1}/{args.trials}"
+            if stats is None:
+                errors = (proc.stderr or b"").decode("utf-8", errors="replace").strip()
+                detail = errors.splitlines()[0] if errors else f"exit {proc.returncode}"
+                print(f"[warn] {problem.name} {kind} {count}: stats not written ({detail})")
+                continue
+            print(f"[{kind}] {problem.name} {count} wall={stats.get('wall_seconds') or 0:.3f}s", flush=True)
+            if warm:
+                continue
+            payloads.append(stats)
+            plans.append(trial_plan)
+        if not payloads:
+            return
+        payload = trials_payload(payloads, args.warmup, args.isolate_core)
+        plan = plans[payload["trials"]["representative"]]
+        if plan_path:
+            payload["plan_out"] = str(plan_path)
+            if plan.exists():
+                plan_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(plan, plan_path)
+    optic.write_stats_file(payload, stats_path)
+
+
+def report_trials(problem: Path, stats_path: Path):
+    stats = load_stats(stats_path)
+    summary = ((stats or {}).get("trials") or {}).get("summary", {}).get("wall_seconds")
+    if not summary:
+        report_done(problem, stats_path)
+        return
+    print(
+        f"[done] {problem.name} found={stats['plan'].get('found')} trials={stats['trials']['count']} "
+        f"wall median={summary['median']:.3f}s iqr={summary['iqr']:.3f}s min={summary['min']:.3f}s"
+    )
+
+
+def mem_available_mb():
+    """MemAvailable from /proc/meminfo, or None where it can't be read."""
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+# Longest a job waits for its memory share to be free before it starts anyway (under its cap).
+MEM_WAIT_SECONDS = 60
+
+
+class JobBudget:
+    """Hands out one dedicated core per job and caps each job's memory.
+
+    A job waits for a free core, and (where /proc/meminfo exists) for its
+    memory share to actually be available, so co-scheduled runs don't compete
+    for the same CPU or push each other into swap. The memory wait gives up
+    after `MEM_WAIT_SECONDS`, so a share that never frees can't hold a core forever.
+    """
+
+    def __init__(self, cores, mem_budget_mb=None):
+        self.cores = queue.Queue()
+        for core in cores:
+            self.cores.put(core)
+        self.slots = len(cores)
+        self.mem_per_job_mb = mem_budget_mb / self.slots if mem_budget_mb else None
+        available = mem_available_mb()
+        if self.mem_per_job_mb and available is not None and self.mem_per_job_mb > available:
+            raise SystemExit(
+                f"--mem-budget-mb gives each of {self.slots} jobs {self.mem_per_job_mb:.0f} MB, "
+                f"but only {available:.0f} MB is available; lower it or use fewer --jobs"
+            )
+
+    def acquire(self) -> int:
+        core = self.cores.get()
+        if self.mem_per_job_mb:
+            give_up = time.monotonic() + MEM_WAIT_SECONDS
+            while (mem_available_mb() or self.mem_per_job_mb) < self.mem_per_job_mb:
+                if time.monotonic() > give_up:
+                    print(
+                        f"[warn] {self.mem_per_job_mb:.0f} MB still not free after {MEM_WAIT_SECONDS}s; "
+                        "starting the job anyway",
+                        flush=True,
+                    )
+                    break
+                time.sleep(0.5)
+        return core
+
+    def release(self, core: int):
+        self.cores.put(core)
+
+    def preexec(self, core: int):
+        mem_bytes = int(self.mem_per_job_mb * 1024 * 1024) if self.mem_per_job_mb else None
+
+        def setup():
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, {core})
+            if mem_bytes:
+                import resource
+
+                resource.setrlimit(resource.RLIMIT_AS, (mem_bytes, mem_bytes))
+
+        return setup if os.name == "posix" else None
+
+
+def run_job(budget: JobBudget, cmd, docker: bool = False):
+    """Run one job on its own core; its output is dropped (the stats JSON is the result).
+
+    Pinning and the address-space cap only reach the `run_optic.py` client, so
+    in Docker mode the container gets the same core and memory share itself.
+    """
+    core = budget.acquire()
+    if docker:
+        cmd = cmd + ["--docker-cpuset", str(core)]
+        if budget.mem_per_job_mb:
+            cmd += ["--docker-memory-mb", f"{budget.mem_per_job_mb:.0f}"]
+    try:
+        proc = subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            preexec_fn=budget.preexec(core),
+            check=False,
+        )
+        return proc.returncode, (proc.stderr or b"").decode("utf-8", errors="replace").strip()
+    finally:
+        budget.release(core)
+
+
+def timed_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def report_schedule(durations, workers: int, batch_wall: float):
+    from batch_schedule import ideal_makespan
+
+    ideal = ideal_makespan(durations, workers)
+    ratio = batch_wall / ideal if ideal > 0 else 1.0
+    print(
+        f"[schedule] wall={batch_wall:.2f}s work={sum(durations):.2f}s "
+        f"ideal={ideal:.2f}s on {workers} workers ({ratio:.2f}x ideal)",
+        flush=True,
+    )
+
+
 def main():
+    from run_optic import available_cores
+
     parser = argparse.ArgumentParser(
         description="Run OPTIC for all problems and store stats JSON per problem."
     )
@@ -71,8 +423,96 @@ def main():
         action="store_true",
         help="Recompute stats even if JSON already exists.",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Run up to N problems at once, each pinned to its own core (default: 1).",
+    )
+    parser.add_argument(
+        "--cpu-budget",
+        type=int,
+        default=None,
+        metavar="CORES",
+        help="With --jobs: use at most this many cores (default: all available).",
+    )
+    parser.add_argument(
+        "--mem-budget-mb",
+        type=float,
+        default=None,
+        help="With --jobs: total memory for all running jobs; each gets an equal address-space cap.",
+    )
+    parser.add_argument(
+        "--order",
+        choices=("lpt", "name"),
+        default="lpt",
+        help="Job order for --jobs/--pool: lpt = longest predicted runtime first (default), name = sorted.",
+    )
+    parser.add_argument(
+        "--pool",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Keep N warm OPTIC containers and run jobs in them with docker exec (implies --docker).",
+    )
+    parser.add_argument(
+        "--pool-recycle",
+        type=int,
+        default=50,
+        metavar="JOBS",
+        help="Replace a pool container after this many jobs (default: 50).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Content-addressed result cache shared with run_optic.py (e.g. .cache/optic).",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=512,
+        help="Size cap of --cache-dir in MB (default: 512).",
+    )
+    parser.add_argument(
+        "--trials",
+        type=int,
+        default=1,
+        metavar="K",
+        help="Benchmark: run each problem K times and record every sample (default: 1).",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=0,
+        metavar="W",
+        help="Benchmark: unrecorded runs before the trials (default: 0).",
+    )
+    parser.add_argument(
+        "--isolate-core",
+        type=int,
+        default=None,
+        metavar="CORE",
+        help="Benchmark: pin every trial to this core (ideally one kept free with isolcpus=).",
+    )
     args = parser.parse_args()
 
+    benchmark = args.trials > 1 or args.warmup > 0 or args.isolate_core is not None
+    if benchmark:
+        if args.trials < 1 or args.warmup < 0:
+            raise SystemExit("--trials must be at least 1 and --warmup at least 0")
+        if args.jobs > 1 or args.pool:
+            raise SystemExit("--trials/--warmup/--isolate-core run one problem at a time; drop --jobs/--pool")
+        if args.cache_dir:
+            raise SystemExit("--trials measures fresh runs; drop --cache-dir")
+        if args.isolate_core is not None:
+            if args.isolate_core not in available_cores():
+                raise SystemExit(f"Core {args.isolate_core} is not available to this process")
+            if args.isolate_core not in isolated_cores():
+                print(f"[trials] core {args.isolate_core} is not isolated (isolcpus=); other tasks may share it")
+
     problems = sorted(args.problems_dir.glob(args.glob))
     if not problems:
         print(f"No problems found in {args.problems_dir} with {args.glob}", file=sys.stderr)
@@ -87,52 +527,110 @@ def main():
         print("scripts/run_optic.py not found.", file=sys.stderr)
         sys.exit(2)
 
+    pending = []
+    history = {}
     for problem in problems:
         stats_path = args.stats_dir / f"{problem.stem}.json"
+        stats = load_stats(stats_path) if stats_path.exists() else None
+        if stats:
+            history[problem] = (stats, not is_stale(stats, problem))
         if stats_path.exists() and not args.force:
-            stats = load_stats(stats_path)
-            found = stats.get("plan", {}).get("found") if stats else None
-            timed_out = stats.get("timed_out") if stats else None
-            print(f"[skip] {problem.name} found={found} timed_out={timed_out}")
-            continue
-
-        cmd = [
-            sys.executable,
-            str(run_optic),
-            str(args.domain),
-            str(problem),
-            "--time-limit",
-            str(args.time_limit),
-            "--stats-out",
-            str(stats_path),
-        ]
-        if args.plan_dir:
-            plan_path = args.plan_dir / f"{problem.stem}.out"
-            cmd.extend(["--plan-out", str(plan_path)])
-        if args.fast:
-            cmd.append("--fast")
-        if args.docker:
-            cmd.append("--docker")
-            if args.docker_image:
-                cmd.extend(["--docker-image", args.docker_image])
-        elif args.docker_image:
-            cmd.extend(["--docker-image", args.docker_image])
+            if stats and is_stale(stats, problem):
+                print(f"[stale] {problem.name} changed since its stats were written")
+            else:
+                found = stats.get("plan", {}).get("found") if stats else None
+                timed_out = stats.get("timed_out") if stats else None
+                print(f"[skip] {problem.name} found={found} timed_out={timed_out}")
+                continue
+        plan_path = args.plan_dir / f"{problem.stem}.out" if args.plan_dir else None
+        pending.append((problem, stats_path, plan_path))
 
-        print(f"[run] {problem.name}")
-        subprocess.run(cmd, check=False)
+    job_cores = available_cores()
+    if args.cpu_budget:
+        job_cores = job_cores[: args.cpu_budget]
+    job_cores = job_cores[: args.jobs]
+    workers = args.pool or (len(job_cores) if args.jobs > 1 else 1)
+    if workers > 1 and len(pending) > 1 and args.order == "lpt":
+        from batch_schedule import lpt_makespan, lpt_order, predict_runtimes
 
-        stats = load_stats(stats_path)
-        if stats:
-            found = stats.get("plan", {}).get("found")
-            actions = stats.get("plan", {}).get("actions")
-            wall = stats.get("wall_seconds")
-            timed_out = stats.get("timed_out")
+        predicted = predict_runtimes([p for p, _, _ in pending], history, args.time_limit)
+        pending = lpt_order(pending, predicted)
+        if any(fresh for _, fresh in history.values()):
             print(
-                f"[done] {problem.name} found={found} actions={actions} wall={wall:.2f}s timed_out={timed_out}"
+                f"[order] longest first: predicted work={sum(predicted.values()):.1f}s, "
+                f"makespan~{lpt_makespan(predicted.values(), workers):.1f}s on {workers} workers",
+                flush=True,
             )
         else:
-            print(f"[warn] {problem.name} stats not written")
+            print("[order] longest first by problem size (no stats history yet)", flush=True)
 
+    if args.pool and pending:
+        from docker_pool import DockerWorkerPool
+        from run_optic import default_docker_image
+
+        image = args.docker_image or default_docker_image()
+        with DockerWorkerPool(image, args.pool, recycle_after=args.pool_recycle) as pool:
+            with ThreadPoolExecutor(max_workers=args.pool) as executor:
+                futures = {}
+                batch_start = time.perf_counter()
+                durations = []
+                for problem, stats_path, plan_path in pending:
+                    print(f"[run] {problem.name}")
+                    future = executor.submit(
+                        timed_call, run_in_pool, pool, args, problem, stats_path, plan_path
+                    )
+                    futures[future] = (problem, stats_path)
+                for future in as_completed(futures):
+                    problem, stats_path = futures[future]
+                    try:
+                        _, seconds = future.result()
+                    except (OSError, RuntimeError, ValueError) as exc:
+                        print(f"[warn] {problem.name} failed: {exc}")
+                        continue
+                    durations.append(seconds)
+                    report_done(problem, stats_path)
+            print(f"[pool] containers started: {pool.started}")
+            report_schedule(durations, args.pool, time.perf_counter() - batch_start)
+        return
+    if args.pool:
+        return
+
+    if args.jobs > 1 and pending:
+        budget = JobBudget(job_cores, args.mem_budget_mb)
+        print(f"[jobs] {len(pending)} problems on {budget.slots} cores", flush=True)
+        batch_start = time.perf_counter()
+        durations = []
+        with ThreadPoolExecutor(max_workers=budget.slots) as executor:
+            futures = {}
+            for problem, stats_path, plan_path in pending:
+                cmd = batch_cmd(args, run_optic, problem, stats_path, plan_path)
+                futures[executor.submit(timed_call, run_job, budget, cmd, args.docker)] = (problem, stats_path)
+            for done, future in enumerate(as_completed(futures), start=1):
+                problem, stats_path = futures[future]
+                try:
+                    (returncode, errors), seconds = future.result()
+                except OSError as exc:
+                    print(f"[warn] {problem.name} failed: {exc}", flush=True)
+                    continue
+                durations.append(seconds)
+                if returncode != 0 and errors:
+                    print(f"[warn] {problem.name} exited {returncode}: {errors.splitlines()[0]}")
+                report_done(problem, stats_path)
+                print(f"[progress] {done}/{len(pending)}", flush=True)
+        report_schedule(durations, budget.slots, time.perf_counter() - batch_start)
+        return
+
+    if benchmark:
+        for problem, stats_path, plan_path in pending:
+            print(f"[run] {problem.name}")
+            run_trials(args, run_optic, problem, stats_path, plan_path)
+            report_trials(problem, stats_path)
+        return
+
+    for problem, stats_path, plan_path in pending:
+        print(f"[run] {problem.name}")
+        subprocess.run(batch_cmd(args, run_optic, problem, stats_path, plan_path), check=False)
+        report_done(problem, stats_path)
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,31 @@
 #!/usr/bin/env python3
 import argparse
+import codecs
 import json
+import os
 import platform
 import re
+import queue
 import subprocess
 import sys
 import shutil
+import tempfile
+import threading
 import time
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import List, Optional
 
 ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
 PLAN_RE = re.compile(r"^\s*([0-9]+(?:\.[0-9]+)?):\s+\(([^)]+)\)\s+\[([0-9]+(?:\.[0-9]+)?)\]", re.M)
 CELL_RE = re.compile(r"\bc(\d+)[,_]?(\d+)\b")
+SOLUTION_MARKERS = (";;;; Solution Found", "; Plan found with metric")
+PLAN_LINE_RE = re.compile(r"^\s*[0-9]+(?:\.[0-9]+)?:\s+\(")
+# OPTIC prints `b (h | g)` each time the best heuristic value of its search improves.
+PROGRESS_RE = re.compile(r"\bb \(([0-9]+(?:\.[0-9]+)?) \| ([0-9]+(?:\.[0-9]+)?)\)")
+MAX_PROGRESS_POINTS = 1000
+# Share of --time-limit the native solver may use before falling back to OPTIC.
+NATIVE_TIME_SHARE = 0.25
 
 
 def coerce_text(value) -> str:
@@ -50,45 +64,18 @@ def extract_stat(pattern: str, text: str):
 
 
 def parse_problem_cells(problem_path: Path):
-    text = problem_path.read_text(encoding="utf-8", errors="ignore")
-    obj_block = ""
-    match = re.search(r"\(:objects(.*?)\)\s*", text, re.S | re.I)
-    if match:
-        obj_block = match.group(1)
-
-    cells = set()
-    for name in re.findall(r"\bc\w+\b", obj_block):
-        m = CELL_RE.match(name)
-        if m:
-            cells.add(name)
-
-    start = None
-    goal = None
-    # Multi-agent format: (agent-at a1 cXY)
-    init_at = re.search(r"\(agent-at\s+\w+\s+(c\\w+)\)", text)
-    if init_at:
-        start = init_at.group(1)
-    goal_at = re.search(r"\(agent-at\s+\w+\s+(c\\w+)\)", text[text.find("(:goal"):])
-    if goal_at:
-        goal = goal_at.group(1)
-
-    # Back-compat (old single-agent): (at cXY)
-    if start is None:
-        init_at_old = re.search(r"\(at\s+(c\\w+)\)", text)
-        if init_at_old:
-            start = init_at_old.group(1)
-    if goal is None:
-        goal_at_old = re.search(r"\(at\s+(c\\w+)\)", text[text.find("(:goal"):])
-        if goal_at_old:
-            goal = goal_at_old.group(1)
+    """Return `(coords, start, goal)` for 2D `cXY` / `cX_Y` cells, for `--grid`."""
+    from problem_cache import load_problem
 
+    problem = load_problem(problem_path)
     coords = {}
-    for cell in cells:
-        m = CELL_RE.match(cell)
+    for name in problem.cells or problem.objects.get("object", []):
+        m = CELL_RE.fullmatch(name)
         if m:
-            coords[cell] = (int(m.group(1)), int(m.group(2)))
+            coords[name] = (int(m.group(1)), int(m.group(2)))
 
-    return coords, start, goal
+    agent = problem.agents[0] if problem.agents else None
+    return coords, problem.starts.get(agent), problem.goals.get(agent)
 
 
 def extract_path_cells(plan):
@@ -122,13 +109,14 @@ def format_grid(coords, start, goal, path_cells):
     min_y, max_y = min(ys), max(ys)
 
     path_set = set(path_cells)
+    name_at = {xy: name for name, xy in coords.items()}
 
     lines = ["Grid (row=x, col=y)"]
     for x in range(min_x, max_x + 1):
         row = []
         for y in range(min_y, max_y + 1):
-            name = f"c{x}{y}"
-            if name not in coords:
+            name = name_at.get((x, y))
+            if name is None:
                 row.append(" ")
                 continue
             if name == start:
@@ -195,16 +183,315 @@ def parse_stats(text: str):
         out["states_evaluated"] = int(states)
     return out
 
-def write_plan_file(plan, path: Path):
+def plan_quality(plan, stats: dict):
+    """Value used to rank incumbents (lower is better, as in `:metric minimize`)."""
+    for key in ("metric", "cost"):
+        if stats.get(key) is not None:
+            return float(stats[key])
+    if plan:
+        return max(step["end"] for step in plan)
+    return None
+
+
+def incumbent_entry(plan, stats: dict, seconds=None) -> dict:
+    """One point of the anytime trajectory."""
+    return {
+        "seconds": None if seconds is None else round(float(seconds), 3),
+        "planner_seconds": stats.get("time_seconds"),
+        "metric": plan_quality(plan, stats),
+        "actions": len(plan),
+        "makespan": max(step["end"] for step in plan),
+        "states_evaluated": stats.get("states_evaluated"),
+    }
+
+
+def incumbent_trajectory(text: str):
+    """Every improving plan in complete planner output, without wall timestamps.
+
+    Used where the output is only seen at the end; `planner_seconds` (OPTIC's
+    own `; Time`) still places the points in time.
+    """
+    parser = IncumbentParser()
+    blocks = [block for block in map(parser.feed, text.split("\n")) if block]
+    last = parser.flush()
+    if last:
+        blocks.append(last)
+    trajectory = []
+    best = None
+    for block in blocks:
+        plan = extract_plan(block)
+        if not plan:
+            continue
+        entry = incumbent_entry(plan, parse_stats(block))
+        if best is not None and (entry["metric"] is None or entry["metric"] >= best):
+            continue
+        best = entry["metric"]
+        trajectory.append(entry)
+    return trajectory
+
+
+class IncumbentParser:
+    """Split OPTIC output, fed line by line, into complete solution blocks.
+
+    A block starts at a solution marker (`;;;; Solution Found` or
+    `; Plan found with metric`) and ends at the first non-plan line after its
+    plan lines, or when the output ends.
+    """
+
+    def __init__(self):
+        self.block = []
+        self.in_block = False
+        self.saw_plan = False
+
+    def feed(self, line: str):
+        """Consume one line; return the text of a block completed by it, if any."""
+        done = None
+        stripped = line.strip()
+        if stripped.startswith(SOLUTION_MARKERS):
+            if self.in_block and self.saw_plan:
+                done = self._finish()
+            self.in_block = True
+            self.block.append(line)
+            return done
+        if not self.in_block:
+            return None
+        if PLAN_LINE_RE.match(line):
+            self.saw_plan = True
+            self.block.append(line)
+            return None
+        if self.saw_plan and stripped:
+            return self._finish()
+        self.block.append(line)
+        return None
+
+    def flush(self):
+        """Return the pending block at end of output (if it holds a plan)."""
+        if self.in_block and self.saw_plan:
+            return self._finish()
+        return None
+
+    def _finish(self):
+        text = "\n".join(self.block)
+        self.block = []
+        self.in_block = False
+        self.saw_plan = False
+        return text
+
+
+def _read_chunks(stream, out_queue):
+    # Runs in a thread: raw chunks so partial lines never block the stop checks.
+    while True:
+        chunk = stream.read1(65536) if hasattr(stream, "read1") else stream.read(65536)
+        if not chunk:
+            break
+        out_queue.put(chunk)
+    out_queue.put(None)
+
+
+def stop_process(proc):
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def stream_planner(
+    cmd,
+    time_limit=None,
+    stall_seconds=None,
+    target_metric=None,
+    on_incumbent=None,
+    monitor=None,
+):
+    """Run the planner, parsing each solution block as soon as it is printed.
+
+    `on_incumbent(plan, stats, wall_seconds)` is called for every strictly
+    improving plan. The run stops when the planner exits, `time_limit` elapses,
+    no improvement was seen for `stall_seconds` after the first plan, or an
+    incumbent reaches `target_metric`.
+
+    Returns a dict with `output`, `plan` (best incumbent), `return_code`,
+    `timed_out`, `stop_reason`, `incumbents`, `wall_seconds`, `trajectory`
+    (every incumbent with its wall time) and `progress` (OPTIC's `b (h | g)`
+    heuristic improvements with their wall time), plus `resources` when a
+    `resource_monitor.ResourceMonitor` is given.
+    """
+    wall_start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if monitor:
+        monitor.start(proc.pid)
+    chunks = queue.Queue()
+    reader = threading.Thread(target=_read_chunks, args=(proc.stdout, chunks), daemon=True)
+    reader.start()
+
+    parser = IncumbentParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    pieces = []
+    pending = ""
+    best = None
+    best_plan = []
+    incumbents = 0
+    last_improvement = None
+    stop_reason = None
+    trajectory = []
+    progress = []
+    progress_tail = ""
+
+    def consider(block):
+        nonlocal best, best_plan, incumbents, last_improvement, stop_reason
+        plan = extract_plan(block)
+        if not plan:
+            return
+        stats = parse_stats(block)
+        value = plan_quality(plan, stats)
+        if best is not None and (value is None or value >= best):
+            return
+        best = value
+        best_plan = plan
+        incumbents += 1
+        last_improvement = time.perf_counter()
+        trajectory.append(incumbent_entry(plan, stats, last_improvement - wall_start))
+        if on_incumbent:
+            on_incumbent(plan, stats, last_improvement - wall_start)
+        if target_metric is not None and value is not None and value <= target_metric:
+            stop_reason = "target-metric"
+
+    eof = False
+    while not eof and stop_reason is None:
+        try:
+            chunk = chunks.get(timeout=0.1)
+        except queue.Empty:
+            chunk = b""
+        if chunk is None:
+            eof = True
+        elif chunk:
+            text = strip_ansi(decoder.decode(chunk))
+            pieces.append(text)
+            # Progress markers are not newline-terminated, so they are matched as they arrive.
+            scan = progress_tail + text
+            end = 0
+            for match in PROGRESS_RE.finditer(scan):
+                progress.append(
+                    [round(time.perf_counter() - wall_start, 3), float(match.group(1)), float(match.group(2))]
+                )
+                end = match.end()
+            progress_tail = scan[max(end, len(scan) - 64) :]
+            if len(progress) > MAX_PROGRESS_POINTS:
+                progress[:] = progress[::2]
+            pending += text
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                block = parser.feed(line)
+                if block:
+                    consider(block)
+                if stop_reason:
+                    break
+
+        now = time.perf_counter()
+        if stop_reason is None and time_limit is not None and now - wall_start >= time_limit:
+            stop_reason = "time-limit"
+        if (
+            stop_reason is None
+            and stall_seconds is not None
+            and last_improvement is not None
+            and now - last_improvement >= stall_seconds
+        ):
+            stop_reason = "stall"
+
+    if eof:
+        if pending:
+            parser.feed(pending)
+        block = parser.flush()
+        if block:
+            consider(block)
+        proc.wait()
+        return_code = proc.returncode
+        if stop_reason is None:
+            stop_reason = "exit"
+    else:
+        stop_process(proc)
+        # A deliberate early stop (stall/target) is a successful run.
+        return_code = 124 if stop_reason == "time-limit" else 0
+    reader.join(timeout=1)
+
+    return {
+        "output": "".join(pieces),
+        "plan": best_plan,
+        "return_code": return_code,
+        "timed_out": stop_reason == "time-limit",
+        "stop_reason": stop_reason,
+        "incumbents": incumbents,
+        "wall_seconds": time.perf_counter() - wall_start,
+        "trajectory": trajectory,
+        "progress": progress,
+        "resources": monitor.stop() if monitor else None,
+    }
+
+
+def plan_file_text(plan) -> str:
     lines = []
     for step in plan:
         lines.append(f"{step['start']:.3f}: ({step['action']}) [{step['dur']:.3f}]")
-    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return "\n".join(lines) + "\n"
+
+
+def write_text_atomic(path: Path, text: str):
+    """Write via a temp file in the same directory and rename, so readers never see half a file."""
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        # mkstemp creates files private to the owner; stats/plans are meant to be shared.
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def write_plan_file(plan, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_text_atomic(path, plan_file_text(plan))
 
 
 def write_stats_file(payload: dict, path: Path):
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    write_text_atomic(path, json.dumps(payload, indent=2, sort_keys=True) + "\n")
+
+
+def build_stats_payload(args, use_docker, plan, stats, timed_out, return_code, wall_seconds):
+    from result_cache import sha256_file
+
+    makespan = max((step["end"] for step in plan), default=0.0)
+    payload = {
+        "domain": str(args.domain),
+        "problem": str(args.problem),
+        "problem_sha256": sha256_file(args.problem),
+        "mode": "docker" if use_docker else "native",
+        "docker_image": args.docker_image if use_docker else None,
+        "planner": None if use_docker else str(args.planner),
+        "fast": bool(args.fast),
+        "time_limit_seconds": args.time_limit,
+        "timed_out": timed_out,
+        "return_code": return_code,
+        "wall_seconds": float(wall_seconds),
+        "machine": platform.node(),
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "plan": {
+            "found": bool(plan),
+            "actions": len(plan),
+            "makespan": float(makespan),
+        },
+        "stats": stats,
+    }
+    if args.plan_out:
+        payload["plan_out"] = str(args.plan_out)
+    return payload
 
 
 def find_val_binary():
@@ -220,6 +507,13 @@ def repo_root() -> Path:
     return Path(__file__).resolve().parent.parent
 
 
+def available_cores() -> List[int]:
+    """CPU cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
 def docker_available() -> bool:
     return shutil.which("docker") is not None
 
@@ -231,23 +525,31 @@ def default_docker_image() -> str:
     return "n-maze-planner-optic:latest"
 
 
+def repo_relative(*paths: Path):
+    """Return `paths` relative to the repo root (POSIX strings) for use under /work."""
+    root = repo_root().resolve()
+    rel = []
+    for path in paths:
+        path_abs = path.resolve()
+        if not path_abs.is_relative_to(root):
+            raise ValueError(
+                "Docker mode requires domain/problem inside the repo so they can be volume-mounted."
+            )
+        rel.append(path_abs.relative_to(root).as_posix())
+    return rel
+
+
 def build_docker_cmd(
     image: str,
     domain: Path,
     problem: Path,
     fast: bool,
+    cidfile: Optional[Path] = None,
+    cpuset: Optional[str] = None,
+    memory_mb: Optional[float] = None,
 ):
     root = repo_root().resolve()
-    domain_abs = domain.resolve()
-    problem_abs = problem.resolve()
-
-    if not domain_abs.is_relative_to(root) or not problem_abs.is_relative_to(root):
-        raise ValueError(
-            "Docker mode requires domain/problem inside the repo so they can be volume-mounted."
-        )
-
-    domain_rel = domain_abs.relative_to(root)
-    problem_rel = problem_abs.relative_to(root)
+    domain_rel, problem_rel = repo_relative(domain, problem)
 
     cmd = [
         "docker",
@@ -257,14 +559,239 @@ def build_docker_cmd(
         f"{root}:/work",
         "-w",
         "/work",
-        image,
     ]
+    if cidfile:
+        # The container id locates its cgroup for resource accounting.
+        cmd.extend(["--cidfile", str(cidfile)])
+    if cpuset:
+        cmd.extend(["--cpuset-cpus", cpuset])
+    if memory_mb:
+        # Same value for memory+swap: the container gets no swap on top of its cap.
+        limit = f"{int(memory_mb)}m"
+        cmd.extend(["--memory", limit, "--memory-swap", limit])
+    cmd.append(image)
     if fast:
         cmd.append("-N")
-    cmd.extend([str(domain_rel.as_posix()), str(problem_rel.as_posix())])
+    cmd.extend([domain_rel, problem_rel])
     return cmd
 
 
+def run_planner(cmd, time_limit=None, monitor=None):
+    """Run the planner to completion (or `time_limit`) and capture its output.
+
+    Returns the same dict shape as `stream_planner` (without incumbents).
+    """
+    timed_out = False
+    wall_start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if monitor:
+        monitor.start(proc.pid)
+    try:
+        stdout, stderr = proc.communicate(timeout=time_limit)
+        return_code = proc.returncode
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        stdout, stderr = proc.communicate()
+        timed_out = True
+        return_code = 124
+    return {
+        "output": strip_ansi(coerce_text(stdout) + coerce_text(stderr)),
+        "plan": None,
+        "return_code": return_code,
+        "timed_out": timed_out,
+        "stop_reason": "time-limit" if timed_out else "exit",
+        "wall_seconds": time.perf_counter() - wall_start,
+        "resources": monitor.stop() if monitor else None,
+    }
+
+
+def run_precheck(args):
+    """Prove unsolvability by relaxed reachability before starting a planner.
+
+    Returns `(result, report)` when some goal can never be reached, where
+    `report` lists the unreachable goal atoms per agent; `(None, None)` otherwise.
+    Before the planner is skipped, the verdict is re-derived from a fresh
+    parse of the file (not the compiled cache), so a model that lost facts
+    (e.g. a button placed in several cells) cannot pass as a proof.
+    """
+    from maze_analysis import unreachable_goals
+    from maze_problem import parse_problem_file
+    from problem_cache import load_problem
+
+    wall_start = time.perf_counter()
+    try:
+        problem = load_problem(args.problem)
+    except (OSError, ValueError):
+        return None, None
+    missing = unreachable_goals(problem)
+    if not missing:
+        return None, None
+    try:
+        confirmed = unreachable_goals(parse_problem_file(args.problem))
+    except (OSError, ValueError):
+        return None, None
+    if confirmed != missing:
+        print("[warn] precheck: compiled and parsed problem disagree; running the planner", flush=True)
+        return None, None
+    lines = [";; Provably unsolvable (relaxed reachability)"]
+    for item in missing:
+        lines.append(f";; {item['agent']} cannot reach {item['goal']}: {item['reason']}")
+    return {
+        "output": "\n".join(lines) + "\n",
+        "plan": [],
+        "return_code": 0,
+        "timed_out": False,
+        "stop_reason": "exit",
+        "wall_seconds": time.perf_counter() - wall_start,
+    }, missing
+
+
+def derived_dir() -> Path:
+    # Inside the repo so Docker mode can mount derived problems too.
+    return repo_root() / ".cache" / "derived"
+
+
+def derived_path(source: Path, kind: str) -> Path:
+    """`<derived>/<stem>.<content hash>.<kind>.pddl`: concurrent runs on different files never share a name."""
+    from problem_cache import file_sha256
+
+    out_dir = derived_dir()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir / f"{source.stem}.{file_sha256(source)[:16]}.{kind}.pddl"
+
+
+def write_reduced_problem(problem_path: Path):
+    """Write a reduced copy of `problem_path`; return `(path, report)`."""
+    from maze_problem import format_problem
+    from problem_cache import load_problem
+    from maze_reduce import reduce_problem
+
+    reduced, report = reduce_problem(load_problem(problem_path))
+    out_path = derived_path(problem_path, "reduced")
+    write_text_atomic(out_path, format_problem(reduced))
+    mapping = {
+        "original": str(problem_path),
+        "reduced": str(out_path),
+        # Kept objects keep their names, so plans transfer unchanged.
+        "mapping": "identity on kept objects",
+        **report,
+    }
+    write_text_atomic(out_path.with_suffix(".json"), json.dumps(mapping, indent=2) + "\n")
+    return out_path, report
+
+
+def format_reduction(report: dict) -> str:
+    before, after = report["before"], report["after"]
+    return (
+        f"Reduction: objects {before['objects']} -> {after['objects']}, "
+        f"cells {before['cells']} -> {after['cells']}, "
+        f"init facts {before['init_facts']} -> {after['init_facts']}"
+    )
+
+
+def write_contracted_problem(domain_path: Path, problem_path: Path):
+    """Write corridor-contracted domain/problem copies; return `(domain, problem, contraction)`.
+
+    `contraction` holds the report and the corridor paths needed to expand plans.
+    """
+    from maze_contract import contract_problem, derive_domain
+    from maze_problem import format_problem
+    from problem_cache import load_problem
+
+    derived, corridors, report = contract_problem(load_problem(problem_path))
+    domain_out = derived_path(domain_path, "contract")
+    # Same domain content, same derived domain: only the first run writes it.
+    if not domain_out.exists():
+        write_text_atomic(domain_out, derive_domain(domain_path.read_text(encoding="utf-8", errors="ignore")))
+    problem_out = derived_path(problem_path, "contracted")
+    write_text_atomic(problem_out, format_problem(derived))
+    sidecar = {
+        "original": str(problem_path),
+        "contracted": str(problem_out),
+        "domain": str(domain_out),
+        **report,
+        "corridors": [path for (u, v), path in sorted(corridors.items()) if u < v],
+    }
+    write_text_atomic(problem_out.with_suffix(".json"), json.dumps(sidecar, indent=2) + "\n")
+    return domain_out, problem_out, {"report": report, "corridors": corridors}
+
+
+def format_contraction(report: dict) -> str:
+    return (
+        f"Contraction: {report['corridors']} corridors (longest {report['longest']} moves), "
+        f"cells {report['cells_before']} -> {report['cells_after']}"
+    )
+
+
+def run_native(args):
+    """Answer the problem with the built-in graph solver when it is eligible.
+
+    Returns `(result, None)` with a `run_planner`-shaped result, or
+    `(None, reason)` when the problem needs OPTIC.
+    """
+    from maze_problem import domain_name
+    from problem_cache import load_problem
+    from maze_solver import SearchLimitReached, native_ineligible_reason, solve_problem
+
+    wall_start = time.perf_counter()
+    try:
+        problem = load_problem(args.problem)
+        domain = domain_name(args.domain.read_text(encoding="utf-8", errors="ignore"))
+    except (OSError, ValueError) as exc:
+        return None, f"could not parse problem ({exc})"
+    reason = native_ineligible_reason(problem, domain)
+    if reason:
+        return None, reason
+    deadline = None
+    if args.time_limit is not None:
+        # Leave most of the budget to OPTIC in case the native search gives up.
+        deadline = wall_start + args.time_limit * NATIVE_TIME_SHARE
+    try:
+        plan, output = solve_problem(problem, deadline=deadline)
+    except SearchLimitReached as exc:
+        return None, f"native search stopped: {exc}"
+    return {
+        "output": output,
+        "plan": plan,
+        "return_code": 0,
+        "timed_out": False,
+        "stop_reason": "exit",
+        "wall_seconds": time.perf_counter() - wall_start,
+    }, None
+
+
+def run_decomposed(args):
+    """Plan each agent separately and merge (see maze_mapf).
+
+    Returns `(result, info)` with a `run_planner`-shaped result, or
+    `(None, reason)` when decomposition does not apply or fails.
+    """
+    from maze_mapf import decompose_ineligible_reason, solve_decomposed
+    from maze_problem import domain_name
+    from problem_cache import load_problem
+
+    wall_start = time.perf_counter()
+    try:
+        problem = load_problem(args.problem)
+        domain = domain_name(args.domain.read_text(encoding="utf-8", errors="ignore"))
+    except (OSError, ValueError) as exc:
+        return None, f"could not parse problem ({exc})"
+    reason = decompose_ineligible_reason(problem, domain)
+    if reason:
+        return None, reason
+    plan, output, info = solve_decomposed(problem)
+    if plan is None:
+        return None, f"no priority order plans agent {info['failed_agent']} ({info['orders_tried']} tried)"
+    return {
+        "output": output,
+        "plan": plan,
+        "return_code": 0,
+        "timed_out": False,
+        "stop_reason": "exit",
+        "wall_seconds": time.perf_counter() - wall_start,
+    }, info
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run OPTIC and pretty-print plan and stats.")
     parser.add_argument("domain", type=Path)
@@ -285,11 +812,36 @@ def main():
         default=default_docker_image(),
         help="Docker image tag to use when running OPTIC in Docker.",
     )
+    parser.add_argument(
+        "--docker-cpuset",
+        default=None,
+        metavar="CPUS",
+        help="Pin the OPTIC container to these CPUs (docker run --cpuset-cpus), e.g. 3 or 2-3.",
+    )
+    parser.add_argument(
+        "--docker-memory-mb",
+        type=float,
+        default=None,
+        metavar="MB",
+        help="Cap the OPTIC container's memory (docker run --memory, no extra swap).",
+    )
+    parser.add_argument(
+        "--docker-cidfile",
+        type=Path,
+        default=None,
+        help="Write the OPTIC container's id here (must not exist yet), e.g. so a parent can docker kill it.",
+    )
     parser.add_argument(
         "--raw",
         action="store_true",
         help="Print full raw planner output",
     )
+    parser.add_argument(
+        "--raw-out",
+        type=Path,
+        default=None,
+        help="Also write the full raw planner output to this file.",
+    )
     parser.add_argument(
         "--time-limit",
         type=float,
@@ -322,87 +874,382 @@ def main():
         action="store_true",
         help="Print ASCII grid visualization for 2D cXY cells",
     )
+    parser.add_argument(
+        "--no-precheck",
+        action="store_true",
+        help="Skip the relaxed-reachability unsolvability check before planning.",
+    )
+    parser.add_argument(
+        "--no-native",
+        action="store_true",
+        help="Always run OPTIC, even for single-agent problems the native solver can answer.",
+    )
+    parser.add_argument(
+        "--decompose",
+        action="store_true",
+        help="Plan multi-agent problems one agent at a time (prioritized, conflict-free) before trying OPTIC.",
+    )
+    parser.add_argument(
+        "--portfolio",
+        action="store_true",
+        help="Race several configurations in parallel, one CPU core each, and keep the winner.",
+    )
+    parser.add_argument(
+        "--portfolio-policy",
+        choices=("first", "best"),
+        default="first",
+        help="first: first valid plan wins; best: lowest metric by the time limit (default: first).",
+    )
+    parser.add_argument(
+        "--portfolio-configs",
+        type=lambda value: [name for name in value.split(",") if name],
+        default=None,
+        metavar="NAMES",
+        help="Comma-separated configurations to race (default: all that apply, one per core).",
+    )
+    parser.add_argument(
+        "--reduce",
+        action="store_true",
+        help="Plan on a reduced copy of the problem (unreachable cells, dead ends, unusable doors removed).",
+    )
+    parser.add_argument(
+        "--contract",
+        action="store_true",
+        help="Collapse corridors into move-corridor macro actions for OPTIC; the plan is expanded back.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse results from this content-addressed cache directory (e.g. .cache/optic).",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=512,
+        help="Size cap of --cache-dir in MB; least-recently-used entries are evicted (default: 512).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Parse planner output as it arrives; write each improved plan/stats immediately.",
+    )
+    parser.add_argument(
+        "--stall-seconds",
+        type=float,
+        default=None,
+        help="With --stream: stop after this many seconds without a better plan.",
+    )
+    parser.add_argument(
+        "--target-metric",
+        type=float,
+        default=None,
+        help="With --stream: stop as soon as a plan with metric <= this value is found.",
+    )
     args = parser.parse_args()
 
-    use_docker = args.docker
-    if not use_docker and not args.planner.exists():
-        # Convenient fallback: if local binary isn't present, try Docker if available.
-        if docker_available():
-            use_docker = True
+    if (args.stall_seconds is not None or args.target_metric is not None) and not args.stream:
+        args.stream = True
+
+    result = None
+    builtin_mode = None
+    unsolvable = None
+    native_reason = "disabled (--no-native)" if args.no_native else None
+    if not args.no_precheck:
+        result, unsolvable = run_precheck(args)
+        if result:
+            builtin_mode = "precheck"
+    if result is None and not args.no_native:
+        result, native_reason = run_native(args)
+        if result:
+            builtin_mode = "native-solver"
+    decomposition = None
+    if result is None and args.decompose:
+        result, decomposition = run_decomposed(args)
+        if result:
+            builtin_mode = "decomposed"
         else:
-            print(f"Planner not found: {args.planner}", file=sys.stderr)
-            print("Hint: build it, or use --docker (requires Docker).", file=sys.stderr)
-            sys.exit(2)
+            print(f"Decomposition not used: {decomposition}", flush=True)
+            decomposition = None
+
+    portfolio = None
+    winner_payload = None
+    if result is None and args.portfolio:
+        from problem_cache import load_problem
+        from planner_portfolio import run_portfolio
 
-    if use_docker:
-        if not docker_available():
-            print("Docker not found in PATH. Install Docker Desktop/Engine.", file=sys.stderr)
+        try:
+            agents = len(load_problem(args.problem).agents)
+        except (OSError, ValueError):
+            agents = 1
+        try:
+            result, portfolio = run_portfolio(args, agents)
+        except (OSError, ValueError) as exc:
+            print(f"Portfolio failed: {exc}", file=sys.stderr)
             sys.exit(2)
+        winner_payload = result["stats_payload"]
+
+    use_docker = False
+    cmd = None
+    reduction = None
+    planner_problem = args.problem
+    if result is None and args.reduce:
+        try:
+            planner_problem, reduction = write_reduced_problem(args.problem)
+        except (OSError, ValueError) as exc:
+            print(f"Reduction failed, planning on the original problem: {exc}", file=sys.stderr)
+        else:
+            print(format_reduction(reduction), flush=True)
+
+    contraction = None
+    planner_domain = args.domain
+    if result is None and args.contract:
         try:
-            cmd = build_docker_cmd(
-                image=args.docker_image,
-                domain=args.domain,
-                problem=args.problem,
-                fast=args.fast,
+            planner_domain, planner_problem, contraction = write_contracted_problem(
+                args.domain, planner_problem
             )
-        except ValueError as exc:
-            print(str(exc), file=sys.stderr)
-            sys.exit(2)
-    else:
-        cmd = [str(args.planner)]
-        if args.fast:
-            cmd.append("-N")
-        cmd.extend([str(args.domain), str(args.problem)])
-    timed_out = False
-    proc_returncode = 0
-    wall_start = time.perf_counter()
-    try:
-        proc = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=False,
-            timeout=args.time_limit,
+        except (OSError, ValueError) as exc:
+            print(f"Contraction failed, planning without macros: {exc}", file=sys.stderr)
+        else:
+            print(format_contraction(contraction["report"]), flush=True)
+
+    def expand(plan):
+        if not contraction:
+            return plan
+        from maze_contract import expand_plan
+
+        return expand_plan(plan, contraction["corridors"])
+
+    monitor = None
+    cid_dir = None
+    if result is None:
+        use_docker = args.docker
+        if not use_docker and not args.planner.exists():
+            # Convenient fallback: if local binary isn't present, try Docker if available.
+            if docker_available():
+                use_docker = True
+            else:
+                print(f"Planner not found: {args.planner}", file=sys.stderr)
+                print("Hint: build it, or use --docker (requires Docker).", file=sys.stderr)
+                sys.exit(2)
+
+        if use_docker:
+            if not docker_available():
+                print("Docker not found in PATH. Install Docker Desktop/Engine.", file=sys.stderr)
+                sys.exit(2)
+            from resource_monitor import ResourceMonitor
+
+            if args.docker_cidfile:
+                monitor = ResourceMonitor(cidfile=args.docker_cidfile)
+            else:
+                # docker refuses an existing --cidfile, so it goes in a fresh directory.
+                cid_dir = tempfile.TemporaryDirectory(prefix="optic-cid-")
+                monitor = ResourceMonitor(cidfile=Path(cid_dir.name) / "cid")
+            try:
+                cmd = build_docker_cmd(
+                    image=args.docker_image,
+                    domain=planner_domain,
+                    problem=planner_problem,
+                    fast=args.fast,
+                    cidfile=monitor.cidfile,
+                    cpuset=args.docker_cpuset,
+                    memory_mb=args.docker_memory_mb,
+                )
+            except ValueError as exc:
+                print(str(exc), file=sys.stderr)
+                sys.exit(2)
+        else:
+            from resource_monitor import ResourceMonitor
+
+            monitor = ResourceMonitor()
+            cmd = [str(args.planner)]
+            if args.fast:
+                cmd.append("-N")
+            cmd.extend([str(planner_domain), str(planner_problem)])
+
+    stream_info = None
+    cache = None
+    cache_info = None
+    if result is None and args.cache_dir:
+        from result_cache import ResultCache, cache_key, planner_identity, run_flags
+
+        lookup_start = time.perf_counter()
+        cache = ResultCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+        key = cache_key(
+            args.domain.read_text(encoding="utf-8", errors="ignore"),
+            args.problem.read_text(encoding="utf-8", errors="ignore"),
+            planner_identity(use_docker, args.planner, args.docker_image),
+            run_flags(
+                args.fast,
+                args.time_limit,
+                stall_seconds=args.stall_seconds,
+                target_metric=args.target_metric,
+                reduce=args.reduce,
+                contract=args.contract,
+            ),
         )
-        proc_returncode = proc.returncode
-        output = strip_ansi(coerce_text(proc.stdout) + coerce_text(proc.stderr))
-    except subprocess.TimeoutExpired as exc:
-        timed_out = True
-        proc_returncode = 124
-        output = strip_ansi(coerce_text(exc.stdout) + coerce_text(exc.stderr))
-    except OSError as exc:
-        print(f"Failed to run planner: {exc}", file=sys.stderr)
-        sys.exit(2)
-    wall_seconds = time.perf_counter() - wall_start
-
-    plan = extract_plan(output)
+        hit = cache.get(key)
+        cache_info = {
+            "key": key,
+            "hit": hit is not None,
+            "lookup_seconds": time.perf_counter() - lookup_start,
+        }
+        if hit:
+            cached = hit["stats"]
+            result = {
+                "output": hit["output"],
+                "plan": extract_plan(hit["plan"]),
+                "return_code": cached.get("return_code"),
+                "timed_out": cached.get("timed_out", False),
+                # Report the original planner run's wall time and usage, not the lookup's.
+                "wall_seconds": cached.get("wall_seconds", 0.0),
+                "resources": cached.get("resources"),
+                "trajectory": (cached.get("trajectory") or {}).get("incumbents"),
+                "progress": (cached.get("trajectory") or {}).get("progress"),
+            }
+            stream_info = cached.get("stream")
+
+    if result is None:
+        if args.stream:
+            def on_incumbent(plan, stats, elapsed):
+                plan = expand(plan)
+                # Persist every improvement right away so a crash/kill keeps it.
+                if args.plan_out:
+                    write_plan_file(plan, args.plan_out)
+                if args.stats_out:
+                    snapshot = build_stats_payload(args, use_docker, plan, stats, False, None, elapsed)
+                    snapshot["stream"] = {"running": True, "incumbent_seconds": float(elapsed)}
+                    snapshot["resources"] = monitor.snapshot()
+                    write_stats_file(snapshot, args.stats_out)
+                print(f"[incumbent] t={elapsed:.2f}s metric={plan_quality(plan, stats)} actions={len(plan)}", flush=True)
+
+            try:
+                result = stream_planner(
+                    cmd,
+                    time_limit=args.time_limit,
+                    stall_seconds=args.stall_seconds,
+                    target_metric=args.target_metric,
+                    on_incumbent=on_incumbent,
+                    monitor=monitor,
+                )
+            except OSError as exc:
+                print(f"Failed to run planner: {exc}", file=sys.stderr)
+                sys.exit(2)
+            stream_info = {
+                "running": False,
+                "stop_reason": result["stop_reason"],
+                "incumbents": result["incumbents"],
+                "stall_seconds": args.stall_seconds,
+                "target_metric": args.target_metric,
+            }
+        else:
+            try:
+                result = run_planner(cmd, time_limit=args.time_limit, monitor=monitor)
+            except OSError as exc:
+                print(f"Failed to run planner: {exc}", file=sys.stderr)
+                sys.exit(2)
+    if cid_dir:
+        cid_dir.cleanup()
+
+    output = result["output"]
+    timed_out = result["timed_out"]
+    proc_returncode = result["return_code"]
+    wall_seconds = result["wall_seconds"]
+    resources = result.get("resources")
+    if resources is None and builtin_mode:
+        from resource_monitor import self_usage
+
+        resources = self_usage()
+
+    trajectory = {
+        "incumbents": result.get("trajectory"),
+        "progress": result.get("progress") or [],
+    }
+    if trajectory["incumbents"] is None:
+        trajectory["incumbents"] = incumbent_trajectory(output)
+    if not trajectory["progress"]:
+        # Output read at the end: heuristic values in order, without timestamps.
+        trajectory["progress"] = [
+            [None, float(h), float(g)] for h, g in PROGRESS_RE.findall(output)
+        ][-MAX_PROGRESS_POINTS:]
+
+    if result.get("plan"):
+        plan = result["plan"]
+    else:
+        plan = extract_plan(output)
+    # Cached plans are stored expanded; expanding again leaves them unchanged.
+    plan = expand(plan)
     stats = parse_stats(output)
+    if winner_payload:
+        # A killed anytime winner leaves no raw output, only its stats snapshot.
+        stats = winner_payload.get("stats") or stats
+
+    if args.raw_out:
+        args.raw_out.write_text(output, encoding="utf-8")
 
     # Optional machine-readable output for experiments / reports.
     if args.stats_out:
-        makespan = max((step["end"] for step in plan), default=0.0)
-        stats_payload = {
-            "domain": str(args.domain),
-            "problem": str(args.problem),
-            "mode": "docker" if use_docker else "native",
-            "docker_image": args.docker_image if use_docker else None,
-            "planner": None if use_docker else str(args.planner),
-            "fast": bool(args.fast),
-            "time_limit_seconds": args.time_limit,
-            "timed_out": timed_out,
-            "return_code": proc_returncode,
-            "wall_seconds": float(wall_seconds),
-            "plan": {
-                "found": bool(plan),
-                "actions": len(plan),
-                "makespan": float(makespan),
-            },
-            "stats": stats,
-        }
-        if args.plan_out:
-            stats_payload["plan_out"] = str(args.plan_out)
+        stats_payload = build_stats_payload(
+            args, use_docker, plan, stats, timed_out, proc_returncode, wall_seconds
+        )
+        if stream_info:
+            stats_payload["stream"] = stream_info
+        if cache_info:
+            stats_payload["cache"] = cache_info
+        if resources:
+            stats_payload["resources"] = resources
+        if trajectory["incumbents"] or trajectory["progress"]:
+            stats_payload["trajectory"] = trajectory
+        if builtin_mode:
+            stats_payload["mode"] = builtin_mode
+            stats_payload["planner"] = None
+        if decomposition:
+            stats_payload["decomposition"] = decomposition
+        if portfolio:
+            if winner_payload:
+                for key in (
+                    "mode",
+                    "docker_image",
+                    "planner",
+                    "fast",
+                    "stream",
+                    "reduction",
+                    "contraction",
+                    "decomposition",
+                    "trajectory",
+                ):
+                    if key in winner_payload:
+                        stats_payload[key] = winner_payload[key]
+            stats_payload["portfolio"] = portfolio
+        if unsolvable:
+            stats_payload["unsolvable"] = {"unreachable_goals": unsolvable}
+        if reduction:
+            stats_payload["reduction"] = {
+                "problem": str(planner_problem),
+                "before": reduction["before"],
+                "after": reduction["after"],
+            }
+        if contraction:
+            stats_payload["contraction"] = {
+                "domain": str(planner_domain),
+                "problem": str(planner_problem),
+                **contraction["report"],
+            }
         write_stats_file(stats_payload, args.stats_out)
 
+    # Only completed or time-limited runs are reproducible; planner errors are not cached.
+    if cache and not cache_info["hit"] and (proc_returncode == 0 or timed_out):
+        cache_payload = build_stats_payload(
+            args, use_docker, plan, stats, timed_out, proc_returncode, wall_seconds
+        )
+        if stream_info:
+            cache_payload["stream"] = stream_info
+        if resources:
+            cache_payload["resources"] = resources
+        if trajectory["incumbents"] or trajectory["progress"]:
+            cache_payload["trajectory"] = trajectory
+        cache.put(cache_info["key"], cache_payload, plan_file_text(plan) if plan else "", output)
+
     if args.raw:
         print(output)
         if timed_out:
@@ -434,6 +1281,33 @@ def main():
             print("VAL output")
             print(strip_ansi((proc_val.stdout or "") + (proc_val.stderr or "")))
 
+    if portfolio:
+        print()
+        if portfolio["winner"]:
+            print(f"Portfolio winner: {portfolio['winner']} after {portfolio['winner_seconds']:.2f}s")
+        else:
+            print("Portfolio: no configuration found a plan")
+        for run in portfolio["configs"]:
+            state = "killed" if run["killed"] else f"done in {run['seconds']:.2f}s"
+            print(f"  {run['name']:<20} core {run['core']:<3} {state:<18} metric={run['quality']}")
+    if unsolvable:
+        print()
+        print("Provably unsolvable (planner skipped; use --no-precheck to run it anyway):")
+        for item in unsolvable:
+            print(f"  {item['agent']} cannot reach {item['goal']}")
+    elif builtin_mode == "native-solver" and plan:
+        print()
+        print("Solved with the native graph solver (use --no-native to run OPTIC).")
+    elif builtin_mode == "native-solver":
+        print()
+        print("The native graph solver's exhaustive search found no plan (use --no-native to run OPTIC).")
+    elif builtin_mode == "decomposed":
+        print()
+        print(f"Solved per agent in priority order {' > '.join(decomposition['order'])}.")
+    elif native_reason and not args.no_native:
+        print()
+        print(f"Native solver not used: {native_reason}")
+
     if args.grid:
         coords, start, goal = parse_problem_cells(args.problem)
         path_cells = extract_path_cells(plan)
@@ -444,7 +1318,10 @@ def main():
         print()
         print(f"Timed out after {args.time_limit:.1f}s")
 
-    if proc_returncode != 0 and not timed_out:
+    if stream_info and stream_info["stop_reason"] in ("stall", "target-metric"):
+        print()
+        print(f"Stopped early ({stream_info['stop_reason']}) after {wall_seconds:.1f}s")
+    elif proc_returncode != 0 and not timed_out:
         print()
         print(f"Planner exited with code {proc_returncode}")
 
@@ -0,0 +1,416 @@
+"""SQLite store of planner runs, filled incrementally from stats JSON files.
+
+Every distinct stats file content becomes one row of `runs`, so a problem
+re-run by `run_batch.py` (which overwrites `stats/<problem>.json`) keeps its
+earlier runs. Rows are indexed by problem hash, planner configuration, machine
+and timestamp; the common numbers are columns, the full payload is kept as
+JSON (in `payloads`) for everything else.
+
+`manifest` remembers `(mtime_ns, size, sha256)` per ingested file, under the
+directory it was ingested from. An ingest only lists the directory and stats
+the files; a file is read (and hashed) only when its mtime or size changed, so
+re-ingesting an unchanged directory of tens of thousands of runs costs one
+directory listing and one manifest query.
+
+`run_tags` holds the ingest tags: an ingest with a tag labels every run its
+files hold, new or already stored, so one run can carry several tags.
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    problem TEXT,
+    problem_sha256 TEXT,
+    config TEXT,
+    machine TEXT,
+    timestamp REAL,
+    tag TEXT,
+    root TEXT,
+    source TEXT,
+    found INTEGER,
+    actions INTEGER,
+    makespan REAL,
+    metric REAL,
+    cost REAL,
+    states_evaluated INTEGER,
+    planner_time REAL,
+    wall_seconds REAL,
+    timed_out INTEGER,
+    return_code INTEGER,
+    peak_rss_mb REAL,
+    user_cpu_seconds REAL,
+    system_cpu_seconds REAL,
+    resource_source TEXT,
+    trials INTEGER,
+    wall_min REAL,
+    wall_iqr REAL
+);
+-- Kept apart so scans of `runs` stay on small rows.
+CREATE TABLE IF NOT EXISTS payloads (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id),
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_problem ON runs (problem_sha256, timestamp);
+CREATE INDEX IF NOT EXISTS runs_config ON runs (config, timestamp);
+CREATE INDEX IF NOT EXISTS runs_machine ON runs (machine, timestamp);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp);
+CREATE INDEX IF NOT EXISTS runs_tag ON runs (tag, problem);
+-- `runs.tag` keeps the tag of the ingest that first stored the run.
+CREATE TABLE IF NOT EXISTS run_tags (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, run_id)
+);
+CREATE INDEX IF NOT EXISTS runs_root ON runs (root, timestamp);
+-- One row per trial of a repeated-trial run (`run_batch.py --trials`).
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    trial INTEGER NOT NULL,
+    wall_seconds REAL,
+    states_evaluated INTEGER,
+    metric REAL,
+    planner_time REAL,
+    peak_rss_mb REAL,
+    found INTEGER,
+    timed_out INTEGER,
+    PRIMARY KEY (run_id, trial)
+);
+CREATE TABLE IF NOT EXISTS manifest (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs (id)
+);
+CREATE INDEX IF NOT EXISTS manifest_root ON manifest (root, run_id);
+"""
+# Columns added to `runs` after its first version; stores created before get them on open.
+ADDED_COLUMNS = (("trials", "INTEGER"), ("wall_min", "REAL"), ("wall_iqr", "REAL"))
+SAMPLE_COLUMNS = (
+    "wall_seconds",
+    "states_evaluated",
+    "metric",
+    "planner_time",
+    "peak_rss_mb",
+    "found",
+    "timed_out",
+)
+
+# Output columns of `aggregate_stats.py`, in order; `problem` is the stats file stem.
+SUMMARY_COLUMNS = [
+    "problem",
+    "found",
+    "actions",
+    "makespan",
+    "metric",
+    "cost",
+    "states_evaluated",
+    "planner_time",
+    "wall_seconds",
+    "timed_out",
+    "return_code",
+    "peak_rss_mb",
+    "user_cpu_seconds",
+    "system_cpu_seconds",
+    "resource_source",
+    "trials",
+    "wall_min",
+    "wall_iqr",
+]
+BOOL_COLUMNS = ("found", "timed_out")
+
+
+def config_key(payload: dict) -> str:
+    """The planner configuration a run used, as a stable JSON string."""
+    return json.dumps(
+        {
+            "mode": payload.get("mode"),
+            "planner": payload.get("planner"),
+            "docker_image": payload.get("docker_image"),
+            "fast": payload.get("fast"),
+            "time_limit": payload.get("time_limit_seconds"),
+            "stream": "stream" in payload,
+            "reduce": "reduction" in payload,
+            "contract": "contraction" in payload,
+            "portfolio": "portfolio" in payload,
+        },
+        sort_keys=True,
+    )
+
+
+def run_timestamp(payload: dict, mtime_ns: int) -> float:
+    """`finished_at` from the payload; the file's mtime for stats written before it existed."""
+    finished = payload.get("finished_at")
+    if finished:
+        try:
+            return datetime.fromisoformat(finished).timestamp()
+        except ValueError:
+            pass
+    return mtime_ns / 1e9
+
+
+def run_row(payload: dict) -> dict:
+    plan = payload.get("plan") or {}
+    stats = payload.get("stats") or {}
+    resources = payload.get("resources") or {}
+    trials = payload.get("trials") or {}
+    wall = (trials.get("summary") or {}).get("wall_seconds") or {}
+    return {
+        "problem_sha256": payload.get("problem_sha256"),
+        "config": config_key(payload),
+        "machine": payload.get("machine"),
+        "found": plan.get("found"),
+        "actions": plan.get("actions"),
+        "makespan": plan.get("makespan"),
+        "metric": stats.get("metric"),
+        "cost": stats.get("cost"),
+        "states_evaluated": stats.get("states_evaluated"),
+        "planner_time": stats.get("time_seconds", stats.get("time")),
+        "wall_seconds": payload.get("wall_seconds"),
+        "timed_out": payload.get("timed_out"),
+        "return_code": payload.get("return_code"),
+        "peak_rss_mb": resources.get("peak_rss_mb"),
+        "user_cpu_seconds": resources.get("user_cpu_seconds"),
+        "system_cpu_seconds": resources.get("system_cpu_seconds"),
+        "resource_source": resources.get("source"),
+        "trials": trials.get("count", 1),
+        "wall_min": wall.get("min"),
+        "wall_iqr": wall.get("iqr"),
+    }
+
+
+class RunStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        had_tags = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'run_tags'").fetchone()
+        self.db.executescript(SCHEMA)
+        if not had_tags:
+            with self.db:
+                self.db.execute("INSERT OR IGNORE INTO run_tags SELECT id, tag FROM runs WHERE tag IS NOT NULL")
+        have = {row[1] for row in self.db.execute("PRAGMA table_info(runs)")}
+        for column, kind in ADDED_COLUMNS:
+            if column not in have:
+                self.db.execute(f"ALTER TABLE runs ADD COLUMN {column} {kind}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ingest(self, stats_dir: Path, pattern: str = "*.json", tag: Optional[str] = None) -> dict:
+        """Add new or changed stats files directly in `stats_dir` matching `pattern`; return counts.
+
+        Returns `{"files", "added", "changed", "unchanged", "removed", "invalid"}`.
+        Files that disappeared leave the manifest but their runs stay. With
+        `tag`, every run the matching files hold gets it, unchanged ones too.
+        """
+        stats_dir = Path(stats_dir)
+        root = str(stats_dir.resolve())
+        known = {
+            row[0]: row[1:]
+            for row in self.db.execute(
+                "SELECT path, mtime_ns, size, sha256, run_id FROM manifest WHERE root = ?", (root,)
+            )
+        }
+        counts = {"files": 0, "added": 0, "changed": 0, "unchanged": 0, "removed": 0, "invalid": 0}
+        seen = set()
+        tagged = []
+        with self.db, os.scandir(root) as entries:
+            for entry in entries:
+                if not fnmatch.fnmatch(entry.name, pattern) or not entry.is_file():
+                    continue
+                key = os.path.join(root, entry.name)
+                seen.add(key)
+                counts["files"] += 1
+                st = entry.stat()
+                old = known.get(key)
+                if old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+                    counts["unchanged"] += 1
+                    tagged.append(old[3])
+                    continue
+                with open(key, "rb") as fh:
+                    data = fh.read()
+                sha = hashlib.sha256(data).hexdigest()
+                if old and old[2] == sha:
+                    # Touched but identical: only refresh the manifest.
+                    self.db.execute(
+                        "UPDATE manifest SET mtime_ns = ?, size = ? WHERE path = ?",
+                        (st.st_mtime_ns, st.st_size, key),
+                    )
+                    counts["unchanged"] += 1
+                    tagged.append(old[3])
+                    continue
+                try:
+                    payload = json.loads(data.decode("utf-8", errors="ignore"))
+                except ValueError:
+                    counts["invalid"] += 1
+                    continue
+                if not isinstance(payload, dict) or "plan" not in payload:
+                    counts["invalid"] += 1
+                    continue
+                run_id = self._add_run(sha, Path(entry.name).stem, payload, tag, root, key, st.st_mtime_ns)
+                self.db.execute(
+                    "INSERT OR REPLACE INTO manifest (path, root, mtime_ns, size, sha256, run_id) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, root, st.st_mtime_ns, st.st_size, sha, run_id),
+                )
+                counts["changed" if old else "added"] += 1
+                tagged.append(run_id)
+            for key in set(known) - seen:
+                self.db.execute("DELETE FROM manifest WHERE path = ?", (key,))
+                counts["removed"] += 1
+            if tag is not None:
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO run_tags (run_id, tag) VALUES (?, ?)", [(run_id, tag) for run_id in tagged]
+                )
+        return counts
+
+    def _add_run(self, sha: str, problem: str, payload: dict, tag, root: str, source: str, mtime_ns: int) -> int:
+        existing = self.db.execute("SELECT id FROM runs WHERE sha256 = ?", (sha,)).fetchone()
+        if existing:
+            # The same run copied to another file (or directory) is stored once; `ingest` still tags it.
+            return existing["id"]
+        row = run_row(payload)
+        row.update(
+            sha256=sha,
+            problem=problem,
+            timestamp=run_timestamp(payload, mtime_ns),
+            tag=tag,
+            root=root,
+            source=source,
+        )
+        columns = ", ".join(row)
+        marks = ", ".join("?" for _ in row)
+        cur = self.db.execute(f"INSERT INTO runs ({columns}) VALUES ({marks})", list(row.values()))
+        self.db.execute(
+            "INSERT INTO payloads (run_id, payload) VALUES (?, ?)",
+            (cur.lastrowid, json.dumps(payload, sort_keys=True)),
+        )
+        samples = (payload.get("trials") or {}).get("samples") or []
+        self.db.executemany(
+            f"INSERT INTO samples (run_id, trial, {', '.join(SAMPLE_COLUMNS)}) "
+            f"VALUES (?, ?, {', '.join('?' for _ in SAMPLE_COLUMNS)})",
+            [(cur.lastrowid, i) + tuple(sample.get(c) for c in SAMPLE_COLUMNS) for i, sample in enumerate(samples)],
+        )
+        return cur.lastrowid
+
+    def query(
+        self,
+        stats_dir: Optional[Path] = None,
+        current: bool = True,
+        tag: Optional[str] = None,
+        machine: Optional[str] = None,
+        config: Optional[str] = None,
+        since: Optional[float] = None,
+        latest: bool = True,
+        columns=None,
+    ):
+        """Runs as dicts, oldest first.
+
+        With `stats_dir`, only runs ingested from it: with `current`, the
+        runs its files hold now (what a re-glob would see), otherwise also the
+        ones since overwritten. With `latest`, one run per problem: the newest
+        matching one.
+        """
+        columns = list(columns or SUMMARY_COLUMNS)
+        where = []
+        params = []
+        joins = ""
+        if stats_dir is not None and current:
+            joins = "JOIN manifest m ON m.run_id = r.id"
+            where.append("m.root = ?")
+            params.append(str(Path(stats_dir).resolve()))
+        elif stats_dir is not None:
+            where.append("r.root = ?")
+            params.append(str(Path(stats_dir).resolve()))
+        if tag is not None:
+            where.append("r.id IN (SELECT run_id FROM run_tags WHERE tag = ?)")
+            params.append(tag)
+        for column, value in (("machine", machine), ("config", config)):
+            if value is not None:
+                where.append(f"r.{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("r.timestamp >= ?")
+            params.append(since)
+        clause = ("WHERE " + " AND ".join(where)) if where else ""
+        select = ", ".join(f"r.{c}" for c in columns)
+        sql = f"SELECT {select}, r.id, r.problem AS run_problem, r.timestamp AS ts FROM runs r {joins} {clause}"
+        if latest:
+            sql = (
+                f"SELECT * FROM (SELECT *, ROW_NUMBER() OVER "
+                f"(PARTITION BY run_problem ORDER BY ts DESC, id DESC) AS pick FROM ({sql})) WHERE pick = 1"
+            )
+        sql += " ORDER BY ts, id"
+        bools = [i for i, c in enumerate(columns) if c in BOOL_COLUMNS]
+        width = len(columns)
+        rows = []
+        seen = set()
+        cursor = self.db.cursor()
+        # Plain tuples: much faster than sqlite3.Row for tens of thousands of rows.
+        cursor.row_factory = None
+        for row in cursor.execute(sql, params):
+            run_id = row[width]
+            if run_id in seen:
+                continue  # One run held by two files of the directory.
+            seen.add(run_id)
+            values = list(row[:width])
+            for i in bools:
+                if values[i] is not None:
+                    values[i] = bool(values[i])
+            rows.append(dict(zip(columns, values)))
+        return rows
+
+    def payloads(self, **filters):
+        """Full stats payloads (plus `_name`, the stats file stem) of `query(**filters)`."""
+        rows = self.query(columns=["problem", "id"], **filters)
+        out = []
+        for row in rows:
+            (text,) = self.db.execute("SELECT payload FROM payloads WHERE run_id = ?", (row["id"],)).fetchone()
+            payload = json.loads(text)
+            payload["_name"] = row["problem"]
+            out.append(payload)
+        return out
+
+    def samples(self, run_ids) -> dict:
+        """`{run_id: [sample dicts]}` for the repeated-trial runs among `run_ids`."""
+        out = {}
+        ids = list(run_ids)
+        # Chunked to stay under SQLite's bound-parameter limit.
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            sql = (
+                f"SELECT run_id, {', '.join(SAMPLE_COLUMNS)} FROM samples "
+                f"WHERE run_id IN ({marks}) ORDER BY run_id, trial"
+            )
+            for row in self.db.execute(sql, chunk):
+                sample = dict(zip(SAMPLE_COLUMNS, tuple(row)[1:]))
+                for column in BOOL_COLUMNS:
+                    if sample[column] is not None:
+                        sample[column] = bool(sample[column])
+                out.setdefault(row[0], []).append(sample)
+        return out
+
+    def tags(self):
+        return [row[0] for row in self.db.execute("SELECT DISTINCT tag FROM run_tags ORDER BY tag")]
+
+
+def default_store_path(stats_dir: Path) -> Path:
+    return Path(stats_dir) / "runs.sqlite"
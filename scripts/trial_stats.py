@@ -0,0 +1,95 @@
+"""Repeated-trial samples and their summaries (`run_batch.py --trials`).
+
+A benchmarked problem's stats JSON is the payload of its median-wall-time
+trial, with `wall_seconds` set to the median and a `trials` block:
+
+    "trials": {
+      "warmup": 1, "count": 5, "core": 3,
+      "samples": [{"wall_seconds": ..., "states_evaluated": ..., ...}, ...],
+      "summary": {"wall_seconds": {"median", "q1", "q3", "iqr", "min", "max"}, ...}
+    }
+
+`samples(payload)` gives the per-trial values of any payload, so readers
+treat a single run as one sample.
+"""
+import statistics
+
+# Per-trial values kept in `trials.samples`, with where they live in a stats payload.
+SAMPLE_KEYS = {
+    "wall_seconds": (),
+    "states_evaluated": ("stats",),
+    "metric": ("stats",),
+    "planner_time": ("stats",),
+    "peak_rss_mb": ("resources",),
+    "found": ("plan",),
+    "timed_out": (),
+}
+
+
+def sample_of(payload: dict) -> dict:
+    """The `SAMPLE_KEYS` values of one run."""
+    out = {}
+    for key, path in SAMPLE_KEYS.items():
+        entry = payload
+        for part in path:
+            entry = entry.get(part) or {}
+        if key == "planner_time":
+            value = entry.get("time_seconds", entry.get("time"))
+        else:
+            value = entry.get(key)
+        out[key] = value
+    return out
+
+
+def distribution(values) -> dict:
+    """Median, quartiles, IQR, min and max of the non-None numbers in `values`, or None."""
+    values = sorted(float(v) for v in values if v is not None and not isinstance(v, bool))
+    if not values:
+        return None
+    if len(values) > 1:
+        q1, _, q3 = statistics.quantiles(values, n=4, method="inclusive")
+    else:
+        q1 = q3 = values[0]
+    return {
+        "median": statistics.median(values),
+        "q1": q1,
+        "q3": q3,
+        "iqr": q3 - q1,
+        "min": values[0],
+        "max": values[-1],
+    }
+
+
+def trials_payload(payloads, warmup: int, core=None) -> dict:
+    """Combine the stats payloads of repeated trials into one, as described above."""
+    rows = [sample_of(p) for p in payloads]
+    summary = {}
+    for key in SAMPLE_KEYS:
+        dist = distribution(row[key] for row in rows)
+        if dist:
+            summary[key] = dist
+    walls = [row["wall_seconds"] or 0.0 for row in rows]
+    # The lower median trial is a run that actually happened.
+    order = sorted(range(len(walls)), key=lambda i: walls[i])
+    representative = order[(len(order) - 1) // 2]
+    payload = dict(payloads[representative])
+    if "wall_seconds" in summary:
+        payload["wall_seconds"] = summary["wall_seconds"]["median"]
+    payload["trials"] = {
+        "warmup": warmup,
+        "count": len(rows),
+        "core": core,
+        "representative": representative,
+        "samples": rows,
+        "summary": summary,
+    }
+    return payload
+
+
+def samples(payload: dict, key: str):
+    """Every trial's value of `key` (one of `SAMPLE_KEYS`); a plain run is one sample."""
+    trials = payload.get("trials") or {}
+    if trials.get("samples"):
+        return [row.get(key) for row in trials["samples"] if row.get(key) is not None]
+    value = sample_of(payload)[key]
+    return [] if value is None else [value]